@@ -3,6 +3,7 @@
 import click
 import ipaddr
 import json
+import multiprocessing
 import syslog
 import tabulate
 from natsort import natsorted
@@ -11,6 +12,7 @@ import openconfig_acl
 import pyangbind.lib.pybindJSON as pybindJSON
 from swsssdk import ConfigDBConnector
 from swsssdk import SonicV2Connector
+from utilities_common.dbutil import run_pipelined
 
 
 def info(msg):
@@ -28,6 +30,17 @@ def error(msg):
     syslog.syslog(syslog.LOG_ERR, msg)
 
 
+# Number of ACL entries converted at once by load_rules_from_file
+CONVERT_CHUNK_SIZE = 500
+
+# AclLoader of the conversion worker processes, inherited from the parent
+_worker_acl_loader = None
+
+
+def _convert_chunk(chunk):
+    return _worker_acl_loader.convert_chunk(*chunk)
+
+
 def deep_update(dst, src):
     for key, value in src.iteritems():
         if isinstance(value, dict):
@@ -115,6 +128,7 @@ class AclLoader(object):
         self.rules_db_info = {}
         self.rules_info = {}
         self.sessions_db_info = {}
+        self.switch_capability = None
         self.configdb = ConfigDBConnector()
         self.configdb.connect()
         self.statedb = SonicV2Connector(host="127.0.0.1")
@@ -175,6 +189,31 @@ class AclLoader(object):
     def get_sessions_db_info(self):
         return self.sessions_db_info
 
+    def read_switch_capability(self):
+        """
+        Read SWITCH_CAPABILITY table from state database. Comma separated
+        lists of capabilities are parsed into sets.
+        :return:
+        """
+        capability = self.statedb.get_all(self.statedb.STATE_DB, "{}|switch".format(self.SWITCH_CAPABILITY_TABLE)) or {}
+        self.switch_capability = dict((key, set(value.split(","))) for key, value in capability.iteritems())
+
+    def get_switch_capability(self):
+        """
+        Get switch capabilities, read from state database on first use
+        :return: dict of capability name -> set of values
+        """
+        if self.switch_capability is None:
+            self.read_switch_capability()
+        return self.switch_capability
+
+    def invalidate_switch_capability(self):
+        """
+        Forget switch capabilities, so that they are read again on next use
+        :return:
+        """
+        self.switch_capability = None
+
     def get_session_name(self):
         """
         Get requested mirror session name or default session
@@ -254,15 +293,136 @@ class AclLoader(object):
                 raise AclLoaderException("Invalid input file %s" % filename)
         return yang_acl
 
-    def load_rules_from_file(self, filename):
+    def load_rules_from_file(self, filename, jobs=1):
         """
         Load file with ACL rules configuration in openconfig ACL format. Convert rules
         to Config DB schema.
+        The structure of the file is checked before converting any rule, but
+        its entries are only checked against the openconfig model as they are
+        converted, chunk by chunk. An invalid entry raises AclLoaderException
+        partway through the file, in which case no rule of the file is loaded.
         :param filename: File in openconfig ACL format
+        :param jobs: Number of processes converting the rules, 0 for one per CPU
         :return:
         """
-        self.yang_acl = AclLoader.parse_acl_json(filename)
-        self.convert_rules()
+        rules_info = {}
+        for rules in self.iter_rules_from_file(filename, jobs):
+            deep_update(rules_info, rules)
+        deep_update(self.rules_info, rules_info)
+
+    @staticmethod
+    def table_name_of(acl_set_name):
+        return acl_set_name.replace(" ", "_").replace("-", "_").upper().encode('ascii')
+
+    def iter_rules_from_file(self, filename, jobs=1, chunk_size=CONVERT_CHUNK_SIZE):
+        """
+        Convert the rules of a file in openconfig ACL format to Config DB
+        schema by chunks of ACL entries, optionally in a pool of processes.
+        Only the entries of a chunk are held as openconfig objects at a time.
+        :param filename: File in openconfig ACL format
+        :param jobs: Number of processes converting the rules, 0 for one per CPU
+        :param chunk_size: Number of ACL entries converted at once
+        :return: Generator of dicts of rules in Config DB schema
+        """
+        with open(filename, 'r') as f:
+            plain_json = json.load(f)
+        try:
+            acl_sets = plain_json['acl']['acl-sets']['acl-set']
+        except (KeyError, TypeError):
+            raise AclLoaderException("Invalid input file %s" % filename)
+        if not isinstance(acl_sets, dict):
+            raise AclLoaderException("Invalid input file %s" % filename)
+
+        # Check the structure of every ACL set before converting any of them.
+        # The entries are checked against the openconfig model chunk by chunk.
+        for acl_set_name, acl_set in acl_sets.iteritems():
+            acl_entries = acl_set.get('acl-entries', {}) if isinstance(acl_set, dict) else None
+            if not isinstance(acl_entries, dict) or not isinstance(acl_entries.get('acl-entry', {}), dict):
+                raise AclLoaderException("Invalid ACL set %s in input file %s" % (acl_set_name, filename))
+
+        chunks = []
+        tables = []
+        for acl_set_name, acl_set in acl_sets.iteritems():
+            table_name = self.table_name_of(acl_set_name)
+
+            if not self.is_table_valid(table_name):
+                warning("%s table does not exist" % (table_name))
+                continue
+
+            if self.current_table is not None and self.current_table != table_name:
+                continue
+
+            tables.append(table_name)
+            entries = acl_set.get('acl-entries', {}).get('acl-entry', {}).items()
+            for start in range(0, len(entries), chunk_size):
+                chunk_set = dict(acl_set)
+                chunk_set['acl-entries'] = {'acl-entry': dict(entries[start:start + chunk_size])}
+                chunks.append((table_name, acl_set_name, chunk_set))
+
+        if jobs != 1 and len(chunks) > 1:
+            # Read the state the workers need before they fork, so that they
+            # do not use the DB connections of this process
+            self.get_switch_capability()
+            self.get_session_name()
+
+            global _worker_acl_loader
+            _worker_acl_loader = self
+            pool = multiprocessing.Pool(jobs or None)
+            try:
+                results = pool.imap(_convert_chunk, chunks)
+                for rules, errors in results:
+                    for msg in errors:
+                        error(msg)
+                    yield rules
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+                _worker_acl_loader = None
+        else:
+            for chunk in chunks:
+                rules, errors = self.convert_chunk(*chunk)
+                for msg in errors:
+                    error(msg)
+                yield rules
+
+        for table_name in tables:
+            if not self.is_table_mirror(table_name):
+                yield self.deny_rule(table_name)
+
+    def convert_chunk(self, table_name, acl_set_name, acl_set):
+        """
+        Convert the ACL entries of a chunk of an ACL set
+        :param table_name: ACL table name to which the rules belong
+        :param acl_set_name: Name of the ACL set
+        :param acl_set: ACL set in openconfig JSON format
+        :return: Tuple of the dict of rules in Config DB schema and the list of errors
+        """
+        yang_acl = pybindJSON.loads({'acl': {'acl-sets': {'acl-set': {acl_set_name: acl_set}}}},
+                                    openconfig_acl, "openconfig_acl")
+        # pybindJSON.loads will silently return an empty object if input invalid
+        if len(yang_acl.acl.acl_sets.acl_set) != 1:
+            raise AclLoaderException("Invalid ACL set %s" % acl_set_name)
+
+        return self.convert_acl_set(table_name, yang_acl.acl.acl_sets.acl_set[acl_set_name])
+
+    def convert_acl_set(self, table_name, acl_set):
+        """
+        Convert the ACL entries of an ACL set to Config DB schema
+        :param table_name: ACL table name to which the rules belong
+        :param acl_set: ACL set in openconfig format
+        :return: Tuple of the dict of rules in Config DB schema and the list of errors
+        """
+        rules = {}
+        errors = []
+        for acl_entry_name in acl_set.acl_entries.acl_entry:
+            acl_entry = acl_set.acl_entries.acl_entry[acl_entry_name]
+            try:
+                rule = self.convert_rule_to_db_schema(table_name, acl_entry)
+                deep_update(rules, rule)
+            except AclLoaderException as ex:
+                errors.append("Error processing rule %s: %s. Skipped." % (acl_entry_name, ex))
+        return rules, errors
 
     def convert_action(self, table_name, rule_idx, rule):
         rule_props = {}
@@ -309,15 +469,14 @@ class AclLoader(object):
             raise AclLoaderException("Table {} does not exist".format(table_name))
 
         stage = self.tables_db_info[table_name].get("stage", Stage.INGRESS)
-        capability = self.statedb.get_all(self.statedb.STATE_DB, "{}|switch".format(self.SWITCH_CAPABILITY_TABLE))
+        capability = self.get_switch_capability()
         for action_key in dict(action_props):
             key = "{}|{}".format(self.ACL_ACTIONS_CAPABILITY_FIELD, stage.upper())
             if key not in capability:
                 del action_props[action_key]
                 continue
 
-            values = capability[key].split(",")
-            if action_key.upper() not in values:
+            if action_key.upper() not in capability[key]:
                 del action_props[action_key]
                 continue
 
@@ -484,7 +643,7 @@ class AclLoader(object):
         :return:
         """
         for acl_set_name in self.yang_acl.acl.acl_sets.acl_set:
-            table_name = acl_set_name.replace(" ", "_").replace("-", "_").upper().encode('ascii')
+            table_name = self.table_name_of(acl_set_name)
             acl_set = self.yang_acl.acl.acl_sets.acl_set[acl_set_name]
 
             if not self.is_table_valid(table_name):
@@ -494,17 +653,83 @@ class AclLoader(object):
             if self.current_table is not None and self.current_table != table_name:
                 continue
 
-            for acl_entry_name in acl_set.acl_entries.acl_entry:
-                acl_entry = acl_set.acl_entries.acl_entry[acl_entry_name]
-                try:
-                    rule = self.convert_rule_to_db_schema(table_name, acl_entry)
-                    deep_update(self.rules_info, rule)
-                except AclLoaderException as ex:
-                    error("Error processing rule %s: %s. Skipped." % (acl_entry_name, ex))
+            rules, errors = self.convert_acl_set(table_name, acl_set)
+            for msg in errors:
+                error(msg)
+            deep_update(self.rules_info, rules)
 
             if not self.is_table_mirror(table_name):
                 deep_update(self.rules_info, self.deny_rule(table_name))
 
+    def diff_rules(self, current_rules, new_rules):
+        """
+        Compare two sets of rules in Config DB schema
+        :param current_rules: dict of rules currently configured
+        :param new_rules: dict of rules to be configured
+        :return: Tuple of sets of keys of the rules added, removed and changed
+        """
+        current_keys = set(current_rules.iterkeys())
+        new_keys = set(new_rules.iterkeys())
+        added = new_keys - current_keys
+        removed = current_keys - new_keys
+        # Compare the rules as they are stored, the new rules hold integers
+        # where Config DB returns strings
+        changed = set(key for key in new_keys & current_keys
+                      if self.configdb.typed_to_raw(new_rules[key]) != self.configdb.typed_to_raw(current_rules[key]))
+        return added, removed, changed
+
+    @staticmethod
+    def rule_priority(rule):
+        try:
+            return int(rule.get("PRIORITY", 0))
+        except ValueError:
+            return 0
+
+    def rules_update_order(self, current_rules, new_rules, added, removed, changed):
+        """
+        Order the writes of a rules update. Added and changed rules are
+        written first, from the highest priority down, then removed rules are
+        deleted from the lowest priority up, so that the rules being replaced
+        keep matching until the rules taking precedence over them are in place.
+        :return: List of (key, rule) tuples, rule is None for a removed rule
+        """
+        updates = sorted(added | changed, key=lambda key: self.rule_priority(new_rules[key]), reverse=True)
+        removals = sorted(removed, key=lambda key: self.rule_priority(current_rules[key]))
+        return [(key, new_rules[key]) for key in updates] + [(key, None) for key in removals]
+
+    def write_rules(self, updates):
+        """
+        Write ACL rules to Config DB in pipelined batches
+        :param updates: List of (key, rule) tuples, rule is None to delete it
+        :return:
+        """
+        client = self.configdb.get_redis_client(self.configdb.CONFIG_DB)
+
+        def queue_write(pipe, update):
+            key, rule = update
+            _hash = "{}{}{}".format(self.ACL_RULE, self.configdb.TABLE_NAME_SEPARATOR, self.configdb.serialize_key(key))
+            if rule is None:
+                pipe.delete(_hash)
+                return
+            raw_rule = self.configdb.typed_to_raw(rule)
+            if key in self.rules_db_info:
+                stale_fields = [field for field in self.configdb.typed_to_raw(self.rules_db_info[key])
+                                if field not in raw_rule]
+                if stale_fields:
+                    pipe.hdel(_hash, *stale_fields)
+            pipe.hmset(_hash, raw_rule)
+
+        run_pipelined(client, updates, queue_write)
+
+    def update_rules(self, current_rules, new_rules):
+        """
+        Replace current_rules with new_rules in Config DB, only writing the
+        rules which were added, removed or changed
+        :return:
+        """
+        added, removed, changed = self.diff_rules(current_rules, new_rules)
+        self.write_rules(self.rules_update_order(current_rules, new_rules, added, removed, changed))
+
     def full_update(self):
         """
         Perform full update of ACL rules configuration. All existing rules
@@ -513,11 +738,9 @@ class AclLoader(object):
         be removed and new rules in that table will be installed.
         :return:
         """
-        for key in self.rules_db_info.keys():
-            if self.current_table is None or self.current_table == key[0]:
-               self.configdb.mod_entry(self.ACL_RULE, key, None)
-
-        self.configdb.mod_config({self.ACL_RULE: self.rules_info})
+        current_rules = dict((key, rule) for key, rule in self.rules_db_info.iteritems()
+                             if self.current_table is None or self.current_table == key[0])
+        self.update_rules(current_rules, self.rules_info)
 
     def incremental_update(self):
         """
@@ -526,55 +749,7 @@ class AclLoader(object):
         modifications.
         :return:
         """
-
-        # TODO: Until we test ASIC behavior, we cannot assume that we can insert
-        # dataplane ACLs and shift existing ACLs. Therefore, we perform a full
-        # update on dataplane ACLs, and only perform an incremental update on
-        # control plane ACLs.
-
-        new_rules = set(self.rules_info.iterkeys())
-        new_dataplane_rules = set()
-        new_controlplane_rules = set()
-        current_rules = set(self.rules_db_info.iterkeys())
-        current_dataplane_rules = set()
-        current_controlplane_rules = set()
-
-        for key in new_rules:
-            table_name = key[0]
-            if self.tables_db_info[table_name]['type'].upper() == self.ACL_TABLE_TYPE_CTRLPLANE:
-                new_controlplane_rules.add(key)
-            else:
-                new_dataplane_rules.add(key)
-
-        for key in current_rules:
-            table_name = key[0]
-            if self.tables_db_info[table_name]['type'].upper() == self.ACL_TABLE_TYPE_CTRLPLANE:
-                current_controlplane_rules.add(key)
-            else:
-                current_dataplane_rules.add(key)
-
-        # Remove all existing dataplane rules
-        for key in current_dataplane_rules:
-            self.configdb.mod_entry(self.ACL_RULE, key, None)
-
-        # Add all new dataplane rules
-        for key in new_dataplane_rules:
-            self.configdb.mod_entry(self.ACL_RULE, key, self.rules_info[key])
-
-        added_controlplane_rules = new_controlplane_rules.difference(current_controlplane_rules)
-        removed_controlplane_rules = current_controlplane_rules.difference(new_controlplane_rules)
-        existing_controlplane_rules = new_rules.intersection(current_controlplane_rules)
-
-        for key in added_controlplane_rules:
-            self.configdb.mod_entry(self.ACL_RULE, key, self.rules_info[key])
-
-        for key in removed_controlplane_rules:
-            self.configdb.mod_entry(self.ACL_RULE, key, None)
-
-        for key in existing_controlplane_rules:
-            if cmp(self.rules_info[key], self.rules_db_info[key]) != 0:
-                self.configdb.set_entry(self.ACL_RULE, key, self.rules_info[key])
-
+        self.update_rules(self.rules_db_info, self.rules_info)
 
     def delete(self, table=None, rule=None):
         """
@@ -819,8 +994,9 @@ def update(ctx):
 @click.option('--session_name', type=click.STRING, required=False)
 @click.option('--mirror_stage', type=click.Choice(["ingress", "egress"]), default="ingress")
 @click.option('--max_priority', type=click.INT, required=False)
+@click.option('--jobs', type=click.IntRange(min=0), default=1, help='Number of processes converting the rules, 0 for one per CPU')
 @click.pass_context
-def full(ctx, filename, table_name, session_name, mirror_stage, max_priority):
+def full(ctx, filename, table_name, session_name, mirror_stage, max_priority, jobs):
     """
     Full update of ACL rules configuration.
     If a table_name is provided, the operation will be restricted in the specified table.
@@ -838,7 +1014,7 @@ def full(ctx, filename, table_name, session_name, mirror_stage, max_priority):
     if max_priority:
         acl_loader.set_max_priority(max_priority)
 
-    acl_loader.load_rules_from_file(filename)
+    acl_loader.load_rules_from_file(filename, jobs)
     acl_loader.full_update()
 
 
@@ -847,8 +1023,9 @@ def full(ctx, filename, table_name, session_name, mirror_stage, max_priority):
 @click.option('--session_name', type=click.STRING, required=False)
 @click.option('--mirror_stage', type=click.Choice(["ingress", "egress"]), default="ingress")
 @click.option('--max_priority', type=click.INT, required=False)
+@click.option('--jobs', type=click.IntRange(min=0), default=1, help='Number of processes converting the rules, 0 for one per CPU')
 @click.pass_context
-def incremental(ctx, filename, session_name, mirror_stage, max_priority):
+def incremental(ctx, filename, session_name, mirror_stage, max_priority, jobs):
     """
     Incremental update of ACL rule configuration.
     """
@@ -862,7 +1039,7 @@ def incremental(ctx, filename, session_name, mirror_stage, max_priority):
     if max_priority:
         acl_loader.set_max_priority(max_priority)
 
-    acl_loader.load_rules_from_file(filename)
+    acl_loader.load_rules_from_file(filename, jobs)
     acl_loader.incremental_update()
 
 
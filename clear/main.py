@@ -4,6 +4,8 @@ import click
 import os
 import subprocess
 from click_default_group import DefaultGroup
+from utilities_common.interface_alias import InterfaceAliasConverter
+from utilities_common.routing_stack import RoutingStackGroupMixin
 
 try:
     # noinspection PyPep8Naming
@@ -80,29 +82,8 @@ class AliasedGroup(DefaultGroup):
         ctx.fail('Too many matches: %s' % ', '.join(sorted(matches)))
 
 
-# To be enhanced. Routing-stack information should be collected from a global
-# location (configdb?), so that we prevent the continous execution of this
-# bash oneliner. To be revisited once routing-stack info is tracked somewhere.
-def get_routing_stack():
-    command = "sudo docker ps | grep bgp | awk '{print$2}' | cut -d'-' -f3 | cut -d':' -f1"
-
-    try:
-        proc = subprocess.Popen(command,
-                                stdout=subprocess.PIPE,
-                                shell=True,
-                                stderr=subprocess.STDOUT)
-        stdout = proc.communicate()[0]
-        proc.wait()
-        result = stdout.rstrip('\n')
-
-    except OSError, e:
-        raise OSError("Cannot detect routing-stack")
-
-    return (result)
-
-
-# Global Routing-Stack variable
-routing_stack = get_routing_stack()
+class RoutingStackGroup(RoutingStackGroupMixin, click.Group):
+    """click.Group holding subcommands which depend on the routing stack"""
 
 
 def run_command(command, pager=False, return_output=False):
@@ -138,7 +119,7 @@ def cli():
 
 # This allows us to add commands to both cli and ip groups, allowing for
 # "Clear <command>" and "Clear ip <command>" to function the same
-@cli.group()
+@cli.group(cls=RoutingStackGroup)
 def ip():
     """Clear IP """
     pass
@@ -146,7 +127,7 @@ def ip():
 
 # 'ipv6' group
 
-@cli.group()
+@cli.group(cls=RoutingStackGroup)
 def ipv6():
     """Clear IPv6 information"""
     pass
@@ -156,16 +137,22 @@ def ipv6():
 # Inserting BGP functionality into cli's clear parse-chain.
 # BGP commands are determined by the routing-stack being elected.
 #
-if routing_stack == "quagga":
+def load_ipv4_bgp():
     from .bgp_quagga_v4 import bgp
-    ip.add_command(bgp)
+    return bgp
+
+def load_quagga_ipv6_bgp():
     from .bgp_quagga_v6 import bgp
-    ipv6.add_command(bgp)
-elif routing_stack == "frr":
-    from .bgp_quagga_v4 import bgp
-    ip.add_command(bgp)
+    return bgp
+
+def load_frr_ipv6_bgp():
     from .bgp_frr_v6 import bgp
-    ipv6.add_command(bgp)
+    return bgp
+
+ip.add_routing_stack_command("quagga", "bgp", load_ipv4_bgp)
+ip.add_routing_stack_command("frr", "bgp", load_ipv4_bgp)
+ipv6.add_routing_stack_command("quagga", "bgp", load_quagga_ipv6_bgp)
+ipv6.add_routing_stack_command("frr", "bgp", load_frr_ipv6_bgp)
 
 @cli.command()
 def counters():
@@ -179,6 +166,8 @@ def rifcounters(interface):
     """Clear RIF counters"""
     command = "intfstat -c"
     if interface is not None:
+        if os.getenv('SONIC_CLI_IFACE_MODE') == "alias":
+            interface = InterfaceAliasConverter().alias_to_name(interface)
         command = "intfstat -i {} -c".format(interface)
     run_command(command)
 
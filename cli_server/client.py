@@ -0,0 +1,170 @@
+# Thin client of the CLI server.
+#
+# The 'show', 'config' and 'sonic-clear' entry points forward their argv,
+# environment and terminal to a running sonic-cli-server and relay its
+# output. When no server is running, or it cannot serve the request, the
+# command is run in this process as usual.
+#
+# Keep the imports to the standard library: avoiding the import of click
+# and the rest of the command tree is the point of this module.
+
+import errno
+import fcntl
+import json
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import termios
+import tty
+
+from cli_server.protocol import *
+
+ENTRY_POINTS = {
+    'show': ('show.main', 'cli'),
+    'config': ('config.main', 'config'),
+    'sonic-clear': ('clear.main', 'cli'),
+}
+
+def get_winsize(fd):
+    """
+        Return the (rows, columns) of the terminal fd, None if it is not a terminal.
+    """
+    try:
+        packed = fcntl.ioctl(fd, termios.TIOCGWINSZ, b'\0' * 8)
+    except IOError:
+        return None
+    rows, columns = struct.unpack('HHHH', packed)[:2]
+    return rows, columns
+
+def connect():
+    """
+        Connect to the server of the current user, None if it is not running.
+        Any other user could have created the socket of the server, so it is
+        only trusted in a private directory and when served by the current user.
+    """
+    if os.environ.get(SERVER_ENV_VAR) == SERVER_DISABLED:
+        return None
+    path = socket_path()
+    if not is_private_dir(os.path.dirname(path)) or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        if peer_uid(sock) != os.geteuid():
+            sock.close()
+            return None
+    except socket.error:
+        sock.close()
+        return None
+    return sock
+
+def write_all(fd, data):
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+
+def forward(sock, prog):
+    """
+        Run the command on the server and relay its input and output.
+        Returns its exit code, None if the server closed the connection
+        before accepting it. Once accepted, the command may have run, so a
+        lost connection is an error rather than a reason to run it again.
+    """
+    use_tty = os.isatty(0) and os.isatty(1)
+    request = {
+        'prog': prog,
+        'argv': sys.argv[1:],
+        'env': dict(os.environ),
+        'cwd': os.getcwd(),
+        'tty': use_tty,
+        'winsize': get_winsize(1) if use_tty else None,
+    }
+
+    resized = []
+    old_attrs = None
+    reader = FrameReader()
+    accepted = False
+    stdin_open = True
+    try:
+        send_frame(sock, FRAME_REQUEST, json.dumps(request))
+        # Wait for the server to take the command, before sending it any input
+        frame = reader.read_frame(sock)
+        if frame is None or frame[0] != FRAME_ACCEPTED:
+            return None
+        accepted = True
+
+        if use_tty:
+            signal.signal(signal.SIGWINCH, lambda signum, frame: resized.append(True))
+            old_attrs = termios.tcgetattr(0)
+            tty.setraw(0)
+
+        frames = reader.feed(b'')
+        while True:
+            for frame_type, payload in frames:
+                if frame_type == FRAME_STDOUT:
+                    write_all(1, payload)
+                elif frame_type == FRAME_STDERR:
+                    write_all(2, payload)
+                elif frame_type == FRAME_EXIT:
+                    return EXIT_CODE.unpack(payload)[0]
+            frames = []
+
+            if resized:
+                del resized[:]
+                winsize = get_winsize(1)
+                if winsize is not None:
+                    send_frame(sock, FRAME_WINSIZE, WINSIZE.pack(*winsize))
+
+            rlist = [sock, 0] if stdin_open else [sock]
+            try:
+                readable = select.select(rlist, [], [])[0]
+            except select.error as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            if 0 in readable:
+                data = os.read(0, 4096)
+                send_frame(sock, FRAME_STDIN, data)
+                stdin_open = bool(data)
+
+            if sock in readable:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                frames = reader.feed(data)
+    except socket.error:
+        if not accepted:
+            return None
+    finally:
+        if old_attrs is not None:
+            termios.tcsetattr(0, termios.TCSADRAIN, old_attrs)
+        sock.close()
+
+    sys.stderr.write("Lost the connection to the CLI server, the command may not have completed\n")
+    return 1
+
+def run_local(prog):
+    module_name, attr = ENTRY_POINTS[prog]
+    module = __import__(module_name, fromlist=[attr])
+    return getattr(module, attr)()
+
+def run(prog):
+    sock = connect()
+    if sock is not None:
+        exit_code = forward(sock, prog)
+        if exit_code is not None:
+            sys.exit(exit_code)
+    return run_local(prog)
+
+def show():
+    return run('show')
+
+def config():
+    return run('config')
+
+def sonic_clear():
+    return run('sonic-clear')
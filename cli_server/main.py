@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+#
+# sonic-cli-server
+#
+# Resident server keeping a Python interpreter with the 'show', 'config'
+# and 'sonic-clear' command trees imported, so that a command forwarded by
+# the thin client in cli_server.client does not pay for the interpreter
+# start-up and module imports.
+#
+# Every request is served by a process forked from the warm server, which
+# runs the click command on the client's terminal (through a pty) or on
+# pipes, and relays its input and output over the connection. Forking keeps
+# a command's global state, sys.exit() calls and DB connections out of the
+# server. The server re-executes itself when the command modules change on
+# disk, and leaves the connections it receives meanwhile to be run by the
+# client itself.
+
+import argparse
+import errno
+import fcntl
+import json
+import os
+import pty
+import select
+import signal
+import socket
+import struct
+import sys
+import syslog
+import termios
+import traceback
+
+from cli_server.client import ENTRY_POINTS
+from cli_server.protocol import *
+
+SYSLOG_IDENTIFIER = "sonic-cli-server"
+
+# ========================== Syslog wrappers ==========================
+
+def log_info(msg):
+    syslog.openlog(SYSLOG_IDENTIFIER)
+    syslog.syslog(syslog.LOG_INFO, msg)
+    syslog.closelog()
+
+
+def log_error(msg):
+    syslog.openlog(SYSLOG_IDENTIFIER)
+    syslog.syslog(syslog.LOG_ERR, msg)
+    syslog.closelog()
+
+# ========================== Command execution ==========================
+
+def to_native(obj):
+    """
+        Convert the unicode strings decoded from a JSON request to native strings.
+    """
+    if isinstance(obj, dict):
+        return {to_native(key): to_native(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [to_native(item) for item in obj]
+    if not isinstance(obj, str) and hasattr(obj, 'encode'):
+        return obj.encode('utf-8')
+    return obj
+
+
+def load_entry_points():
+    """
+        Import the command trees and return a dictionary of program name -> click command.
+    """
+    entry_points = {}
+    for prog, (module_name, attr) in ENTRY_POINTS.items():
+        try:
+            module = __import__(module_name, fromlist=[attr])
+        except Exception as e:
+            log_error("Failed to load {}: {}".format(module_name, e))
+            continue
+        entry_points[prog] = getattr(module, attr)
+    return entry_points
+
+
+def get_source_files():
+    """
+        Return a dictionary of source file -> mtime of the loaded modules of this package.
+    """
+    source_files = {}
+    for module_name, _ in ENTRY_POINTS.values():
+        module = sys.modules.get(module_name)
+        path = getattr(module, '__file__', None)
+        if path is None:
+            continue
+        if path.endswith('.pyc'):
+            path = path[:-1]
+        try:
+            source_files[path] = os.stat(path).st_mtime
+        except OSError:
+            pass
+    return source_files
+
+
+def run_entry_point(command, request):
+    """
+        Run a click command in the current (forked) process as the client would have.
+        Never returns.
+    """
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    os.environ.clear()
+    os.environ.update(request['env'])
+    try:
+        os.chdir(request['cwd'])
+    except OSError:
+        pass
+    sys.argv = [request['prog']] + request['argv']
+
+    exit_code = 0
+    try:
+        command(args=request['argv'], prog_name=request['prog'])
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            sys.stderr.write("{}\n".format(e.code))
+            exit_code = 1
+    except Exception:
+        traceback.print_exc()
+        exit_code = 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(exit_code)
+
+
+def set_winsize(fd, winsize):
+    rows, columns = winsize
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack('HHHH', rows, columns, 0, 0))
+
+
+def read_output(fd):
+    """
+        Read from a pipe or pty master, '' once the other end is closed.
+    """
+    try:
+        return os.read(fd, 65536)
+    except OSError as e:
+        # Linux reports EIO on the pty master once the slave is closed
+        if e.errno == errno.EIO:
+            return b''
+        raise
+
+
+def serve(conn, entry_points):
+    """
+        Serve one request on the connection. Runs in a process forked per connection.
+    """
+    reader = FrameReader()
+    frame = reader.read_frame(conn)
+    if frame is None or frame[0] != FRAME_REQUEST:
+        return
+    request = to_native(json.loads(frame[1]))
+    command = entry_points.get(request.get('prog'))
+    if command is None:
+        # Let the client run it by itself
+        return
+    # From now on the client must not run the command by itself
+    send_frame(conn, FRAME_ACCEPTED)
+
+    if request['tty']:
+        pid, master_fd = pty.fork()
+        if pid == 0:
+            conn.close()
+            run_entry_point(command, request)
+        if request.get('winsize'):
+            set_winsize(master_fd, request['winsize'])
+        stdin_fd = master_fd
+        outputs = {master_fd: FRAME_STDOUT}
+    else:
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            os.dup2(stdin_r, 0)
+            os.dup2(stdout_w, 1)
+            os.dup2(stderr_w, 2)
+            for fd in (stdin_r, stdin_w, stdout_r, stdout_w, stderr_r, stderr_w):
+                os.close(fd)
+            run_entry_point(command, request)
+        for fd in (stdin_r, stdout_w, stderr_w):
+            os.close(fd)
+        stdin_fd = stdin_w
+        outputs = {stdout_r: FRAME_STDOUT, stderr_r: FRAME_STDERR}
+
+    try:
+        pending = reader.feed(b'')
+        while outputs:
+            for frame_type, payload in pending:
+                if frame_type == FRAME_STDIN and stdin_fd is not None:
+                    if payload:
+                        os.write(stdin_fd, payload)
+                    elif not request['tty']:
+                        os.close(stdin_fd)
+                        stdin_fd = None
+                elif frame_type == FRAME_WINSIZE and request['tty']:
+                    set_winsize(master_fd, WINSIZE.unpack(payload))
+            pending = []
+
+            try:
+                readable = select.select([conn] + list(outputs), [], [])[0]
+            except select.error as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            for fd in readable:
+                if fd is conn:
+                    data = conn.recv(65536)
+                    if not data:
+                        # The client is gone, so is the terminal of the command
+                        os.kill(pid, signal.SIGHUP)
+                        return
+                    pending = reader.feed(data)
+                    continue
+                data = read_output(fd)
+                if data:
+                    send_frame(conn, outputs[fd], data)
+                else:
+                    os.close(fd)
+                    del outputs[fd]
+
+        _, status = os.waitpid(pid, 0)
+        if os.WIFSIGNALED(status):
+            exit_code = 128 + os.WTERMSIG(status)
+        else:
+            exit_code = os.WEXITSTATUS(status)
+        send_frame(conn, FRAME_EXIT, EXIT_CODE.pack(exit_code))
+    except (OSError, socket.error):
+        os.kill(pid, signal.SIGHUP)
+
+# ========================== Server ==========================
+
+def create_socket(path):
+    """
+        Listen on path, in a directory only accessible by the current user.
+    """
+    dirname = os.path.dirname(path)
+    try:
+        os.mkdir(dirname)
+        os.chmod(dirname, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    if not is_private_dir(dirname):
+        raise OSError("{} must be a directory with mode 0700 owned by uid {}".format(dirname, os.geteuid()))
+
+    if os.path.exists(path):
+        os.remove(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, 0o600)
+    listener.listen(128)
+    return listener
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve show/config/sonic-clear commands from a warm interpreter',
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-s', '--socket', type=str, help='Path of the server socket', default=socket_path())
+    args = parser.parse_args()
+
+    entry_points = load_entry_points()
+    source_files = get_source_files()
+    listener = create_socket(args.socket)
+    log_info("Serving {} on {}".format(', '.join(sorted(entry_points)), args.socket))
+
+    # Connection handlers are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except socket.error as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            if peer_uid(conn) != os.geteuid():
+                conn.close()
+                continue
+
+            if get_source_files() != source_files:
+                # The commands were upgraded. Let this client run the command
+                # by itself and restart with the new code.
+                log_info("Command modules changed, restarting")
+                conn.close()
+                listener.close()
+                os.remove(args.socket)
+                os.execv(sys.executable, [sys.executable] + sys.argv)
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                listener.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                try:
+                    serve(conn, entry_points)
+                except Exception:
+                    log_error(traceback.format_exc())
+                finally:
+                    os._exit(0)
+            conn.close()
+    finally:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
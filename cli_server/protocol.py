@@ -0,0 +1,113 @@
+# Wire protocol shared by the CLI server and its thin client.
+#
+# This module is imported by the client on every invocation, so it must
+# only depend on the standard library.
+#
+# Every message is a frame made of a one byte type, a four byte payload
+# length in network order and the payload.
+
+import os
+import socket
+import stat
+import struct
+
+SOCKET_DIR = '/tmp/sonic-cli-server-{}'
+SOCKET_NAME = 'sock'
+
+# Set to "disable" to always run the commands in the client process
+SERVER_ENV_VAR = 'SONIC_CLI_SERVER'
+SERVER_DISABLED = 'disable'
+
+FRAME_HEADER = struct.Struct('!cI')
+WINSIZE = struct.Struct('!HH')
+EXIT_CODE = struct.Struct('!i')
+
+SO_PEERCRED = getattr(socket, 'SO_PEERCRED', 17)
+PEERCRED = struct.Struct('3i')
+
+FRAME_REQUEST = b'R'    # client -> server, JSON encoded request
+FRAME_STDIN = b'I'      # client -> server, empty payload on EOF
+FRAME_WINSIZE = b'W'    # client -> server, terminal rows and columns
+FRAME_ACCEPTED = b'A'   # server -> client, sent before running the command
+FRAME_STDOUT = b'O'     # server -> client
+FRAME_STDERR = b'E'     # server -> client
+FRAME_EXIT = b'X'       # server -> client, exit code of the command
+
+def socket_path(uid=None):
+    """
+        Return the path of the server socket of the given user.
+    """
+    if uid is None:
+        uid = os.geteuid()
+    return os.path.join(SOCKET_DIR.format(uid), SOCKET_NAME)
+
+def is_private_dir(dirname):
+    """
+        Whether dirname is a directory, not a symlink, owned by the current
+        user and only accessible by it.
+    """
+    try:
+        st = os.lstat(dirname)
+    except OSError:
+        return False
+    return (stat.S_ISDIR(st.st_mode) and st.st_uid == os.geteuid() and
+            stat.S_IMODE(st.st_mode) == 0o700)
+
+def peer_uid(sock):
+    """
+        Return the uid of the process at the other end of a unix socket.
+    """
+    _, uid, _ = PEERCRED.unpack(sock.getsockopt(socket.SOL_SOCKET, SO_PEERCRED, PEERCRED.size))
+    return uid
+
+def send_frame(sock, frame_type, payload=b''):
+    sock.sendall(FRAME_HEADER.pack(frame_type, len(payload)) + payload)
+
+class FrameReader(object):
+    """
+        Split the data read from a stream into frames.
+    """
+    def __init__(self):
+        self.buf = b''
+
+    def next_frame(self):
+        """
+            Return the (type, payload) of the next complete frame, None if
+            more data is needed.
+        """
+        if len(self.buf) < FRAME_HEADER.size:
+            return None
+        frame_type, length = FRAME_HEADER.unpack_from(self.buf)
+        end = FRAME_HEADER.size + length
+        if len(self.buf) < end:
+            return None
+        payload = self.buf[FRAME_HEADER.size:end]
+        self.buf = self.buf[end:]
+        return frame_type, payload
+
+    def feed(self, data):
+        """
+            Add data read from the stream and return the list of frames
+            which are now complete.
+        """
+        self.buf += data
+        frames = []
+        frame = self.next_frame()
+        while frame is not None:
+            frames.append(frame)
+            frame = self.next_frame()
+        return frames
+
+    def read_frame(self, sock):
+        """
+            Block until the next frame is read from sock, None on EOF.
+            Data read past that frame is kept for the next call.
+        """
+        frame = self.next_frame()
+        while frame is None:
+            data = sock.recv(65536)
+            if not data:
+                return None
+            self.buf += data
+            frame = self.next_frame()
+        return frame
@@ -0,0 +1,257 @@
+#!/usr/bin/env python -u
+# -*- coding: utf-8 -*-
+
+import copy
+import functools
+from collections import OrderedDict
+
+import click
+from swsssdk import ConfigDBConnector
+
+from utilities_common.interface_alias import InterfaceAliasConverter
+
+# Keys of the snapshot and of the active batch in the metadata shared by
+# all the contexts of a command
+SNAPSHOT_META_KEY = 'config_db_snapshot'
+BATCH_META_KEY = 'config_db_batch'
+
+
+class ConfigDBSnapshot(object):
+    """Read-through cache of the ConfigDB tables used by one config command
+
+    Every table is read from ConfigDB at most once. Writes made through the
+    snapshot go to ConfigDB and are applied to the tables already read, so
+    that later lookups of the same command see them.
+    """
+
+    def __init__(self, config_db=None):
+        self._config_db = config_db
+        self._tables = {}
+        self._indexes = {}
+        self._alias_converter = None
+
+    @property
+    def config_db(self):
+        if self._config_db is None:
+            self._config_db = ConfigDBConnector()
+            self._config_db.connect()
+        return self._config_db
+
+    def _load_table(self, table):
+        table = table.upper()
+        if table not in self._tables:
+            self._tables[table] = self.config_db.get_table(table)
+        return self._tables[table]
+
+    def get_table(self, table):
+        return self._load_table(table)
+
+    def get_entry(self, table, key):
+        return self._load_table(table).get(key, {})
+
+    def get_keys(self, table):
+        return list(self._load_table(table).keys())
+
+    def has_table(self, table):
+        """Return whether table has entries, without copying it"""
+        return bool(self._load_table(table))
+
+    def has_entry(self, table, key):
+        return key in self._load_table(table)
+
+    def find_keys(self, table, field, value):
+        """Return the keys of the entries of table whose field is value"""
+        table = table.upper()
+        index_key = (table, field)
+        if index_key not in self._indexes:
+            index = {}
+            for key, entry in self._load_table(table).items():
+                if field in entry:
+                    index.setdefault(entry[field], []).append(key)
+            self._indexes[index_key] = index
+        return list(self._indexes[index_key].get(value, []))
+
+    def get_alias_converter(self):
+        """Return an InterfaceAliasConverter of the PORT table"""
+        if self._alias_converter is None:
+            self._alias_converter = InterfaceAliasConverter(self._load_table('PORT'))
+        return self._alias_converter
+
+    def invalidate(self, table=None):
+        """Forget table, or all the tables, so that it is read again"""
+        if table is None:
+            self._tables = {}
+            self._indexes = {}
+            self._alias_converter = None
+            return
+        table = table.upper()
+        self._tables.pop(table, None)
+        self._invalidate_indexes(table)
+
+    def _invalidate_indexes(self, table):
+        for index_key in [index_key for index_key in self._indexes if index_key[0] == table]:
+            del self._indexes[index_key]
+        if table == 'PORT':
+            self._alias_converter = None
+
+    def _apply(self, table, key, data, replace):
+        table = table.upper()
+        if table not in self._tables:
+            return
+        entries = self._tables[table]
+        if data is None:
+            entries.pop(key, None)
+        elif replace or key not in entries:
+            entries[key] = dict(data)
+        else:
+            entries[key].update(data)
+        self._invalidate_indexes(table)
+
+    def set_entry(self, table, key, data):
+        self.config_db.set_entry(table, key, data)
+        self._apply(table, key, data, replace=True)
+
+    def mod_entry(self, table, key, data):
+        self.config_db.mod_entry(table, key, data)
+        self._apply(table, key, data, replace=False)
+
+
+class ConfigDBBatch(ConfigDBSnapshot):
+    """ConfigDB snapshot collecting the writes of many config operations
+
+    Operations read and write the snapshot only, so that each of them sees
+    the changes of the previous ones. commit() then writes the resulting
+    entries to ConfigDB in one transaction, and runs the calls the
+    operations deferred with defer().
+    """
+
+    def __init__(self, config_db=None):
+        super(ConfigDBBatch, self).__init__(config_db)
+        # (table, key) -> entry before the batch, None if there was none
+        self._original = OrderedDict()
+        self._deferred = []
+        self.writes = 0
+
+    def _normalize_key(self, key):
+        if isinstance(key, basestring) and ConfigDBConnector.KEY_SEPARATOR in key:
+            return tuple(key.split(ConfigDBConnector.KEY_SEPARATOR))
+        return key
+
+    def get_table(self, table):
+        # Commands modify what they read before writing it back
+        return copy.deepcopy(self._load_table(table))
+
+    def get_entry(self, table, key):
+        return copy.deepcopy(self._load_table(table).get(self._normalize_key(key), {}))
+
+
+    def _record(self, table, key, data, replace):
+        table = table.upper()
+        key = self._normalize_key(key)
+        entries = self._load_table(table)
+        if (table, key) not in self._original:
+            self._original[(table, key)] = copy.deepcopy(entries.get(key))
+        self._apply(table, key, copy.deepcopy(data), replace)
+        self.writes += 1
+
+    def set_entry(self, table, key, data):
+        self._record(table, key, data, replace=True)
+
+    def mod_entry(self, table, key, data):
+        self._record(table, key, data, replace=False)
+
+    def defer(self, func, *args, **kwargs):
+        self._deferred.append((func, args, kwargs))
+
+    def commit(self):
+        """Write the changed entries in one transaction. Returns the number of entries changed"""
+        config_db = self.config_db
+        client = config_db.get_redis_client(config_db.CONFIG_DB)
+        pipe = client.pipeline(transaction=True)
+        changed = 0
+        for (table, key), original in self._original.items():
+            _hash = '{}{}{}'.format(table, config_db.TABLE_NAME_SEPARATOR, config_db.serialize_key(key))
+            entry = self._tables[table].get(key)
+            if entry is None:
+                if original is not None:
+                    pipe.delete(_hash)
+                    changed += 1
+                continue
+            raw_entry = config_db.typed_to_raw(entry)
+            raw_original = config_db.typed_to_raw(original) if original is not None else {}
+            if raw_entry == raw_original:
+                continue
+            stale_fields = [field for field in raw_original if field not in raw_entry]
+            if stale_fields:
+                pipe.hdel(_hash, *stale_fields)
+            pipe.hmset(_hash, raw_entry)
+            changed += 1
+        pipe.execute()
+        self._original.clear()
+
+        deferred, self._deferred = self._deferred, []
+        for func, args, kwargs in deferred:
+            func(*args, **kwargs)
+        return changed
+
+
+def _context_config_db(ctx):
+    """Return the ConfigDB connector a command group put in ctx.obj, None if there is none"""
+    if not isinstance(ctx.obj, dict):
+        return None
+    return ctx.obj.get('config_db', ctx.obj.get('db'))
+
+
+def get_config_db_snapshot():
+    """Return the ConfigDB snapshot of the running config command
+
+    The snapshot is kept in the metadata of the click context, which is
+    shared by the group and subcommand contexts of one invocation. It reads
+    through the connector of the command group, if it opened one.
+    """
+    ctx = click.get_current_context(silent=True)
+    if ctx is None:
+        return ConfigDBSnapshot()
+    if SNAPSHOT_META_KEY not in ctx.meta:
+        ctx.meta[SNAPSHOT_META_KEY] = ConfigDBSnapshot(_context_config_db(ctx))
+    return ctx.meta[SNAPSHOT_META_KEY]
+
+
+def get_config_db_batch():
+    """Return the ConfigDBBatch of the running config command, None if it is not batched"""
+    ctx = click.get_current_context(silent=True)
+    if ctx is None:
+        return None
+    return ctx.meta.get(BATCH_META_KEY)
+
+
+def start_config_db_batch(ctx):
+    """Make the operations run in ctx and its subcommands read and write a new ConfigDBBatch"""
+    batch = ConfigDBBatch(_context_config_db(ctx))
+    ctx.meta[SNAPSHOT_META_KEY] = batch
+    ctx.meta[BATCH_META_KEY] = batch
+    return batch
+
+
+def connect_config_db(wait_for_init=True, **kwargs):
+    """Return the ConfigDB connector of a command group: the active batch, or a new connector"""
+    batch = get_config_db_batch()
+    if batch is not None:
+        return batch
+    config_db = ConfigDBConnector(**kwargs)
+    config_db.connect(wait_for_init=wait_for_init)
+    return config_db
+
+
+def deferred_in_batch(func):
+    """Decorator of the functions with side effects outside ConfigDB, e.g. running
+    a command, whose calls made by a batched operation are run after the commit
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        batch = get_config_db_batch()
+        if batch is not None:
+            batch.defer(func, *args, **kwargs)
+            return None
+        return func(*args, **kwargs)
+    return wrapper
@@ -7,6 +7,7 @@ import json
 import subprocess
 import netaddr
 import re
+import shlex
 import syslog
 import time
 import netifaces
@@ -19,12 +20,13 @@ from minigraph import parse_device_desc_xml
 
 import aaa
 import mlnx
+from db_snapshot import connect_config_db, deferred_in_batch, get_config_db_snapshot, start_config_db_batch
+from utilities_common.interface_alias import VLAN_SUB_INTERFACE_SEPARATOR
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help', '-?'])
 
 SONIC_CFGGEN_PATH = '/usr/local/bin/sonic-cfggen'
 SYSLOG_IDENTIFIER = "config"
-VLAN_SUB_INTERFACE_SEPARATOR = '.'
 
 # ========================== Syslog wrappers ==========================
 
@@ -66,6 +68,7 @@ except KeyError, TypeError:
 #
 
 
+@deferred_in_batch
 def run_command(command, display_cmd=False, ignore_error=False):
     """Run bash command and print output to stdout
     """
@@ -85,75 +88,42 @@ def run_command(command, display_cmd=False, ignore_error=False):
 def interface_alias_to_name(interface_alias):
     """Return default interface name if alias name is given as argument
     """
-    config_db = ConfigDBConnector()
-    config_db.connect()
-    port_dict = config_db.get_table('PORT')
-
-    vlan_id = ""
-    sub_intf_sep_idx = -1
-    if interface_alias is not None:
-        sub_intf_sep_idx = interface_alias.find(VLAN_SUB_INTERFACE_SEPARATOR)
-        if sub_intf_sep_idx != -1:
-            vlan_id = interface_alias[sub_intf_sep_idx + 1:]
-            # interface_alias holds the parent port name so the subsequent logic still applies
-            interface_alias = interface_alias[:sub_intf_sep_idx]
-
-    if interface_alias is not None:
-        if not port_dict:
-            click.echo("port_dict is None!")
-            raise click.Abort()
-        for port_name in port_dict.keys():
-            if interface_alias == port_dict[port_name]['alias']:
-                return port_name if sub_intf_sep_idx == -1 else port_name + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
+    snapshot = get_config_db_snapshot()
+    if interface_alias is not None and not snapshot.has_table('PORT'):
+        click.echo("port_dict is None!")
+        raise click.Abort()
 
     # Interface alias not in port_dict, just return interface_alias, e.g.,
     # portchannel is passed in as argument, which does not have an alias
-    return interface_alias if sub_intf_sep_idx == -1 else interface_alias + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
+    return snapshot.get_alias_converter().alias_to_name(interface_alias)
 
 
 def interface_name_is_valid(interface_name):
     """Check if the interface name is valid
     """
-    config_db = ConfigDBConnector()
-    config_db.connect()
-    port_dict = config_db.get_table('PORT')
-    port_channel_dict = config_db.get_table('PORTCHANNEL')
-    sub_port_intf_dict = config_db.get_table('VLAN_SUB_INTERFACE')
+    snapshot = get_config_db_snapshot()
 
     if get_interface_naming_mode() == "alias":
         interface_name = interface_alias_to_name(interface_name)
 
     if interface_name is not None:
-        if not port_dict:
+        if not snapshot.has_table('PORT'):
             click.echo("port_dict is None!")
             raise click.Abort()
-        for port_name in port_dict.keys():
-            if interface_name == port_name:
+        for table in ['PORT', 'PORTCHANNEL', 'VLAN_SUB_INTERFACE']:
+            if snapshot.has_entry(table, interface_name):
                 return True
-        if port_channel_dict:
-            for port_channel_name in port_channel_dict.keys():
-                if interface_name == port_channel_name:
-                    return True
-        if sub_port_intf_dict:
-            for sub_port_intf_name in sub_port_intf_dict.keys():
-                if interface_name == sub_port_intf_name:
-                    return True
     return False
 
 def interface_name_to_alias(interface_name):
     """Return alias interface name if default name is given as argument
     """
-    config_db = ConfigDBConnector()
-    config_db.connect()
-    port_dict = config_db.get_table('PORT')
-
+    snapshot = get_config_db_snapshot()
     if interface_name is not None:
-        if not port_dict:
+        if not snapshot.has_table('PORT'):
             click.echo("port_dict is None!")
             raise click.Abort()
-        for port_name in port_dict.keys():
-            if interface_name == port_name:
-                return port_dict[port_name]['alias']
+        return snapshot.get_alias_converter().get_alias(interface_name)
 
     return None
 
@@ -269,40 +239,26 @@ def get_interface_naming_mode():
 def _is_neighbor_ipaddress(ipaddress):
     """Returns True if a neighbor has the IP address <ipaddress>, False if not
     """
-    config_db = ConfigDBConnector()
-    config_db.connect()
-    entry = config_db.get_entry('BGP_NEIGHBOR', ipaddress)
-    return True if entry else False
+    return get_config_db_snapshot().has_entry('BGP_NEIGHBOR', ipaddress)
 
 def _get_all_neighbor_ipaddresses():
     """Returns list of strings containing IP addresses of all BGP neighbors
     """
-    config_db = ConfigDBConnector()
-    config_db.connect()
-    return config_db.get_table('BGP_NEIGHBOR').keys()
+    return get_config_db_snapshot().get_keys('BGP_NEIGHBOR')
 
 def _get_neighbor_ipaddress_list_by_hostname(hostname):
     """Returns list of strings, each containing an IP address of neighbor with
        hostname <hostname>. Returns empty list if <hostname> not a neighbor
     """
-    addrs = []
-    config_db = ConfigDBConnector()
-    config_db.connect()
-    bgp_sessions = config_db.get_table('BGP_NEIGHBOR')
-    for addr, session in bgp_sessions.iteritems():
-        if session.has_key('name') and session['name'] == hostname:
-            addrs.append(addr)
-    return addrs
+    return get_config_db_snapshot().find_keys('BGP_NEIGHBOR', 'name', hostname)
 
 def _change_bgp_session_status_by_addr(ipaddress, status, verbose):
     """Start up or shut down BGP session by IP address
     """
     verb = 'Starting' if status == 'up' else 'Shutting'
     click.echo("{} {} BGP session with neighbor {}...".format(verb, status, ipaddress))
-    config_db = ConfigDBConnector()
-    config_db.connect()
 
-    config_db.mod_entry('bgp_neighbor', ipaddress, {'admin_status': status})
+    get_config_db_snapshot().mod_entry('bgp_neighbor', ipaddress, {'admin_status': status})
 
 def _change_bgp_session_status(ipaddr_or_hostname, status, verbose):
     """Start up or shut down BGP session by IP address or hostname
@@ -341,11 +297,10 @@ def _remove_bgp_neighbor_config(neighbor_ip_or_hostname):
     """Removes BGP configuration of the given neighbor
     """
     ip_addrs = _validate_bgp_neighbor(neighbor_ip_or_hostname)
-    config_db = ConfigDBConnector()
-    config_db.connect()
+    snapshot = get_config_db_snapshot()
 
     for ip_addr in ip_addrs:
-        config_db.mod_entry('bgp_neighbor', ip_addr, None)
+        snapshot.mod_entry('bgp_neighbor', ip_addr, None)
         click.echo("Removed configuration of BGP neighbor {}".format(ip_addr))
 
 def _change_hostname(hostname):
@@ -507,6 +462,78 @@ def load(filename, yes):
     command = "{} -j {} --write-to-db".format(SONIC_CFGGEN_PATH, filename)
     run_command(command, display_cmd=True)
 
+# Commands which can be run by 'config batch'. Their ConfigDB reads and
+# writes go through the batch, and their other side effects are deferred
+# until the batch is committed.
+BATCH_COMMANDS = [
+    ['interface', 'ip', 'add'],
+    ['interface', 'ip', 'remove'],
+    ['interface', 'shutdown'],
+    ['interface', 'startup'],
+    ['portchannel', 'add'],
+    ['portchannel', 'del'],
+    ['portchannel', 'member', 'add'],
+    ['portchannel', 'member', 'del'],
+    ['vlan', 'add'],
+    ['vlan', 'del'],
+    ['vlan', 'member', 'add'],
+    ['vlan', 'member', 'del'],
+]
+
+def _is_batch_command(argv):
+    words = [arg for arg in argv if not arg.startswith('-')]
+    for command in BATCH_COMMANDS:
+        if words[:len(command)] == command:
+            return True
+    return False
+
+@config.command()
+@click.option('-n', '--dry-run', is_flag=True, help='Validate the operations without writing them')
+@click.argument('filename', default='-', type=click.File('r'))
+@click.pass_context
+def batch(ctx, filename, dry_run):
+    """Apply config operations read from a file, or stdin, in one transaction.
+
+    Every line holds the arguments of one config command, e.g.
+    'vlan member add 100 Ethernet0'. The operations are validated in turn
+    against the configuration left by the previous ones, and nothing is
+    written unless all of them succeed.
+    """
+    batch = start_config_db_batch(ctx)
+    operations = 0
+
+    for line_number, line in enumerate(filename, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            ctx.fail("line {}: {}".format(line_number, e))
+        if argv[0] == 'config':
+            argv = argv[1:]
+        if not _is_batch_command(argv):
+            ctx.fail("line {}: '{}' cannot be batched".format(line_number, line))
+
+        try:
+            with config.make_context('config', argv, parent=ctx) as sub_ctx:
+                config.invoke(sub_ctx)
+        except click.ClickException as e:
+            ctx.fail("line {}: '{}': {}".format(line_number, line, e.format_message()))
+        except click.Abort:
+            ctx.fail("line {}: '{}': aborted".format(line_number, line))
+        except SystemExit as e:
+            if e.code:
+                ctx.fail("line {}: '{}': exited with {}".format(line_number, line, e.code))
+        operations += 1
+
+    if dry_run:
+        click.echo("{} operations validated, {} writes".format(operations, batch.writes))
+        return
+
+    changed = batch.commit()
+    click.echo("{} operations applied, {} entries changed".format(operations, changed))
+
 @config.command()
 @click.option('-y', '--yes', is_flag=True)
 @click.option('-l', '--load-sysinfo', is_flag=True, help='load system default information (mac, portmap etc) first.')
@@ -650,8 +677,7 @@ def hostname(new_hostname):
 @config.group()
 @click.pass_context
 def portchannel(ctx):
-    config_db = ConfigDBConnector()
-    config_db.connect()
+    config_db = connect_config_db()
     ctx.obj = {'db': config_db}
     pass
 
@@ -882,8 +908,7 @@ def vlan(ctx, redis_unix_socket_path):
     kwargs = {}
     if redis_unix_socket_path:
         kwargs['unix_socket_path'] = redis_unix_socket_path
-    config_db = ConfigDBConnector(**kwargs)
-    config_db.connect(wait_for_init=False)
+    config_db = connect_config_db(wait_for_init=False, **kwargs)
     ctx.obj = {'db': config_db}
     pass
 
@@ -1295,8 +1320,7 @@ def remove_neighbor(neighbor_ip_or_hostname):
 @click.pass_context
 def interface(ctx):
     """Interface-related configuration tasks"""
-    config_db = ConfigDBConnector()
-    config_db.connect()
+    config_db = connect_config_db()
     ctx.obj = {}
     ctx.obj['config_db'] = config_db
 
@@ -1381,10 +1405,9 @@ def speed(ctx, interface_name, interface_speed, verbose):
 def _get_all_mgmtinterface_keys():
     """Returns list of strings containing mgmt interface keys 
     """
-    config_db = ConfigDBConnector()
-    config_db.connect()
-    return config_db.get_table('MGMT_INTERFACE').keys()
+    return get_config_db_snapshot().get_keys('MGMT_INTERFACE')
 
+@deferred_in_batch
 def mgmt_ip_restart_services():
     """Restart the required services when mgmt inteface IP address is changed"""
     """
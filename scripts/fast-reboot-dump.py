@@ -10,39 +10,62 @@ from fcntl import ioctl
 import binascii
 import argparse
 import syslog
+import time
 import traceback
+from multiprocessing.pool import ThreadPool
+from utilities_common.dbutil import get_all_bulk, get_fields_bulk
 
 
 ARP_CHUNK = binascii.unhexlify('08060001080006040001') # defines a part of the packet for ARP Request
 ARP_PAD = binascii.unhexlify('00' * 18)
 
+# ARP request frame: dst mac, src mac, ARP_CHUNK, sender mac, sender ip, target mac, target ip, ARP_PAD
+ARP_FRAME = struct.Struct('6s6s10s6s4s6s4s18s')
+
+# Maximum number of interfaces sending ARP packets at the same time
+GARP_MAX_WORKERS = 32
+
+def write_json_list(filename, objs):
+    """
+    Write the objects of the iterable objs as a JSON list, one object at a time
+    """
+    with open(filename, 'w') as fp:
+        fp.write('[')
+        separator = '\n'
+        for obj in objs:
+            fp.write(separator)
+            fp.write(json.dumps(obj, indent=2, separators=(',', ': ')))
+            separator = ',\n'
+        fp.write('\n]')
+
 def generate_arp_entries(filename, all_available_macs):
     db = swsssdk.SonicV2Connector(host='127.0.0.1')
     db.connect(db.APPL_DB, False)   # Make one attempt only
 
-    arp_output = []
     arp_entries = []
     keys = db.keys(db.APPL_DB, 'NEIGH_TABLE:*')
     keys = [] if keys is None else keys
-    for key in keys:
-        vlan_name = key.split(':')[1]
-        ip_addr = key.split(':')[2]
-        entry = db.get_all(db.APPL_DB, key)
-        if (vlan_name, entry['neigh'].lower()) not in all_available_macs:
-            # FIXME: print me to log
-            continue
-        obj = {
-          key: entry,
-          'OP': 'SET'
-        }
-        arp_entries.append((vlan_name, entry['neigh'].lower(), ip_addr))
-        arp_output.append(obj)
+    entries = get_all_bulk(db, db.APPL_DB, keys)
+
+    def arp_output():
+        for key in keys:
+            vlan_name = key.split(':')[1]
+            ip_addr = key.split(':')[2]
+            entry = entries[key]
+            if (vlan_name, entry['neigh'].lower()) not in all_available_macs:
+                # FIXME: print me to log
+                continue
+            obj = {
+              key: entry,
+              'OP': 'SET'
+            }
+            arp_entries.append((vlan_name, entry['neigh'].lower(), ip_addr))
+            yield obj
+
+    write_json_list(filename, arp_output())
 
     db.close(db.APPL_DB)
 
-    with open(filename, 'w') as fp:
-        json.dump(arp_output, fp, indent=2, separators=(',', ': '))
-
     return arp_entries
 
 def is_mac_unicast(mac):
@@ -56,33 +79,32 @@ def get_vlan_ifaces():
 
     return vlans
 
+def get_asic_objects(db, object_type, fields):
+    """
+    Get the given fields of all the ASIC_DB objects of object_type in pipelined batches.
+    Returns a dictionary of object oid -> list of values ordered as fields
+    """
+    prefix = 'ASIC_STATE:%s:' % object_type
+    keys = db.keys(db.ASIC_DB, prefix + 'oid:*')
+    keys = [] if keys is None else keys
+    values = get_fields_bulk(db, db.ASIC_DB, keys, fields)
+    return dict((key.replace(prefix, ''), value) for key, value in values.iteritems())
+
 def get_bridge_port_id_2_port_id(db):
     bridge_port_id_2_port_id = {}
-    keys = db.keys(db.ASIC_DB, 'ASIC_STATE:SAI_OBJECT_TYPE_BRIDGE_PORT:oid:*')
-    keys = [] if keys is None else keys
-    for key in keys:
-        value = db.get_all(db.ASIC_DB, key)
-        port_type = value['SAI_BRIDGE_PORT_ATTR_TYPE']
+    bridge_ports = get_asic_objects(db, 'SAI_OBJECT_TYPE_BRIDGE_PORT',
+                                    ['SAI_BRIDGE_PORT_ATTR_TYPE', 'SAI_BRIDGE_PORT_ATTR_PORT_ID'])
+    for bridge_id, (port_type, port_id) in bridge_ports.iteritems():
         if port_type != 'SAI_BRIDGE_PORT_TYPE_PORT':
             continue
-        port_id = value['SAI_BRIDGE_PORT_ATTR_PORT_ID']
         # ignore admin status
-        bridge_id = key.replace('ASIC_STATE:SAI_OBJECT_TYPE_BRIDGE_PORT:', '')
         bridge_port_id_2_port_id[bridge_id] = port_id
 
     return bridge_port_id_2_port_id
 
 def get_map_port_id_2_iface_name(db):
-    port_id_2_iface = {}
-    keys = db.keys(db.ASIC_DB, 'ASIC_STATE:SAI_OBJECT_TYPE_HOSTIF:oid:*')
-    keys = [] if keys is None else keys
-    for key in keys:
-        value = db.get_all(db.ASIC_DB, key)
-        port_id = value['SAI_HOSTIF_ATTR_OBJ_ID']
-        iface_name = value['SAI_HOSTIF_ATTR_NAME']
-        port_id_2_iface[port_id] = iface_name
-
-    return port_id_2_iface
+    hostifs = get_asic_objects(db, 'SAI_OBJECT_TYPE_HOSTIF', ['SAI_HOSTIF_ATTR_OBJ_ID', 'SAI_HOSTIF_ATTR_NAME'])
+    return dict(hostifs.itervalues())
 
 def get_map_bridge_port_id_2_iface_name(db):
     bridge_port_id_2_port_id = get_bridge_port_id_2_port_id(db)
@@ -98,41 +120,54 @@ def get_map_bridge_port_id_2_iface_name(db):
 
     return bridge_port_id_2_iface_name
 
-def get_vlan_oid_by_vlan_id(db, vlan_id):
-    keys = db.keys(db.ASIC_DB, 'ASIC_STATE:SAI_OBJECT_TYPE_VLAN:oid:*')
-    keys = [] if keys is None else keys
-    for key in keys:
-        value = db.get_all(db.ASIC_DB, key)
-        if 'SAI_VLAN_ATTR_VLAN_ID' in value and int(value['SAI_VLAN_ATTR_VLAN_ID']) == vlan_id:
-            return key.replace('ASIC_STATE:SAI_OBJECT_TYPE_VLAN:', '')
-
-    raise Exception('Not found bvi oid for vlan_id: %d' % vlan_id)
+def get_map_vlan_id_2_vlan_oid(db):
+    vlans = get_asic_objects(db, 'SAI_OBJECT_TYPE_VLAN', ['SAI_VLAN_ATTR_VLAN_ID'])
+    return dict((int(vlan_id), vlan_oid) for vlan_oid, (vlan_id,) in vlans.iteritems() if vlan_id is not None)
 
-def get_fdb(db, vlan_name, vlan_id, bridge_id_2_iface):
+def get_fdb(db, vlan_ifaces, bridge_id_2_iface, all_available_macs, map_mac_ip_per_vlan):
+    """
+    Yield the FDB entries of all the VLANs of vlan_ifaces, reading all the
+    FDB entries of ASIC_DB once, and fill the available MACs and the
+    MAC -> port maps of the VLANs
+    """
     fdb_types = {
       'SAI_FDB_ENTRY_TYPE_DYNAMIC': 'dynamic',
       'SAI_FDB_ENTRY_TYPE_STATIC' : 'static'
     }
 
-    bvid = get_vlan_oid_by_vlan_id(db, vlan_id)
-    available_macs = set()
-    map_mac_ip = {}
-    fdb_entries = []
-    keys = db.keys(db.ASIC_DB, 'ASIC_STATE:SAI_OBJECT_TYPE_FDB_ENTRY:{*\"bvid\":\"%s\"*}' % bvid)
+    vlan_id_2_vlan_oid = get_map_vlan_id_2_vlan_oid(db)
+    bvid_2_vlan = {}
+    for vlan_name in vlan_ifaces:
+        vlan_id = int(vlan_name.replace('Vlan', ''))
+        if vlan_id not in vlan_id_2_vlan_oid:
+            raise Exception('Not found bvi oid for vlan_id: %d' % vlan_id)
+        bvid_2_vlan[vlan_id_2_vlan_oid[vlan_id]] = (vlan_name, vlan_id)
+        map_mac_ip_per_vlan[vlan_name] = {}
+
+    fdb_keys = []
+    keys = db.keys(db.ASIC_DB, 'ASIC_STATE:SAI_OBJECT_TYPE_FDB_ENTRY:*')
     keys = [] if keys is None else keys
     for key in keys:
         key_obj = json.loads(key.replace('ASIC_STATE:SAI_OBJECT_TYPE_FDB_ENTRY:', ''))
+        if key_obj.get('bvid') not in bvid_2_vlan:
+            continue
         mac = str(key_obj['mac'])
         if not is_mac_unicast(mac):
             continue
-        available_macs.add((vlan_name, mac.lower()))
-        fdb_mac = mac.replace(':', '-')
-        # get attributes
-        value = db.get_all(db.ASIC_DB, key)
-        fdb_type = fdb_types[value['SAI_FDB_ENTRY_ATTR_TYPE']]
-        if value['SAI_FDB_ENTRY_ATTR_BRIDGE_PORT_ID'] not in bridge_id_2_iface:
+        vlan_name, vlan_id = bvid_2_vlan[key_obj['bvid']]
+        all_available_macs.add((vlan_name, mac.lower()))
+        fdb_keys.append((key, vlan_name, vlan_id, mac))
+
+    # get attributes
+    values = get_fields_bulk(db, db.ASIC_DB, [key for key, _, _, _ in fdb_keys],
+                             ['SAI_FDB_ENTRY_ATTR_TYPE', 'SAI_FDB_ENTRY_ATTR_BRIDGE_PORT_ID'])
+    for key, vlan_name, vlan_id, mac in fdb_keys:
+        entry_type, bridge_port_id = values[key]
+        fdb_type = fdb_types[entry_type]
+        if bridge_port_id not in bridge_id_2_iface:
             continue
-        fdb_port = bridge_id_2_iface[value['SAI_FDB_ENTRY_ATTR_BRIDGE_PORT_ID']]
+        fdb_port = bridge_id_2_iface[bridge_port_id]
+        fdb_mac = mac.replace(':', '-')
 
         obj = {
           'FDB_TABLE:Vlan%d:%s' % (vlan_id, fdb_mac) : {
@@ -142,14 +177,10 @@ def get_fdb(db, vlan_name, vlan_id, bridge_id_2_iface):
           'OP': 'SET'
         }
 
-        fdb_entries.append(obj)
-        map_mac_ip[mac.lower()] = fdb_port
-
-    return fdb_entries, available_macs, map_mac_ip
+        map_mac_ip_per_vlan[vlan_name][mac.lower()] = fdb_port
+        yield obj
 
 def generate_fdb_entries(filename):
-    fdb_entries = []
-
     db = swsssdk.SonicV2Connector(host='127.0.0.1')
     db.connect(db.ASIC_DB, False)   # Make one attempt only
 
@@ -159,17 +190,10 @@ def generate_fdb_entries(filename):
 
     all_available_macs = set()
     map_mac_ip_per_vlan = {}
-    for vlan in vlan_ifaces:
-        vlan_id = int(vlan.replace('Vlan', ''))
-        fdb_entry, available_macs, map_mac_ip_per_vlan[vlan] = get_fdb(db, vlan, vlan_id, bridge_id_2_iface)
-        all_available_macs |= available_macs
-        fdb_entries.extend(fdb_entry)
+    write_json_list(filename, get_fdb(db, vlan_ifaces, bridge_id_2_iface, all_available_macs, map_mac_ip_per_vlan))
 
     db.close(db.ASIC_DB)
 
-    with open(filename, 'w') as fp:
-        json.dump(fdb_entries, fp, indent=2, separators=(',', ': '))
-
     return all_available_macs, map_mac_ip_per_vlan
 
 def get_if(iff, cmd):
@@ -186,80 +210,94 @@ def get_iface_ip_addr(iff):
     SIOCGIFADDR = 0x8915            # Get ip address
     return get_if(iff, SIOCGIFADDR)[20:24]
 
-def send_arp(s, src_mac, src_ip, dst_mac_s, dst_ip_s):
-    # convert dst_mac in binary
-    dst_ip = socket.inet_aton(dst_ip_s)
-
-    # convert dst_ip in binary
-    dst_mac = binascii.unhexlify(dst_mac_s.replace(':', ''))
-
-    # make ARP packet
-    pkt = dst_mac + src_mac + ARP_CHUNK + src_mac + src_ip + dst_mac + dst_ip + ARP_PAD
+def build_arp_frames(src_mac, neighbors):
+    """
+    Build the ARP request frames from src_mac to the (src_ip, dst_mac, dst_ip)
+    neighbors, one after the other in one buffer
+    """
+    frames = bytearray(ARP_FRAME.size * len(neighbors))
+    for index, (src_ip, dst_mac_s, dst_ip_s) in enumerate(neighbors):
+        # convert dst_mac in binary
+        dst_mac = binascii.unhexlify(dst_mac_s.replace(':', ''))
+
+        # convert dst_ip in binary
+        dst_ip = socket.inet_aton(dst_ip_s)
+
+        ARP_FRAME.pack_into(frames, index * ARP_FRAME.size,
+                            dst_mac, src_mac, ARP_CHUNK, src_mac, src_ip, dst_mac, dst_ip, ARP_PAD)
+
+    return frames
+
+def send_arp_frames(src_if, frames):
+    """
+    Send the frames of the buffer through a raw socket bound to src_if.
+    Returns the interface, the number of frames and the time taken
+    """
+    ETH_P_ALL = 0x03
 
-    # send it
-    s.send(pkt)
+    start = time.time()
+    s = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+    try:
+        s.bind((src_if, 0))
+        view = memoryview(frames)
+        for offset in xrange(0, len(frames), ARP_FRAME.size):
+            s.send(view[offset:offset + ARP_FRAME.size])
+    finally:
+        s.close()
 
-    return
+    return src_if, len(frames) / ARP_FRAME.size, time.time() - start
 
 def garp_send(arp_entries, map_mac_ip_per_vlan):
-    ETH_P_ALL = 0x03
+    start = time.time()
 
     # generate source ip addresses for arp packets
     src_ip_addrs = {vlan_name:get_iface_ip_addr(vlan_name) for vlan_name,_,_ in arp_entries}
 
-    # generate source mac addresses for arp packets
-    src_ifs = {map_mac_ip_per_vlan[vlan_name][dst_mac] for vlan_name, dst_mac, _ in arp_entries}
-    src_mac_addrs = {src_if:get_iface_mac_addr(src_if) for src_if in src_ifs}
-
-    # open raw sockets for all required interfaces
-    sockets = {}
-    for src_if in src_ifs:
-        sockets[src_if] = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
-        sockets[src_if].bind((src_if, 0))
-
-    # send arp packets
+    # group the neighbors by the interface they are behind
+    neighbors_per_if = {}
     for vlan_name, dst_mac, dst_ip in arp_entries:
         src_if = map_mac_ip_per_vlan[vlan_name][dst_mac]
-        send_arp(sockets[src_if], src_mac_addrs[src_if], src_ip_addrs[vlan_name], dst_mac, dst_ip)
+        neighbors_per_if.setdefault(src_if, []).append((src_ip_addrs[vlan_name], dst_mac, dst_ip))
 
-    # close the raw sockets
-    for s in sockets.values():
-        s.close()
+    if not neighbors_per_if:
+        return
 
-    return
+    # build the arp packets of every interface, with its source mac address
+    frames_per_if = {src_if: build_arp_frames(get_iface_mac_addr(src_if), neighbors)
+                     for src_if, neighbors in neighbors_per_if.iteritems()}
 
-def get_default_entries(db, route):
-    key = 'ROUTE_TABLE:%s' % route
-    keys = db.keys(db.APPL_DB, key)
-    if keys is None:
-        return None
+    # send them from one thread per interface, sending does not hold the GIL
+    pool = ThreadPool(min(len(frames_per_if), GARP_MAX_WORKERS))
+    try:
+        for src_if, count, duration in pool.imap_unordered(lambda args: send_arp_frames(*args), frames_per_if.items()):
+            syslog.syslog(syslog.LOG_INFO, "Sent %d ARP packets on %s in %.3f seconds" % (count, src_if, duration))
+    finally:
+        pool.close()
+        pool.join()
 
-    entry = db.get_all(db.APPL_DB, key)
-    obj = {
-        key: entry,
-        'OP': 'SET'
-    }
+    syslog.syslog(syslog.LOG_INFO, "Sent %d ARP packets on %d interfaces in %.3f seconds"
+                  % (len(arp_entries), len(frames_per_if), time.time() - start))
 
-    return obj
+    return
 
 def generate_default_route_entries(filename):
     db = swsssdk.SonicV2Connector(host='127.0.0.1')
     db.connect(db.APPL_DB, False)   # Make one attempt only
 
-    default_routes_output = []
-
-    ipv4_default = get_default_entries(db, '0.0.0.0/0')
-    if ipv4_default is not None:
-        default_routes_output.append(ipv4_default)
+    keys = ['ROUTE_TABLE:%s' % route for route in ['0.0.0.0/0', '::/0']]
+    entries = get_all_bulk(db, db.APPL_DB, keys)
 
-    ipv6_default = get_default_entries(db, '::/0')
-    if ipv6_default is not None:
-        default_routes_output.append(ipv6_default)
+    default_routes_output = []
+    for key in keys:
+        if entries[key]:
+            default_routes_output.append({
+                key: entries[key],
+                'OP': 'SET'
+            })
 
     db.close(db.APPL_DB)
 
-    with open(filename, 'w') as fp:
-        json.dump(default_routes_output, fp, indent=2, separators=(',', ': '))
+    write_json_list(filename, default_routes_output)
 
 
 def main():
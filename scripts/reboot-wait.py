@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+"""
+Wait for an event of the reboot scripts without polling them with redis-cli
+or docker exec:
+
+    reboot-wait.py state -k 'WARM_RESTART_TABLE|warm-shutdown' -f state -w requesting -t 60
+        waits for a STATE_DB field to leave the given values, using the
+        redis keyspace notifications, and prints its final value
+
+    reboot-wait.py process -c teamd -n teamd -t 10
+        waits for the processes of a container to exit, using pidfds
+
+Exit codes: 0 when the event happened, 124 (as timeout(1)) on timeout and
+2 on error.
+"""
+
+import argparse
+import ctypes
+import errno
+import os
+import select
+import subprocess
+import sys
+import syslog
+import time
+import traceback
+import swsssdk
+from utilities_common.dbutil import enable_keyspace_events
+
+EXIT_SUCCESS = 0
+EXIT_ERROR = 2
+EXIT_TIMEOUT = 124
+
+# pidfd_open(2) syscall number, the same on all the architectures (Linux 5.3+)
+NR_PIDFD_OPEN = 434
+
+# Keyspace notifications of the generic (del) and hash commands
+KEYSPACE_EVENTS = 'Kgh'
+
+# Seconds between two checks of the processes when pidfds are not supported
+POLL_INTERVAL = 0.05
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+def pidfd_open(pid):
+    """
+    Returns a file descriptor of process pid, readable once it exits, or
+    None if the kernel does not support pidfds
+    """
+    fd = _libc.syscall(NR_PIDFD_OPEN, pid, 0)
+    if fd < 0:
+        err = ctypes.get_errno()
+        if err == errno.ESRCH:
+            # Already exited
+            return -1
+        if err in (errno.ENOSYS, errno.EPERM, errno.EINVAL):
+            return None
+        raise OSError(err, os.strerror(err))
+    return fd
+
+def process_start_time(pid):
+    """
+    Returns the start time of process pid, to tell it from a later process
+    reusing its pid, or None if it does not exist or exited
+    """
+    try:
+        with open('/proc/%d/stat' % pid) as fp:
+            stat = fp.read()
+    except IOError:
+        return None
+    # The command name may hold spaces, the fields are counted after it
+    fields = stat[stat.rfind(')') + 2:].split()
+    if fields[0] in ('Z', 'X'):
+        return None
+    return fields[19]
+
+def wait_for_exit(pids, timeout):
+    """
+    Wait up to timeout seconds for the processes pids to exit.
+    Returns the list of the processes still running.
+    """
+    deadline = time.time() + timeout
+    fds = {}
+    start_times = {}
+    for pid in pids:
+        fd = pidfd_open(pid)
+        if fd is None:
+            start_times[pid] = process_start_time(pid)
+        elif fd >= 0:
+            fds[fd] = pid
+
+    try:
+        poller = select.poll()
+        for fd in fds:
+            poller.register(fd, select.POLLIN)
+        while fds or start_times:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            if start_times:
+                # No pidfd support: check the processes in place, without
+                # forking anything
+                remaining = min(remaining, POLL_INTERVAL)
+            for fd, event in poller.poll(remaining * 1000):
+                poller.unregister(fd)
+                os.close(fd)
+                del fds[fd]
+            for pid, start_time in start_times.items():
+                if process_start_time(pid) != start_time:
+                    del start_times[pid]
+    finally:
+        for fd in fds:
+            os.close(fd)
+    return sorted(fds.values() + start_times.keys())
+
+def container_pids(container, name):
+    """
+    Returns the pids of the processes called name running in container,
+    found in /proc by their pid namespace
+    """
+    try:
+        init_pid = subprocess.check_output(['docker', 'inspect', '--format', '{{.State.Pid}}', container]).strip()
+    except subprocess.CalledProcessError:
+        return []
+    if init_pid == '0':
+        # Not running
+        return []
+    pid_ns = os.readlink('/proc/%s/ns/pid' % init_pid)
+
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            if os.readlink('/proc/%s/ns/pid' % entry) != pid_ns:
+                continue
+            with open('/proc/%s/comm' % entry) as fp:
+                if fp.read().strip() == name:
+                    pids.append(int(entry))
+        except (IOError, OSError):
+            # Exited meanwhile
+            continue
+    return pids
+
+def wait_for_state(client, key, field, pending, timeout):
+    """
+    Wait up to timeout seconds for field of key to hold a value out of
+    pending. Returns the last value of the field.
+    """
+    deadline = time.time() + timeout
+    keyspace_events = enable_keyspace_events(client, KEYSPACE_EVENTS)
+    db_id = client.connection_pool.connection_kwargs['db']
+    pubsub = client.pubsub()
+    try:
+        # Subscribe before reading the value, to miss no change
+        pubsub.subscribe('__keyspace@{}__:{}'.format(db_id, key))
+        state = client.hget(key, field)
+        while state in pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                # Read the value once more, in case a change landed after
+                # the last notification was delivered
+                state = client.hget(key, field)
+                break
+            msg = pubsub.get_message(timeout=remaining)
+            if msg is not None and msg['type'] == 'message':
+                state = client.hget(key, field)
+    finally:
+        pubsub.close()
+        if keyspace_events is not None:
+            client.config_set('notify-keyspace-events', keyspace_events)
+    return state
+
+def state_command(args):
+    db = swsssdk.SonicV2Connector(host='127.0.0.1')
+    try:
+        db.connect(args.db, False)   # Make one attempt only, the timeout must hold
+    except Exception as e:
+        syslog.syslog(syslog.LOG_ERR, "Failed to connect to %s: %s" % (args.db, str(e)))
+        return EXIT_ERROR
+    state = wait_for_state(db.get_redis_client(args.db), args.key, args.field, args.while_state, args.timeout)
+    print state if state is not None else ''
+    if state in args.while_state:
+        syslog.syslog(syslog.LOG_WARNING, "Timed out waiting for %s %s, still %s" % (args.key, args.field, state))
+        return EXIT_TIMEOUT
+    return EXIT_SUCCESS
+
+def process_command(args):
+    pids = container_pids(args.container, args.name)
+    remaining = wait_for_exit(pids, args.timeout)
+    if remaining:
+        syslog.syslog(syslog.LOG_WARNING, "Timed out waiting for %s in %s to exit, pids %s still running" %
+                      (args.name, args.container, ' '.join(str(pid) for pid in remaining)))
+        return EXIT_TIMEOUT
+    return EXIT_SUCCESS
+
+def main():
+    parser = argparse.ArgumentParser(description='Wait for reboot events')
+    subparsers = parser.add_subparsers()
+
+    state_parser = subparsers.add_parser('state', help='wait for a database field to leave some values')
+    state_parser.add_argument('-d', '--db', default='STATE_DB', help='database name (default STATE_DB)')
+    state_parser.add_argument('-k', '--key', required=True, help='key, with its table name')
+    state_parser.add_argument('-f', '--field', required=True, help='field of the key')
+    state_parser.add_argument('-w', '--while-state', action='append', required=True,
+                              help='value to wait on, can be given multiple times')
+    state_parser.add_argument('-t', '--timeout', type=float, default=60, help='timeout in seconds (default 60)')
+    state_parser.set_defaults(func=state_command)
+
+    process_parser = subparsers.add_parser('process', help='wait for the processes of a container to exit')
+    process_parser.add_argument('-c', '--container', required=True, help='container name')
+    process_parser.add_argument('-n', '--name', required=True, help='process name')
+    process_parser.add_argument('-t', '--timeout', type=float, default=60, help='timeout in seconds (default 60)')
+    process_parser.set_defaults(func=process_command)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+if __name__ == '__main__':
+    res = EXIT_SUCCESS
+    try:
+        syslog.openlog('reboot-wait')
+        res = main()
+    except KeyboardInterrupt:
+        syslog.syslog(syslog.LOG_NOTICE, "SIGINT received. Quitting")
+        res = 1
+    except Exception as e:
+        syslog.syslog(syslog.LOG_ERR, "Got an exception %s: Traceback: %s" % (str(e), traceback.format_exc()))
+        res = EXIT_ERROR
+    finally:
+        syslog.closelog()
+    sys.exit(res)
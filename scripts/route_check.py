@@ -4,14 +4,51 @@
 import os
 import sys
 import getopt
-import ipaddress
+import binascii
+import itertools
 import json
+import signal
+import socket
+import time
 from swsssdk import ConfigDBConnector
+from utilities_common.dbutil import enable_keyspace_events, run_pipelined, PIPELINE_BATCH_SIZE
 
 os.environ['PYTHONUNBUFFERED']='True'
 
 PREFIX_SEPARATOR = '/'
 IPV6_SEPARATOR = ':'
+TABLE_SEPARATOR = ':'
+
+ROUTE_TABLE = 'ROUTE_TABLE'
+INTF_TABLE = 'INTF_TABLE'
+ASIC_ROUTE_TABLE = 'ASIC_STATE:SAI_OBJECT_TYPE_ROUTE_ENTRY'
+
+# Number of keys asked to redis per SCAN call
+SCAN_COUNT = 1000
+
+# Daemon mode: seconds a mismatch must last before being reported
+DEFAULT_GRACE_PERIOD = 10
+
+# Prefix of the keyspace notification channels of a database
+KEYSPACE_CHANNEL = '__keyspace@{}__:'
+
+# Keyspace notification events removing a key
+DEL_EVENTS = ('del', 'expired', 'evicted')
+# Keyspace notifications of the generic (del), hash, expired and evicted events
+KEYSPACE_EVENTS = 'Kghxe'
+
+# Mismatch categories, as reported
+MISSED_ROUTE = "missed_ROUTE_TABLE_routes"
+MISSED_INTF = "missed_INTF_TABLE_entries"
+UNACCOUNTED_ENTRY = "Unaccounted_ROUTE_ENTRY_TABLE_entries"
+
+# A prefix is kept as one int: the IPv6 flag, the network address and
+# the prefix length in the low 8 bits
+IPV6_FLAG = 1 << 136
+
+# Owner of the default routes expected in ASIC_DB with --default-routes
+DEFAULT_ROUTE_OWNER = "default route"
+DEFAULT_ROUTES = ['0.0.0.0/0', '::/0']
 
 # Modes of operation from quiet to noisy
 MODE_QUIET = 0
@@ -38,111 +75,265 @@ def print_message(lvl, *args):
         for arg in args:
             print arg
 
-def add_prefix(ip):
+def prefix_to_int(prefix):
+    """
+    Normalize an IPv4/IPv6 address or prefix into its int representation.
+    The host bits are cleared, addresses get a full length prefix.
+    """
+    ip, _, prefix_len = prefix.partition(PREFIX_SEPARATOR)
     if ip.find(IPV6_SEPARATOR) == -1:
-        ip = ip + PREFIX_SEPARATOR + "32"
+        family, width, flag = socket.AF_INET, 32, 0
     else:
-        ip = ip + PREFIX_SEPARATOR + "128"
-    return ip
-
-def add_prefix_ifnot(ip):
-    return ip if ip.find(PREFIX_SEPARATOR) != -1 else add_prefix(ip)
-
-def ip_subnet(ip):
-    if ip.find(":") == -1:
-        net = ipaddress.IPv4Network(ip, False)
+        family, width, flag = socket.AF_INET6, 128, IPV6_FLAG
+    prefix_len = int(prefix_len) if prefix_len else width
+    addr = int(binascii.hexlify(socket.inet_pton(family, ip)), 16)
+    addr &= ((1 << width) - 1) ^ ((1 << (width - prefix_len)) - 1)
+    return flag | (addr << 8) | prefix_len
+
+def route_key_prefix(key):
+    """
+    Returns the int representation of the prefix of a ROUTE_TABLE key, or
+    None when the key is not a plain prefix (e.g. VRF-scoped 'Vrf1:10.0.0.0/24')
+    """
+    try:
+        return prefix_to_int(key)
+    except (socket.error, ValueError):
+        return None
+
+def int_to_prefix(value):
+    """
+    Format the int representation of a prefix back into a string
+    """
+    prefix_len = value & 0xff
+    addr = (value >> 8) & ((1 << 128) - 1)
+    if value & IPV6_FLAG:
+        family, width = socket.AF_INET6, 128
     else:
-        net = ipaddress.IPv6Network(ip, False)
-    return net.with_prefixlen
-
-def cmps(s1, s2):
-    if (s1 == s2):
-        return 0
-    if (s1 < s2):
-        return -1
-    return 1
+        family, width = socket.AF_INET, 32
+    packed = binascii.unhexlify('%0*x' % (width / 4, addr))
+    return socket.inet_ntop(family, packed) + PREFIX_SEPARATOR + str(prefix_len)
+
+def format_prefixes(prefixes):
+    return [int_to_prefix(prefix) for prefix in sorted(prefixes)]
+
+class PrefixTrie(object):
+    """
+    Binary trie of IPv4 and IPv6 prefix ints, each prefix holding a list of
+    owners. Lookups walk at most the prefix length bits.
+    """
+
+    # Node slots
+    ZERO = 0
+    ONE = 1
+    OWNERS = 2
+
+    def __init__(self):
+        self.roots = {0: [None, None, None], IPV6_FLAG: [None, None, None]}
+
+    def _walk(self, prefix, create=False):
+        """
+        Yield the nodes from the root to the node of prefix, stopping at the
+        first missing one unless create
+        """
+        prefix_len = prefix & 0xff
+        width = 128 if prefix & IPV6_FLAG else 32
+        addr = (prefix >> 8) & ((1 << 128) - 1)
+        node = self.roots[prefix & IPV6_FLAG]
+        yield node
+        for bit in range(width - 1, width - 1 - prefix_len, -1):
+            branch = (addr >> bit) & 1
+            if node[branch] is None:
+                if not create:
+                    return
+                node[branch] = [None, None, None]
+            node = node[branch]
+            yield node
+
+    def _node(self, prefix, create=False):
+        depth = -1
+        for depth, node in enumerate(self._walk(prefix, create)):
+            pass
+        return node if depth == prefix & 0xff else None
+
+    def add(self, prefix, owner):
+        node = self._node(prefix, create=True)
+        if node[self.OWNERS] is None:
+            node[self.OWNERS] = []
+        node[self.OWNERS].append(owner)
+
+    def remove(self, prefix, owner):
+        node = self._node(prefix)
+        if node is not None and node[self.OWNERS] and owner in node[self.OWNERS]:
+            node[self.OWNERS].remove(owner)
+
+    def get(self, prefix):
+        """
+        Return the owners of prefix, empty if it is not in the trie
+        """
+        node = self._node(prefix)
+        if node is None or not node[self.OWNERS]:
+            return []
+        return list(node[self.OWNERS])
+
+    def longest_match(self, prefix):
+        """
+        Return the longest prefix of the trie covering prefix and its owners,
+        (None, []) if there is none
+        """
+        width = 128 if prefix & IPV6_FLAG else 32
+        addr = (prefix >> 8) & ((1 << 128) - 1)
+        match = (None, [])
+        for depth, node in enumerate(self._walk(prefix)):
+            if node[self.OWNERS]:
+                mask = ((1 << width) - 1) ^ ((1 << (width - depth)) - 1)
+                match = ((prefix & IPV6_FLAG) | ((addr & mask) << 8) | depth, list(node[self.OWNERS]))
+        return match
+
+    def items(self):
+        """
+        Yield the (prefix, owners) of the trie
+        """
+        for flag, root in self.roots.items():
+            width = 128 if flag else 32
+            stack = [(root, 0, 0)]
+            while stack:
+                node, addr, depth = stack.pop()
+                if node[self.OWNERS]:
+                    yield flag | ((addr << (width - depth)) << 8) | depth, list(node[self.OWNERS])
+                for branch in (self.ONE, self.ZERO):
+                    if node[branch] is not None:
+                        stack.append((node[branch], (addr << 1) | branch, depth + 1))
+
+def is_required(owners):
+    """
+    Return whether an ASIC route entry must exist for a prefix of these owners
+    """
+    return any(owner != DEFAULT_ROUTE_OWNER for owner in owners)
+
+def format_owners(prefix_owners):
+    return dict((int_to_prefix(prefix), ", ".join(owners)) for prefix, owners in prefix_owners.items())
 
 def do_diff(t1, t2):
-    t1_x = t2_x = 0
-    t1_miss = []
-    t2_miss = []
-    t1_len = len(t1);
-    t2_len = len(t2);
-    while t1_x < t1_len and t2_x < t2_len:
-        d = cmps(t1[t1_x], t2[t2_x])
-        if (d == 0):
-            t1_x += 1
-            t2_x += 1
-        elif (d < 0):
-            t1_miss.append(t1[t1_x])
-            t1_x += 1
-        else:
-            t2_miss.append(t2[t2_x])
-            t2_x += 1
-
-    while t1_x < t1_len:
-        t1_miss.append(t1[t1_x])
-        t1_x += 1
-
-    while t2_x < t2_len:
-        t2_miss.append(t2[t2_x])
-        t2_x += 1
-    return t1_miss, t2_miss
+    """
+    Return the entries of the set t1 missing in the set t2 and
+    the entries of t2 missing in t1
+    """
+    return t1 - t2, t2 - t1
 
-
-def get_routes():
+def connect_db(db_name):
     db = ConfigDBConnector()
-    db.db_connect('APPL_DB')
-    print_message(MODE_DEBUG, "APPL DB connected for routes")
-    keys = db.get_keys('ROUTE_TABLE')
-    print_message(MODE_DEBUG, json.dumps({"ROUTE_TABLE": keys}, indent=4))
-
-    valid_rt = []
+    db.db_connect(db_name)
+    print_message(MODE_DEBUG, "{} connected".format(db_name))
+    return db.get_redis_client(db_name)
+
+def scan_keys(client, table):
+    """
+    Stream the keys of table, without the table name, with SCAN
+    """
+    table_prefix = table + TABLE_SEPARATOR
+    for key in client.scan_iter(match=table_prefix + '*', count=SCAN_COUNT):
+        yield key[len(table_prefix):]
+
+def iter_batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def get_routes(client):
+    """
+    Get the routes of APPL_DB with a nexthop, as a set of prefix ints
+    """
+    valid_rt = set()
     skip_rt = []
-    for k in keys:
-        if db.get_entry('ROUTE_TABLE', k)['nexthop'] != '':
-            valid_rt.append(add_prefix_ifnot(k))
-        else:
-            skip_rt.append(k)
-
+    all_keys = []
+    for keys in iter_batches(scan_keys(client, ROUTE_TABLE), PIPELINE_BATCH_SIZE):
+        if mode >= MODE_DEBUG:
+            all_keys.extend(keys)
+        nexthops = run_pipelined(client, keys,
+                                 lambda pipe, key: pipe.hget(ROUTE_TABLE + TABLE_SEPARATOR + key, 'nexthop'))
+        for k, nexthop in zip(keys, nexthops):
+            prefix = route_key_prefix(k) if nexthop else None
+            if prefix is not None:
+                valid_rt.add(prefix)
+            else:
+                skip_rt.append(k)
+
+    print_message(MODE_DEBUG, json.dumps({"ROUTE_TABLE": all_keys}, indent=4))
     print_message(MODE_INFO, json.dumps({"skipped_routes" : skip_rt}, indent=4))
-    return sorted(valid_rt)
-
-def get_route_entries():
-    db = ConfigDBConnector()
-    db.db_connect('ASIC_DB')
-    print_message(MODE_DEBUG, "ASIC DB connected")
-    keys = db.get_keys('ASIC_STATE:SAI_OBJECT_TYPE_ROUTE_ENTRY', False)
-    print_message(MODE_DEBUG, json.dumps({"ASIC_ROUTE_ENTRY": keys}, indent=4))
-
-    rt = []
-    for k in keys:
-        rt.append(k.split("\"", -1)[3])
-    return sorted(rt)
-
+    return valid_rt
+
+def route_entry_prefix(k):
+    """
+    Get the destination of an ASIC route entry key, as a prefix int
+    """
+    return prefix_to_int(k.split("\"", -1)[3])
+
+def get_route_entries(client):
+    """
+    Get the routes of ASIC_DB, as a set of prefix ints
+    """
+    rt = set()
+    all_keys = []
+    for k in scan_keys(client, ASIC_ROUTE_TABLE):
+        if mode >= MODE_DEBUG:
+            all_keys.append(k)
+        rt.add(route_entry_prefix(k))
+
+    print_message(MODE_DEBUG, json.dumps({"ASIC_ROUTE_ENTRY": all_keys}, indent=4))
+    return rt
+
+def interface_prefixes(k):
+    """
+    Get the address and the subnet of an INTF_TABLE key, as a list of
+    (prefix int, owner)
+    """
+    subk = k.split(':', -1)
+    if len(subk) < 2 or (subk[0] == "eth0") or (subk[0] == "docker0"):
+        return []
+    ip_prefix = ":".join(subk[1:])
+    prefixes = [(prefix_to_int(ip_prefix.split(PREFIX_SEPARATOR, -1)[0]), subk[0] + " address")]
+    if (subk[0] != "lo"):
+        prefixes.append((prefix_to_int(ip_prefix), subk[0] + " subnet"))
+    return prefixes
+
+def get_interfaces(client, default_routes=False):
+    """
+    Get the subnets and the addresses of the interfaces of APPL_DB, and the
+    default routes if default_routes, as a PrefixTrie
+    """
+    intf = PrefixTrie()
+    all_keys = []
+    for k in scan_keys(client, INTF_TABLE):
+        if mode >= MODE_DEBUG:
+            all_keys.append(k)
+        for prefix, owner in interface_prefixes(k):
+            intf.add(prefix, owner)
+    if default_routes:
+        for prefix in DEFAULT_ROUTES:
+            intf.add(prefix_to_int(prefix), DEFAULT_ROUTE_OWNER)
+
+    print_message(MODE_DEBUG, json.dumps({"APPL_DB_INTF": all_keys}, indent=4))
+    return intf
+
+def account_route_entries(intf, re_miss):
+    """
+    Split the ASIC route entries missing in APPL_DB into the ones explained by
+    the interfaces, as a dict of prefix -> owners, and the unaccounted ones
+    """
+    accounted = {}
+    unaccounted = set()
+    for prefix in re_miss:
+        owners = intf.get(prefix)
+        if owners:
+            accounted[prefix] = owners
+        else:
+            unaccounted.add(prefix)
+    return accounted, unaccounted
 
-def get_interfaces():
-    db = ConfigDBConnector()
-    db.db_connect('APPL_DB')
-    print_message(MODE_DEBUG, "APPL DB connected for interfaces")
-
-    intf = []
-    keys = db.get_keys('INTF_TABLE')
-    print_message(MODE_DEBUG, json.dumps({"APPL_DB_INTF": keys}, indent=4))
-
-    for k in keys:
-        subk = k.split(':', -1)
-        alias = subk[0]
-        ip_prefix = ":".join(subk[1:])
-        ip = add_prefix(ip_prefix.split("/", -1)[0])
-        if (subk[0] == "eth0") or (subk[0] == "docker0"):
-            continue
-        if (subk[0] != "lo"):
-            intf.append(ip_subnet(ip_prefix))
-        intf.append(ip)
-    return sorted(intf)
-
-def check_routes():
+def check_routes(default_routes=False):
     intf_miss = []
     rt_miss = []
     re_miss = []
@@ -150,19 +341,33 @@ def check_routes():
     results = {}
     err_present = False
 
-    rt_miss, re_miss = do_diff(get_routes(), get_route_entries())
-    intf_miss, re_miss = do_diff(get_interfaces(), re_miss)
+    appl_db = connect_db('APPL_DB')
+    asic_db = connect_db('ASIC_DB')
+
+    rt_miss, re_miss = do_diff(get_routes(appl_db), get_route_entries(asic_db))
+    intf = get_interfaces(appl_db, default_routes)
+    intf_miss = set(prefix for prefix, owners in intf.items() if is_required(owners) and prefix not in re_miss)
+    accounted, re_miss = account_route_entries(intf, re_miss)
+
+    print_message(MODE_INFO, json.dumps({"accounted_ROUTE_ENTRY_TABLE_entries": format_owners(accounted)}, indent=4))
+    covered = {}
+    for prefix in re_miss:
+        subnet, owners = intf.longest_match(prefix)
+        if subnet is not None:
+            covered[prefix] = ["{} of {}".format(owner, int_to_prefix(subnet)) for owner in owners]
+    if covered:
+        print_message(MODE_INFO, json.dumps({"Unaccounted_ROUTE_ENTRY_TABLE_entries_covered_by": format_owners(covered)}, indent=4))
 
     if (len(rt_miss) != 0):
-        results["missed_ROUTE_TABLE_routes"] = rt_miss
+        results[MISSED_ROUTE] = format_prefixes(rt_miss)
         err_present = True
 
     if (len(intf_miss) != 0):
-        results["missed_INTF_TABLE_entries"] = intf_miss
+        results[MISSED_INTF] = format_prefixes(intf_miss)
         err_present = True
 
     if (len(re_miss) != 0):
-        results["Unaccounted_ROUTE_ENTRY_TABLE_entries"] = re_miss
+        results[UNACCOUNTED_ENTRY] = format_prefixes(re_miss)
         err_present = True
 
     if err_present:
@@ -173,22 +378,266 @@ def check_routes():
         print_message(MODE_ERR, "All good!")
         return 0
 
+class RouteMonitor(object):
+    """
+    Keep the diff of APPL_DB and ASIC_DB routes up to date from keyspace
+    notifications, after one full baseline, and report the mismatches
+    lasting longer than the grace period.
+    """
+
+    def __init__(self, appl_db, asic_db, grace_period=DEFAULT_GRACE_PERIOD, default_routes=False):
+        self.appl_db = appl_db
+        self.asic_db = asic_db
+        self.grace_period = grace_period
+        self.default_routes = default_routes
+        self.routes = set()
+        self.entries = set()
+        # INTF_TABLE key -> its (prefix, owner) list
+        self.intf_keys = {}
+        self.intf = PrefixTrie()
+        # prefix -> [categories, time first seen, reported]
+        self.mismatches = {}
+        self.appl_db_id = appl_db.connection_pool.connection_kwargs['db']
+        self.asic_db_id = asic_db.connection_pool.connection_kwargs['db']
+        self.pubsub = None
+        # (client, notify-keyspace-events before subscribe) to restore
+        self.keyspace_events = []
+
+    def subscribe(self):
+        """
+        Subscribe to the notifications of both databases on one connection,
+        to block on a single one: the keyspace channels are global to the
+        redis server holding APPL_DB and ASIC_DB
+        """
+        patterns = []
+        for client, db_id, tables in [(self.appl_db, self.appl_db_id, [ROUTE_TABLE, INTF_TABLE]),
+                                      (self.asic_db, self.asic_db_id, [ASIC_ROUTE_TABLE])]:
+            keyspace_events = enable_keyspace_events(client, KEYSPACE_EVENTS)
+            if keyspace_events is not None:
+                self.keyspace_events.append((client, keyspace_events))
+            patterns.extend(KEYSPACE_CHANNEL.format(db_id) + table + TABLE_SEPARATOR + '*' for table in tables)
+        self.pubsub = self.appl_db.pubsub()
+        self.pubsub.psubscribe(*patterns)
+
+    def unsubscribe(self):
+        if self.pubsub is not None:
+            self.pubsub.close()
+        # In reverse order, in case both databases share the server
+        while self.keyspace_events:
+            client, keyspace_events = self.keyspace_events.pop()
+            client.config_set('notify-keyspace-events', keyspace_events)
+
+    def load_baseline(self, now):
+        """
+        Read all the routes and interfaces. Notifications received meanwhile
+        are applied afterwards, they re-read the state of their keys.
+        """
+        self.routes = get_routes(self.appl_db)
+        self.entries = get_route_entries(self.asic_db)
+        self.intf_keys = {}
+        self.intf = PrefixTrie()
+        for k in scan_keys(self.appl_db, INTF_TABLE):
+            self.add_interface(k)
+        if self.default_routes:
+            for prefix in DEFAULT_ROUTES:
+                self.intf.add(prefix_to_int(prefix), DEFAULT_ROUTE_OWNER)
+
+        self.mismatches = {}
+        rt_miss, re_miss = do_diff(self.routes, self.entries)
+        for prefix in rt_miss | re_miss | set(prefix for prefix, owners in self.intf.items()):
+            self.update(prefix, now)
+
+    def add_interface(self, k):
+        if k in self.intf_keys:
+            return []
+        prefixes = self.intf_keys[k] = interface_prefixes(k)
+        for prefix, owner in prefixes:
+            self.intf.add(prefix, owner)
+        return [prefix for prefix, owner in prefixes]
+
+    def remove_interface(self, k):
+        prefixes = self.intf_keys.pop(k, [])
+        for prefix, owner in prefixes:
+            self.intf.remove(prefix, owner)
+        return [prefix for prefix, owner in prefixes]
+
+    def classify(self, prefix):
+        """
+        Return the mismatch categories of prefix, as check_routes() reports them
+        """
+        in_rt = prefix in self.routes
+        in_re = prefix in self.entries
+        owners = self.intf.get(prefix)
+        categories = []
+        if in_rt and not in_re:
+            categories.append(MISSED_ROUTE)
+        if owners:
+            if is_required(owners) and (not in_re or in_rt):
+                categories.append(MISSED_INTF)
+        elif in_re and not in_rt:
+            categories.append(UNACCOUNTED_ENTRY)
+        return tuple(categories)
+
+    def update(self, prefix, now):
+        categories = self.classify(prefix)
+        mismatch = self.mismatches.get(prefix)
+        if not categories:
+            if mismatch is not None:
+                del self.mismatches[prefix]
+                if mismatch[2]:
+                    print_message(MODE_INFO, json.dumps({"resolved": int_to_prefix(prefix)}))
+        elif mismatch is None or mismatch[0] != categories:
+            self.mismatches[prefix] = [categories, now, False]
+
+    def drain(self, timeout=0):
+        """
+        Get the (key, event) of the pending notifications, by database id,
+        waiting up to timeout seconds for the first one
+        """
+        events = {self.appl_db_id: [], self.asic_db_id: []}
+        message = self.pubsub.get_message(timeout=timeout)
+        while message is not None:
+            if message['type'] == 'pmessage':
+                # __keyspace@<db id>__:<key>
+                channel, _, key = message['channel'].partition(':')
+                events[int(channel[channel.index('@') + 1:-2])].append((key, message['data']))
+            message = self.pubsub.get_message()
+        return events
+
+    def handle_events(self, now, events=None):
+        """
+        Apply the notifications got by drain, the pending ones by default.
+        Returns the number of notifications
+        """
+        changed = set()
+        route_keys = set()
+
+        if events is None:
+            events = self.drain()
+        appl_events = events[self.appl_db_id]
+        for key, event in appl_events:
+            table, _, k = key.partition(TABLE_SEPARATOR)
+            if table == ROUTE_TABLE:
+                route_keys.add(k)
+            elif table == INTF_TABLE:
+                if event in DEL_EVENTS:
+                    changed.update(self.remove_interface(k))
+                else:
+                    changed.update(self.add_interface(k))
+
+        route_keys = list(route_keys)
+        nexthops = run_pipelined(self.appl_db, route_keys,
+                                 lambda pipe, key: pipe.hget(ROUTE_TABLE + TABLE_SEPARATOR + key, 'nexthop'))
+        for k, nexthop in zip(route_keys, nexthops):
+            prefix = route_key_prefix(k)
+            if prefix is None:
+                # VRF routes are not checked
+                continue
+            if nexthop:
+                self.routes.add(prefix)
+            else:
+                self.routes.discard(prefix)
+            changed.add(prefix)
+
+        asic_events = events[self.asic_db_id]
+        for key, event in asic_events:
+            prefix = route_entry_prefix(key)
+            if event in DEL_EVENTS:
+                self.entries.discard(prefix)
+            else:
+                self.entries.add(prefix)
+            changed.add(prefix)
+
+        for prefix in changed:
+            self.update(prefix, now)
+        return len(appl_events) + len(asic_events)
+
+    def report(self, now):
+        """
+        Report the mismatches older than the grace period, once
+        """
+        results = {}
+        for prefix, mismatch in self.mismatches.iteritems():
+            if mismatch[2] or now - mismatch[1] < self.grace_period:
+                continue
+            mismatch[2] = True
+            for category in mismatch[0]:
+                results.setdefault(category, []).append(prefix)
+
+        if results:
+            for category in results:
+                results[category] = format_prefixes(results[category])
+            print_message(MODE_ERR, "results: {",  json.dumps(results, indent=4), "}")
+        return results
+
+    def wait_time(self, now):
+        """
+        Seconds until the next mismatch to report, or the grace period
+        """
+        deadlines = [mismatch[1] + self.grace_period for mismatch in self.mismatches.itervalues() if not mismatch[2]]
+        return max(min(deadlines) - now, 0) if deadlines else self.grace_period
+
+    def run(self):
+        try:
+            self.subscribe()
+            self.load_baseline(time.time())
+            print_message(MODE_INFO, "Baseline loaded, {} mismatches".format(len(self.mismatches)))
+            while True:
+                events = self.drain(self.wait_time(time.time()))
+                now = time.time()
+                self.handle_events(now, events)
+                self.report(now)
+        finally:
+            self.unsubscribe()
+
+def raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+def monitor_routes(grace_period, default_routes=False):
+    monitor = RouteMonitor(connect_db('APPL_DB'), connect_db('ASIC_DB'), grace_period, default_routes)
+    # Stop on SIGTERM as on SIGINT, so that the keyspace notifications
+    # settings are restored on the way out
+    sigterm_handler = signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, sigterm_handler)
+    return 0
+
 def usage():
-    print sys.argv[0], "[-m <QUIET|ERR|INFO|DEBUG>]"
-    print sys.argv[0], "[--mode=<QUIET|ERR|INFO|DEBUG>]"
+    print sys.argv[0], "[-m <QUIET|ERR|INFO|DEBUG>] [-r] [-d [-g <grace period>]]"
+    print sys.argv[0], "[--mode=<QUIET|ERR|INFO|DEBUG>] [--default-routes] [--daemon [--grace-period=<seconds>]]"
     sys.exit(-1)
 
 def main(argv):
+    daemon = False
+    default_routes = False
+    grace_period = DEFAULT_GRACE_PERIOD
+
     try:
-        opts, argv = getopt.getopt(argv, "m:", ["mode="])
+        opts, argv = getopt.getopt(argv, "m:rdg:", ["mode=", "default-routes", "daemon", "grace-period="])
     except getopt.GetoptError:
         usage()
 
     for opt, arg in opts:
         if opt in ("-m", "--mode"):
             set_mode(arg)
-
-    ret = check_routes()
+        elif opt in ("-r", "--default-routes"):
+            default_routes = True
+        elif opt in ("-d", "--daemon"):
+            daemon = True
+        elif opt in ("-g", "--grace-period"):
+            try:
+                grace_period = float(arg)
+            except ValueError:
+                usage()
+
+    if daemon:
+        ret = monitor_routes(grace_period, default_routes)
+    else:
+        ret = check_routes(default_routes)
     sys.exit(ret)
 
 
@@ -30,6 +30,7 @@ setup(
     packages=[
         'acl_loader',
         'clear',
+        'cli_server',
         'config',
         'connect',
         'consutil',
@@ -82,6 +83,7 @@ setup(
         'scripts/psushow',
         'scripts/queuestat',
         'scripts/reboot',
+        'scripts/reboot-wait.py',
         'scripts/route_check.py',
         'scripts/route_check_test.sh',
         'scripts/sfpshow',
@@ -96,7 +98,7 @@ setup(
     entry_points={
         'console_scripts': [
             'acl-loader = acl_loader.main:cli',
-            'config = config.main:config',
+            'config = cli_server.client:config',
             'connect = connect.main:connect',
             'consutil = consutil.main:consutil',
             'counterpoll = counterpoll.main:cli',
@@ -107,8 +109,9 @@ setup(
             'ssdutil = ssdutil.main:ssdutil',
             'pfc = pfc.main:cli',
             'psuutil = psuutil.main:cli',
-            'show = show.main:cli',
-            'sonic-clear = clear.main:cli',
+            'show = cli_server.client:show',
+            'sonic-cli-server = cli_server.main:main',
+            'sonic-clear = cli_server.client:sonic_clear',
             'sonic_installer = sonic_installer.main:cli',
             'undebug = undebug.main:cli',
         ]
@@ -19,11 +19,13 @@ from swsssdk import ConfigDBConnector
 from swsssdk import SonicV2Connector
 
 import mlnx
+from utilities_common.dispatch import run_script_in_process
+from utilities_common.interface_alias import InterfaceAliasConverter, TEAMSHOW_CONTEXT, VLAN_SUB_INTERFACE_SEPARATOR
+from utilities_common.reboot_timeline import REBOOT_TIMELINE_FILE, read_timeline
+from utilities_common.routing_stack import RoutingStackGroupMixin
 
 SONIC_CFGGEN_PATH = '/usr/local/bin/sonic-cfggen'
 
-VLAN_SUB_INTERFACE_SEPARATOR = '.'
-
 try:
     # noinspection PyPep8Naming
     import ConfigParser as configparser
@@ -49,70 +51,6 @@ class Config(object):
         except configparser.NoSectionError:
             pass
 
-class InterfaceAliasConverter(object):
-    """Class which handles conversion between interface name and alias"""
-
-    def __init__(self):
-        self.alias_max_length = 0
-
-        config_db = ConfigDBConnector()
-        config_db.connect()
-        self.port_dict = config_db.get_table('PORT')
-
-        if not self.port_dict:
-            click.echo(message="Warning: failed to retrieve PORT table from ConfigDB!", err=True)
-            self.port_dict = {}
-
-        for port_name in self.port_dict.keys():
-            try:
-                if self.alias_max_length < len(
-                        self.port_dict[port_name]['alias']):
-                   self.alias_max_length = len(
-                        self.port_dict[port_name]['alias'])
-            except KeyError:
-                break
-
-    def name_to_alias(self, interface_name):
-        """Return vendor interface alias if SONiC
-           interface name is given as argument
-        """
-        vlan_id = ''
-        sub_intf_sep_idx = -1
-        if interface_name is not None:
-            sub_intf_sep_idx = interface_name.find(VLAN_SUB_INTERFACE_SEPARATOR)
-            if sub_intf_sep_idx != -1:
-                vlan_id = interface_name[sub_intf_sep_idx + 1:]
-                # interface_name holds the parent port name
-                interface_name = interface_name[:sub_intf_sep_idx]
-
-            for port_name in self.port_dict.keys():
-                if interface_name == port_name:
-                    return self.port_dict[port_name]['alias'] if sub_intf_sep_idx == -1 \
-                            else self.port_dict[port_name]['alias'] + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
-
-        # interface_name not in port_dict. Just return interface_name
-        return interface_name if sub_intf_sep_idx == -1 else interface_name + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
-
-    def alias_to_name(self, interface_alias):
-        """Return SONiC interface name if vendor
-           port alias is given as argument
-        """
-        vlan_id = ''
-        sub_intf_sep_idx = -1
-        if interface_alias is not None:
-            sub_intf_sep_idx = interface_alias.find(VLAN_SUB_INTERFACE_SEPARATOR)
-            if sub_intf_sep_idx != -1:
-                vlan_id = interface_alias[sub_intf_sep_idx + 1:]
-                # interface_alias holds the parent port alias
-                interface_alias = interface_alias[:sub_intf_sep_idx]
-
-            for port_name in self.port_dict.keys():
-                if interface_alias == self.port_dict[port_name]['alias']:
-                    return port_name if sub_intf_sep_idx == -1 else port_name + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
-
-        # interface_alias not in port_dict. Just return interface_alias
-        return interface_alias if sub_intf_sep_idx == -1 else interface_alias + VLAN_SUB_INTERFACE_SEPARATOR + vlan_id
-
 
 # Global Config object
 _config = None
@@ -163,29 +101,8 @@ class AliasedGroup(DefaultGroup):
         ctx.fail('Too many matches: %s' % ', '.join(sorted(matches)))
 
 
-# To be enhanced. Routing-stack information should be collected from a global
-# location (configdb?), so that we prevent the continous execution of this
-# bash oneliner. To be revisited once routing-stack info is tracked somewhere.
-def get_routing_stack():
-    command = "sudo docker ps | grep bgp | awk '{print$2}' | cut -d'-' -f3 | cut -d':' -f1"
-
-    try:
-        proc = subprocess.Popen(command,
-                                stdout=subprocess.PIPE,
-                                shell=True,
-                                stderr=subprocess.STDOUT)
-        stdout = proc.communicate()[0]
-        proc.wait()
-        result = stdout.rstrip('\n')
-
-    except OSError, e:
-        raise OSError("Cannot detect routing-stack")
-
-    return (result)
-
-
-# Global Routing-Stack variable
-routing_stack = get_routing_stack()
+class RoutingStackGroup(RoutingStackGroupMixin, AliasedGroup):
+    """AliasedGroup holding subcommands which depend on the routing stack"""
 
 
 def run_command(command, display_cmd=False):
@@ -198,16 +115,20 @@ def run_command(command, display_cmd=False):
         run_command_in_alias_mode(command)
         raise sys.exit(0)
 
-    proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE)
+    # Scripts of this package are run in-process, everything else by the shell
+    rc = run_script_in_process(command)
+    if rc is None:
+        proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE)
 
-    while True:
-        output = proc.stdout.readline()
-        if output == "" and proc.poll() is not None:
-            break
-        if output:
-            click.echo(output.rstrip('\n'))
+        while True:
+            output = proc.stdout.readline()
+            if output == "" and proc.poll() is not None:
+                break
+            if output:
+                click.echo(output.rstrip('\n'))
+
+        rc = proc.poll()
 
-    rc = proc.poll()
     if rc != 0:
         sys.exit(rc)
 
@@ -254,9 +175,7 @@ def print_output_in_alias_mode(output, index):
     if word:
         interface_name = word[index]
         interface_name = interface_name.replace(':', '')
-    for port_name in natsorted(iface_alias_converter.port_dict.keys()):
-            if interface_name == port_name:
-                alias_name = iface_alias_converter.port_dict[port_name]['alias']
+        alias_name = iface_alias_converter.get_alias(interface_name)
     if alias_name:
         if len(alias_name) < iface_alias_converter.alias_max_length:
             alias_name = alias_name.rjust(
@@ -271,124 +190,124 @@ def run_command_in_alias_mode(command):
        in output with vendor-sepecific interface aliases.
     """
 
-    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE)
+    def process_output(output):
+        if not output:
+            return
 
-    while True:
-        output = process.stdout.readline()
-        if output == '' and process.poll() is not None:
-            break
-
-        if output:
-            index = 1
-            raw_output = output
-            output = output.lstrip()
-
-            if command.startswith("portstat"):
-                """Show interface counters"""
-                index = 0
-                if output.startswith("IFACE"):
-                    output = output.replace("IFACE", "IFACE".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command.startswith("intfstat"):
-                """Show RIF counters"""
-                index = 0
-                if output.startswith("IFACE"):
-                    output = output.replace("IFACE", "IFACE".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command == "pfcstat":
-                """Show pfc counters"""
-                index = 0
-                if output.startswith("Port Tx"):
-                    output = output.replace("Port Tx", "Port Tx".rjust(
-                                iface_alias_converter.alias_max_length))
-
-                elif output.startswith("Port Rx"):
-                    output = output.replace("Port Rx", "Port Rx".rjust(
-                                iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif (command.startswith("sudo sfputil show eeprom")):
-                """show interface transceiver eeprom"""
-                index = 0
-                print_output_in_alias_mode(raw_output, index)
-
-            elif (command.startswith("sudo sfputil show")):
-                """show interface transceiver lpmode,
-                   presence
-                """
-                index = 0
-                if output.startswith("Port"):
-                    output = output.replace("Port", "Port".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command == "sudo lldpshow":
-                """show lldp table"""
-                index = 0
-                if output.startswith("LocalPort"):
-                    output = output.replace("LocalPort", "LocalPort".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command.startswith("queuestat"):
-                """show queue counters"""
-                index = 0
-                if output.startswith("Port"):
-                    output = output.replace("Port", "Port".rjust(
-                               iface_alias_converter.alias_max_length))
-                print_output_in_alias_mode(output, index)
-
-            elif command == "fdbshow":
-                """show mac"""
-                index = 3
-                if output.startswith("No."):
-                    output = "  " + output
-                    output = re.sub(
-                                'Type', '      Type', output)
-                elif output[0].isdigit():
-                    output = "    " + output
-                print_output_in_alias_mode(output, index)
-
-            elif command.startswith("nbrshow"):
-                """show arp"""
-                index = 2
-                if "Vlan" in output:
-                    output = output.replace('Vlan', '  Vlan')
-                print_output_in_alias_mode(output, index)
-
-            elif command.startswith("sudo teamshow"):
-                """
-                sudo teamshow
-                Search for port names either at the start of a line or preceded immediately by
-                whitespace and followed immediately by either the end of a line or whitespace
-                OR followed immediately by '(D)', '(S)', '(D*)' or '(S*)'
-                """
-                converted_output = raw_output
-                for port_name in iface_alias_converter.port_dict.keys():
-                    converted_output = re.sub(r"(^|\s){}(\([DS]\*{{0,1}}\)(?:$|\s))".format(port_name),
-                            r"\1{}\2".format(iface_alias_converter.name_to_alias(port_name)),
-                            converted_output)
-                click.echo(converted_output.rstrip('\n'))
+        index = 1
+        raw_output = output
+        output = output.lstrip()
+
+        if command.startswith("portstat"):
+            """Show interface counters"""
+            index = 0
+            if output.startswith("IFACE"):
+                output = output.replace("IFACE", "IFACE".rjust(
+                           iface_alias_converter.alias_max_length))
+            print_output_in_alias_mode(output, index)
+
+        elif command.startswith("intfstat"):
+            """Show RIF counters"""
+            index = 0
+            if output.startswith("IFACE"):
+                output = output.replace("IFACE", "IFACE".rjust(
+                           iface_alias_converter.alias_max_length))
+            print_output_in_alias_mode(output, index)
+
+        elif command == "pfcstat":
+            """Show pfc counters"""
+            index = 0
+            if output.startswith("Port Tx"):
+                output = output.replace("Port Tx", "Port Tx".rjust(
+                            iface_alias_converter.alias_max_length))
+
+            elif output.startswith("Port Rx"):
+                output = output.replace("Port Rx", "Port Rx".rjust(
+                            iface_alias_converter.alias_max_length))
+            print_output_in_alias_mode(output, index)
+
+        elif (command.startswith("sudo sfputil show eeprom")):
+            """show interface transceiver eeprom"""
+            index = 0
+            print_output_in_alias_mode(raw_output, index)
+
+        elif (command.startswith("sudo sfputil show")):
+            """show interface transceiver lpmode,
+               presence
+            """
+            index = 0
+            if output.startswith("Port"):
+                output = output.replace("Port", "Port".rjust(
+                           iface_alias_converter.alias_max_length))
+            print_output_in_alias_mode(output, index)
+
+        elif command == "sudo lldpshow":
+            """show lldp table"""
+            index = 0
+            if output.startswith("LocalPort"):
+                output = output.replace("LocalPort", "LocalPort".rjust(
+                           iface_alias_converter.alias_max_length))
+            print_output_in_alias_mode(output, index)
+
+        elif command.startswith("queuestat"):
+            """show queue counters"""
+            index = 0
+            if output.startswith("Port"):
+                output = output.replace("Port", "Port".rjust(
+                           iface_alias_converter.alias_max_length))
+            print_output_in_alias_mode(output, index)
+
+        elif command == "fdbshow":
+            """show mac"""
+            index = 3
+            if output.startswith("No."):
+                output = "  " + output
+                output = re.sub(
+                            'Type', '      Type', output)
+            elif output[0].isdigit():
+                output = "    " + output
+            print_output_in_alias_mode(output, index)
+
+        elif command.startswith("nbrshow"):
+            """show arp"""
+            index = 2
+            if "Vlan" in output:
+                output = output.replace('Vlan', '  Vlan')
+            print_output_in_alias_mode(output, index)
+
+        elif command.startswith("sudo teamshow"):
+            """
+            sudo teamshow
+            Search for port names either at the start of a line or preceded immediately by
+            whitespace and followed immediately by either the end of a line or whitespace
+            OR followed immediately by '(D)', '(S)', '(D*)' or '(S*)'
+            """
+            converted_output = iface_alias_converter.get_rewriter(TEAMSHOW_CONTEXT).rewrite(raw_output)
+            click.echo(converted_output.rstrip('\n'))
+
+        else:
+            """
+            Default command conversion
+            Search for port names either at the start of a line or preceded immediately by
+            whitespace and followed immediately by either the end of a line or whitespace
+            or a comma followed by whitespace
+            """
+            converted_output = iface_alias_converter.get_rewriter().rewrite(raw_output)
+            click.echo(converted_output.rstrip('\n'))
+
+    # Scripts of this package are run in-process, everything else by the shell
+    rc = run_script_in_process(command, process_output)
+    if rc is None:
+        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE)
+
+        while True:
+            output = process.stdout.readline()
+            if output == '' and process.poll() is not None:
+                break
+            process_output(output)
+
+        rc = process.poll()
 
-            else:
-                """
-                Default command conversion
-                Search for port names either at the start of a line or preceded immediately by
-                whitespace and followed immediately by either the end of a line or whitespace
-                or a comma followed by whitespace
-                """
-                converted_output = raw_output
-                for port_name in iface_alias_converter.port_dict.keys():
-                    converted_output = re.sub(r"(^|\s){}($|,{{0,1}}\s)".format(port_name),
-                            r"\1{}\2".format(iface_alias_converter.name_to_alias(port_name)),
-                            converted_output)
-                click.echo(converted_output.rstrip('\n'))
-
-    rc = process.poll()
     if rc != 0:
         sys.exit(rc)
 
@@ -401,7 +320,7 @@ CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help', '-?'])
 
 # This is our entrypoint - the main "show" command
 # TODO: Consider changing function name to 'show' for better understandability
-@click.group(cls=AliasedGroup, context_settings=CONTEXT_SETTINGS)
+@click.group(cls=RoutingStackGroup, context_settings=CONTEXT_SETTINGS)
 def cli():
     """SONiC command line - 'show' command"""
     pass
@@ -1291,7 +1210,7 @@ def protocol(verbose):
 #
 
 # This group houses IPv6-related commands and subgroups
-@cli.group(cls=AliasedGroup, default_if_no_args=False)
+@cli.group(cls=RoutingStackGroup, default_if_no_args=False)
 def ipv6():
     """Show IPv6 commands"""
     pass
@@ -1397,22 +1316,28 @@ def protocol(verbose):
 from .bgp_quagga_v4 import bgp
 ip.add_command(bgp)
 
-if routing_stack == "quagga":
+def load_quagga_ipv6_bgp():
     from .bgp_quagga_v6 import bgp
-    ipv6.add_command(bgp)
-elif routing_stack == "frr":
+    return bgp
+
+def load_frr_ipv6_bgp():
     from .bgp_frr_v6 import bgp
-    ipv6.add_command(bgp)
-    @cli.command()
-    @click.argument('bgp_args', nargs = -1, required = False)
-    @click.option('--verbose', is_flag=True, help="Enable verbose output")
-    def bgp(bgp_args, verbose):
-        """Show BGP information"""
-        bgp_cmd = "show bgp"
-        for arg in bgp_args:
-            bgp_cmd += " " + str(arg)
-        cmd = 'sudo vtysh -c "{}"'.format(bgp_cmd)
-        run_command(cmd, display_cmd=verbose)
+    return bgp
+
+@click.command('bgp')
+@click.argument('bgp_args', nargs = -1, required = False)
+@click.option('--verbose', is_flag=True, help="Enable verbose output")
+def frr_bgp(bgp_args, verbose):
+    """Show BGP information"""
+    bgp_cmd = "show bgp"
+    for arg in bgp_args:
+        bgp_cmd += " " + str(arg)
+    cmd = 'sudo vtysh -c "{}"'.format(bgp_cmd)
+    run_command(cmd, display_cmd=verbose)
+
+ipv6.add_routing_stack_command("quagga", "bgp", load_quagga_ipv6_bgp)
+ipv6.add_routing_stack_command("frr", "bgp", load_frr_ipv6_bgp)
+cli.add_routing_stack_command("frr", "bgp", lambda: frr_bgp)
 
 
 #
@@ -2312,6 +2237,32 @@ def reboot_cause():
         click.echo(proc.stdout.read())
 
 
+#
+# 'reboot-timeline' command ("show reboot-timeline")
+#
+@cli.command('reboot-timeline')
+@click.option('--json', 'json_output', is_flag=True, help="Display in JSON format")
+def reboot_timeline(json_output):
+    """Show the phases timeline of the most recent fast/warm reboot"""
+    if not os.path.isfile(REBOOT_TIMELINE_FILE):
+        click.echo("Unable to find the timeline of the previous reboot\n")
+        return
+
+    info, phases = read_timeline(REBOOT_TIMELINE_FILE)
+    if json_output:
+        click.echo(json.dumps({'reboot': info, 'phases': phases}, indent=4))
+        return
+
+    def format_time(value):
+        return 'N/A' if value is None else '{:.2f}'.format(value)
+
+    click.echo("{} issued by {} at {}\n".format(info.get('reboot_type', 'N/A'), info.get('user', 'N/A'), info.get('time', 'N/A')))
+    header = ['Phase', 'Start (s)', 'End (s)', 'Duration (s)']
+    body = [[phase['name'], format_time(phase['start']), format_time(phase['end']), format_time(phase['duration'])]
+            for phase in phases]
+    click.echo(tabulate(body, header))
+
+
 #
 # 'line' command ("show line")
 #
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+#
+# acl_loader_benchmark.py
+#
+# Benchmark of acl-loader against the mock redis of mock_tables. For every
+# number of rules, a synthetic openconfig ACL file is generated and the
+# phases below are measured:
+#
+#   convert      AclLoader.load_rules_from_file
+#   full         AclLoader.full_update of the rules
+#   incremental  AclLoader.incremental_update after changing 1% of the rules
+#
+# For each phase, the wall time, the number of redis commands, the number
+# of round trips (direct commands and pipeline executions) and the peak
+# RSS of this process are reported. The peak RSS of conversion worker
+# processes (--jobs) is not included.
+#
+# usage: acl_loader_benchmark.py [--rules 100,1000,10000] [--jobs N] [--json]
+#
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+sys.path.insert(0, test_path)
+
+import mock_tables.dbconnector
+import mockredis
+import mockredis.pipeline
+from tabulate import tabulate
+
+from acl_loader.main import AclLoader
+
+DEFAULT_RULES = [100, 1000, 10000]
+TABLE_NAME = "DATAACL"
+
+# Redis commands counted on the mock redis
+REDIS_COMMANDS = ['delete', 'exists', 'get', 'hdel', 'hget', 'hgetall', 'hmget', 'hmset',
+                  'hset', 'keys', 'scan', 'set']
+
+class DbOpsCounter(object):
+    """
+    Count the commands and round trips sent to the mock redis
+    """
+    def __init__(self):
+        self.commands = 0
+        self.round_trips = 0
+        self.depth = 0
+        self.in_pipeline = False
+
+    def reset(self):
+        self.commands = 0
+        self.round_trips = 0
+
+    def install(self):
+        for name in REDIS_COMMANDS:
+            if hasattr(mockredis.MockRedis, name):
+                setattr(mockredis.MockRedis, name, self.count_command(getattr(mockredis.MockRedis, name)))
+        mockredis.pipeline.MockRedisPipeline.execute = self.count_execute(mockredis.pipeline.MockRedisPipeline.execute)
+
+    def count_command(self, command):
+        counter = self
+
+        def wrapper(*args, **kwargs):
+            # mockredis commands may call each other, only count the outermost one
+            if counter.depth == 0:
+                counter.commands += 1
+                if not counter.in_pipeline:
+                    counter.round_trips += 1
+            counter.depth += 1
+            try:
+                return command(*args, **kwargs)
+            finally:
+                counter.depth -= 1
+        return wrapper
+
+    def count_execute(self, execute):
+        counter = self
+
+        def wrapper(pipeline, *args, **kwargs):
+            counter.round_trips += 1
+            counter.in_pipeline = True
+            try:
+                return execute(pipeline, *args, **kwargs)
+            finally:
+                counter.in_pipeline = False
+        return wrapper
+
+def reset_peak_rss():
+    """
+    Reset the peak RSS of this process, if the kernel allows it
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except IOError:
+        pass
+
+def peak_rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def generate_acl(num_rules, changed_every=0):
+    """
+    Generate an openconfig ACL of num_rules entries for TABLE_NAME.
+    Every changed_every-th entry drops instead of accepting.
+    """
+    acl_entries = {}
+    for seq in range(1, num_rules + 1):
+        action = "ACCEPT"
+        if changed_every and seq % changed_every == 0:
+            action = "DROP"
+        acl_entries[str(seq)] = {
+            "config": {"sequence-id": seq},
+            "actions": {"config": {"forwarding-action": action}},
+            "ip": {"config": {
+                "protocol": "IP_TCP" if seq % 2 else "IP_UDP",
+                "source-ip-address": "10.{}.{}.0/24".format((seq >> 8) & 0xff, seq & 0xff),
+                "destination-ip-address": "192.168.{}.{}/32".format((seq >> 8) & 0xff, seq & 0xff)
+            }},
+            "transport": {"config": {"destination-port": str(1024 + seq % 60000)}}
+        }
+    return {"acl": {"acl-sets": {"acl-set": {TABLE_NAME.lower(): {
+        "config": {"name": TABLE_NAME.lower()},
+        "acl-entries": {"acl-entry": acl_entries}
+    }}}}}
+
+def write_acl(path, acl):
+    with open(path, 'w') as f:
+        json.dump(acl, f)
+
+def measure(counter, phase, func):
+    counter.reset()
+    reset_peak_rss()
+    start = time.time()
+    func()
+    return {
+        'phase': phase,
+        'time': time.time() - start,
+        'commands': counter.commands,
+        'round_trips': counter.round_trips,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+def run_benchmark(rules_counts, jobs=1, counter=None):
+    """
+    Run the benchmark for every number of rules of rules_counts.
+    Returns a list of result dicts.
+    """
+    if counter is None:
+        counter = DbOpsCounter()
+        counter.install()
+
+    results = []
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for num_rules in rules_counts:
+            initial_file = os.path.join(tmp_dir, "acl_{}.json".format(num_rules))
+            changed_file = os.path.join(tmp_dir, "acl_{}_changed.json".format(num_rules))
+            write_acl(initial_file, generate_acl(num_rules))
+            write_acl(changed_file, generate_acl(num_rules, changed_every=100))
+
+            acl_loader = AclLoader()
+            acl_loader.set_table_name(TABLE_NAME)
+
+            phases = [
+                measure(counter, 'convert', lambda: acl_loader.load_rules_from_file(initial_file, jobs)),
+                measure(counter, 'full', acl_loader.full_update),
+            ]
+
+            # The mock redis of the loader holds the rules written by full_update
+            acl_loader.read_rules_info()
+            # incremental_update diffs against the rules of every table, keep
+            # the ones of TABLE_NAME only so the phase measures the 1% change
+            # rather than deleting the other tables of the mock DB
+            acl_loader.rules_db_info = dict((key, rule) for key, rule in acl_loader.rules_db_info.iteritems()
+                                            if key[0] == TABLE_NAME)
+            acl_loader.rules_info = {}
+            acl_loader.load_rules_from_file(changed_file, jobs)
+            phases.append(measure(counter, 'incremental', acl_loader.incremental_update))
+
+            for phase in phases:
+                phase['rules'] = num_rules
+                results.append(phase)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark acl-loader against the mock redis',
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-r', '--rules', type=str, help='Comma separated numbers of rules',
+                        default=','.join(str(num_rules) for num_rules in DEFAULT_RULES))
+    parser.add_argument('-j', '--jobs', type=int, help='Number of processes converting the rules, 0 for one per CPU',
+                        default=1)
+    parser.add_argument('--json', action='store_true', help='Print the results in JSON format')
+    args = parser.parse_args()
+
+    rules_counts = [int(num_rules) for num_rules in args.rules.split(',')]
+    results = run_benchmark(rules_counts, args.jobs)
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    header = ['Rules', 'Phase', 'Time (s)', 'DB commands', 'Round trips', 'Peak RSS (KB)']
+    table = [[r['rules'], r['phase'], '{:.3f}'.format(r['time']), r['commands'], r['round_trips'], r['peak_rss_kb']]
+             for r in results]
+    print(tabulate(table, header, tablefmt='simple', stralign='right'))
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
 import sys
 import os
+import json
+import shutil
+import tempfile
 import pytest
+from click.testing import CliRunner
 
 test_path = os.path.dirname(os.path.abspath(__file__))
 modules_path = os.path.dirname(test_path)
@@ -53,3 +57,110 @@ class TestAclLoader(object):
         # switch capability taken from mock_tables/state_db.json SWITCH_CAPABILITY table
         assert acl_loader.validate_actions("DATAACL", forward_packet_action)
         assert not acl_loader.validate_actions("DATAACL", drop_packet_action)
+
+    def test_rules_diff(self):
+        acl_loader = AclLoader()
+        current_rules = {
+            ("DATAACL", "RULE_1"): {"PRIORITY": "9999", "PACKET_ACTION": "FORWARD", "SRC_IP": "10.0.0.2/32"},
+            ("DATAACL", "RULE_2"): {"PRIORITY": "9998", "PACKET_ACTION": "FORWARD", "DST_IP": "192.168.0.16/32"},
+            ("DATAACL", "RULE_3"): {"PRIORITY": "9997", "PACKET_ACTION": "FORWARD", "DST_IP": "172.16.2.0/32"},
+            ("DATAACL", "DEFAULT_RULE"): {"PRIORITY": "1", "PACKET_ACTION": "DROP", "ETHER_TYPE": "2048"},
+        }
+        new_rules = {
+            ("DATAACL", "RULE_1"): {"PRIORITY": "9999", "PACKET_ACTION": "FORWARD", "SRC_IP": "10.0.0.2/32"},
+            ("DATAACL", "RULE_2"): {"PRIORITY": "9998", "PACKET_ACTION": "DROP", "DST_IP": "192.168.0.16/32"},
+            ("DATAACL", "RULE_4"): {"PRIORITY": "9996", "PACKET_ACTION": "FORWARD", "L4_SRC_PORT": "4661"},
+            ("DATAACL", "DEFAULT_RULE"): {"PRIORITY": "1", "PACKET_ACTION": "DROP", "ETHER_TYPE": 2048},
+        }
+
+        added, removed, changed = acl_loader.diff_rules(current_rules, new_rules)
+        assert added == set([("DATAACL", "RULE_4")])
+        assert removed == set([("DATAACL", "RULE_3")])
+        assert changed == set([("DATAACL", "RULE_2")])
+
+        updates = acl_loader.rules_update_order(current_rules, new_rules, added, removed, changed)
+        assert updates == [(("DATAACL", "RULE_2"), new_rules[("DATAACL", "RULE_2")]),
+                           (("DATAACL", "RULE_4"), new_rules[("DATAACL", "RULE_4")]),
+                           (("DATAACL", "RULE_3"), None)]
+
+    def test_full_update_writes_delta(self):
+        acl_loader = AclLoader()
+        acl_loader.set_table_name("DATAACL")
+        acl_loader.rules_info = {
+            ("DATAACL", "RULE_1"): {"PRIORITY": "9999", "PACKET_ACTION": "FORWARD", "SRC_IP": "10.0.0.2/32"},
+            ("DATAACL", "RULE_2"): {"PRIORITY": "9998", "PACKET_ACTION": "DROP", "SRC_IP": "192.168.0.16/32"},
+            ("DATAACL", "DEFAULT_RULE"): {"PRIORITY": "1", "PACKET_ACTION": "DROP", "ETHER_TYPE": 2048},
+        }
+        acl_loader.full_update()
+
+        acl_loader.read_rules_info()
+        rules = acl_loader.get_rules_db_info()
+        assert set(key for key in rules if key[0] == "DATAACL") == set(acl_loader.rules_info)
+        assert rules[("DATAACL", "RULE_2")] == {"PRIORITY": "9998", "PACKET_ACTION": "DROP", "SRC_IP": "192.168.0.16/32"}
+        assert rules[("DATAACL", "DEFAULT_RULE")]["ETHER_TYPE"] == "2048"
+        # Rules of other tables are kept
+        assert ("EVERFLOW", "RULE_6") in rules
+
+    def test_switch_capability_cached(self):
+        acl_loader = AclLoader()
+        reads = []
+        get_all = acl_loader.statedb.get_all
+
+        def counting_get_all(*args):
+            reads.append(args)
+            return get_all(*args)
+
+        acl_loader.statedb.get_all = counting_get_all
+        for _ in range(3):
+            assert acl_loader.validate_actions("DATAACL", {"PACKET_ACTION": "FORWARD"})
+        assert len(reads) == 1
+
+        acl_loader.invalidate_switch_capability()
+        assert not acl_loader.validate_actions("DATAACL", {"PACKET_ACTION": "DROP"})
+        assert len(reads) == 2
+
+    def test_load_rules_invalid(self):
+        acl_loader = AclLoader()
+        with pytest.raises(AclLoaderException):
+            acl_loader.load_rules_from_file(os.path.join(test_path, 'acl_input/acl2.json'))
+        assert acl_loader.rules_info == {}
+
+    def test_negative_jobs(self):
+        result = CliRunner().invoke(cli, ['update', 'full', '--jobs', '-1', os.path.join(test_path, 'acl_input/acl1.json')])
+        assert result.exit_code == 2
+
+    def test_load_rules_in_chunks(self):
+        acl_entries = {}
+        for seq in range(1, 8):
+            acl_entries[str(seq)] = {
+                "config": {"sequence-id": seq},
+                "actions": {"config": {"forwarding-action": "ACCEPT"}},
+                "ip": {"config": {"protocol": "IP_TCP", "source-ip-address": "10.0.{}.0/24".format(seq)}}
+            }
+        acl = {"acl": {"acl-sets": {"acl-set": {"dataacl": {
+            "config": {"name": "dataacl"},
+            "acl-entries": {"acl-entry": acl_entries}
+        }}}}}
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, "acl.json")
+            with open(filename, "w") as f:
+                json.dump(acl, f)
+
+            acl_loader = AclLoader()
+            acl_loader.yang_acl = AclLoader.parse_acl_json(filename)
+            acl_loader.convert_rules()
+            expected = acl_loader.rules_info
+            assert len(expected) == 8
+
+            acl_loader = AclLoader()
+            acl_loader.load_rules_from_file(filename)
+            assert acl_loader.rules_info == expected
+
+            rules = {}
+            for chunk in AclLoader().iter_rules_from_file(filename, jobs=2, chunk_size=3):
+                deep_update(rules, chunk)
+            assert rules == expected
+        finally:
+            shutil.rmtree(tmp_dir)
@@ -96,6 +96,14 @@ RULE_9        DATAACL         9991              901            900
 DEFAULT_RULE  DATAACL            1                2              1
 """
 
+# Expected output for aclshow -t EVERFLOW -w 1, one sample
+everflow_watch_output = '' + \
+"""The rates are calculated within 1 seconds period
+RULE NAME    TABLE NAME      PRIO    PACKETS COUNT    BYTES COUNT  PACKETS RATE    BYTES RATE
+-----------  ------------  ------  ---------------  -------------  --------------  ------------
+RULE_6       EVERFLOW        9994              601            600  0.00/s          0.00 B/s
+"""
+
 # Expected output for aclshow -c
 clear_output = ''
 
@@ -161,54 +169,60 @@ class Aclshow():
 
 # aclshow
 def test_default():
-    test = Aclshow(all = None, clear = None, rules = None, tables = None, verbose = None)
+    test = Aclshow(all = None, clear = None, rules = None, tables = None, verbose = None, watch = 0)
     assert test.result.getvalue() == default_output
 
 # aclshow -a
 def test_all():
-    test = Aclshow(all = True, clear = None, rules = None, tables = None, verbose = None)
+    test = Aclshow(all = True, clear = None, rules = None, tables = None, verbose = None, watch = 0)
     assert test.result.getvalue() == all_output
 
 # aclshow -r RULE_1 -t DATAACL
 def test_rule1_dataacl():
-    test = Aclshow(all = None, clear = None, rules = 'RULE_1', tables = 'DATAACL', verbose = None)
+    test = Aclshow(all = None, clear = None, rules = 'RULE_1', tables = 'DATAACL', verbose = None, watch = 0)
     assert test.result.getvalue() == rule1_dataacl_output
 
 # aclshow -a -r RULE_05
 def test_rule05_all():
-    test = Aclshow(all = True, clear = None, rules = 'RULE_05', tables = None, verbose = None)
+    test = Aclshow(all = True, clear = None, rules = 'RULE_05', tables = None, verbose = None, watch = 0)
     assert test.result.getvalue() == rule05_all_output
 
 # aclshow -r RULE_0
 def test_rule0():
-    test = Aclshow(all = None, clear = None, rules = 'RULE_0', tables = None, verbose = None)
+    test = Aclshow(all = None, clear = None, rules = 'RULE_0', tables = None, verbose = None, watch = 0)
     assert test.result.getvalue() == rule0_output
 
 # aclshow -r RULE_4,RULE_6 -vv
 def test_rule4_rule6_verbose():
-    test = Aclshow(all = None, clear = None, rules = 'RULE_4,RULE_6', tables = None, verbose = True)
+    test = Aclshow(all = None, clear = None, rules = 'RULE_4,RULE_6', tables = None, verbose = True, watch = 0)
     assert test.result.getvalue() == rule4_rule6_verbose_output
 
 # aclshow -t EVERFLOW
 def test_everflow():
-    test = Aclshow(all=None, clear=None, rules=None, tables='EVERFLOW', verbose=None)
+    test = Aclshow(all=None, clear=None, rules=None, tables='EVERFLOW', verbose=None, watch=0)
     assert test.result.getvalue() == everflow_output
 
 # aclshow -t DATAACL
 def test_dataacl():
-    test = Aclshow(all=None, clear=None, rules=None, tables='DATAACL', verbose=None)
+    test = Aclshow(all=None, clear=None, rules=None, tables='DATAACL', verbose=None, watch=0)
     assert test.result.getvalue() == dataacl_output
 
+# aclshow -t EVERFLOW -w 1
+@mock.patch('time.sleep', side_effect=[None, KeyboardInterrupt])
+def test_everflow_watch(mock_sleep):
+    test = Aclshow(all=None, clear=None, rules=None, tables='EVERFLOW', verbose=None, watch=1)
+    assert test.result.getvalue() == everflow_watch_output
+
 # aclshow -c
 def test_clear():
-    test = Aclshow(all=None, clear=True, rules=None, tables=None, verbose=None)
+    test = Aclshow(all=None, clear=True, rules=None, tables=None, verbose=None, watch=0)
     assert test.result.getvalue() == clear_output
 
 # aclshow -a -c ; aclshow -a
 def test_all_after_clear():
     nullify_on_start, nullify_on_exit = True, False
-    test = Aclshow(nullify_on_start, nullify_on_exit, all=True, clear=True, rules=None, tables=None, verbose=None)
+    test = Aclshow(nullify_on_start, nullify_on_exit, all=True, clear=True, rules=None, tables=None, verbose=None, watch=0)
     assert test.result.getvalue() == clear_output
     nullify_on_start, nullify_on_exit = False, True
-    test = Aclshow(nullify_on_start, nullify_on_exit, all=True, clear=False, rules=None, tables=None, verbose=None)
+    test = Aclshow(nullify_on_start, nullify_on_exit, all=True, clear=False, rules=None, tables=None, verbose=None, watch=0)
     assert test.result.getvalue() == all_after_clear_output
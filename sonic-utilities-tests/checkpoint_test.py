@@ -0,0 +1,77 @@
+import sys
+import os
+import shutil
+import tempfile
+import datetime
+from collections import namedtuple, OrderedDict
+from unittest import TestCase
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from utilities_common.checkpoint import save_cnstat, load_cnstat, save_counts, load_counts, STATUS_NA
+
+Stats = namedtuple("Stats", "rx_ok, rx_err, tx_ok")
+
+class TestCheckpoint(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "ckpt")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_cnstat_round_trip(self):
+        cnstat_dict = OrderedDict()
+        cnstat_dict['time'] = datetime.datetime(2020, 1, 2, 3, 4, 5, 678000)
+        cnstat_dict['Ethernet0'] = Stats('100', STATUS_NA, '18446744073709551614')
+        cnstat_dict['Ethernet4'] = Stats('0', '7', '42')
+        save_cnstat(self.path, cnstat_dict)
+
+        loaded = load_cnstat(self.path, Stats)
+        self.assertEqual(list(loaded.keys()), ['time', 'Ethernet0', 'Ethernet4'])
+        self.assertEqual(loaded['time'], cnstat_dict['time'])
+        self.assertEqual(loaded['Ethernet0'], cnstat_dict['Ethernet0'])
+        self.assertEqual(loaded['Ethernet4'], cnstat_dict['Ethernet4'])
+
+    def test_non_counter_fields(self):
+        cnstat_dict = OrderedDict()
+        cnstat_dict['time'] = datetime.datetime.now()
+        cnstat_dict['Ethernet0:0'] = Stats('UC', '-1', '5')
+        save_cnstat(self.path, cnstat_dict)
+        self.assertEqual(load_cnstat(self.path, Stats)['Ethernet0:0'], Stats(STATUS_NA, STATUS_NA, '5'))
+
+    def test_other_counters(self):
+        cnstat_dict = OrderedDict()
+        cnstat_dict['time'] = datetime.datetime.now()
+        cnstat_dict['Ethernet0'] = Stats('1', '2', '3')
+        save_cnstat(self.path, cnstat_dict)
+        # Fields renamed, or added by a newer version
+        self.assertRaises(IOError, load_cnstat, self.path, namedtuple("Stats", "rx_ok, rx_drop, tx_ok"))
+        self.assertRaises(IOError, load_cnstat, self.path, namedtuple("Stats", "rx_ok, rx_err, tx_ok, tx_err"))
+
+        # Saved without the field names
+        cnstat_dict['Ethernet0'] = ('1', '2', '3')
+        save_cnstat(self.path, cnstat_dict)
+        self.assertEqual(load_cnstat(self.path, Stats)['Ethernet0'], Stats('1', '2', '3'))
+        self.assertRaises(IOError, load_cnstat, self.path, namedtuple("Stats", "rx_ok, tx_ok"))
+
+    def test_counts_round_trip(self):
+        counts_table = OrderedDict()
+        counts_table['Ethernet0'] = {'RX_DROPS': 1, 'TX_DROPS': 2}
+        counts_table['Ethernet4'] = {'TX_DROPS': 3}
+        save_counts(self.path, counts_table)
+        self.assertEqual(load_counts(self.path), counts_table)
+
+    def test_counts_out_of_range(self):
+        counts_table = OrderedDict()
+        counts_table['Ethernet0'] = {'RX_DROPS': -1, 'TX_DROPS': 2}
+        counts_table['Ethernet4'] = {'RX_DROPS': 1 << 64, 'TX_DROPS': 3}
+        save_counts(self.path, counts_table)
+        self.assertEqual(load_counts(self.path), {'Ethernet0': {'TX_DROPS': 2}, 'Ethernet4': {'TX_DROPS': 3}})
+
+    def test_invalid_file(self):
+        with open(self.path, 'w') as f:
+            f.write('(dp0\nS\'time\'\np1\n' * 4)
+        self.assertRaises(IOError, load_counts, self.path)
@@ -0,0 +1,81 @@
+import sys
+import os
+import shutil
+import socket
+import tempfile
+from unittest import TestCase
+
+import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from cli_server import client
+from cli_server.protocol import *
+
+class TestFrameReader(TestCase):
+    def test_partial_frames(self):
+        data = FRAME_HEADER.pack(FRAME_STDIN, 3) + b'abc' + FRAME_HEADER.pack(FRAME_STDIN, 0)
+        reader = FrameReader()
+        self.assertEqual(reader.feed(data[:4]), [])
+        self.assertEqual(reader.feed(data[4:9]), [(FRAME_STDIN, b'abc')])
+        self.assertEqual(reader.feed(data[9:]), [(FRAME_STDIN, b'')])
+
+    def test_read_frame_keeps_following_frames(self):
+        server, client = socket.socketpair()
+        send_frame(client, FRAME_REQUEST, b'{}')
+        send_frame(client, FRAME_STDIN, b'input')
+        client.close()
+
+        reader = FrameReader()
+        self.assertEqual(reader.read_frame(server), (FRAME_REQUEST, b'{}'))
+        self.assertEqual(reader.read_frame(server), (FRAME_STDIN, b'input'))
+        self.assertEqual(reader.read_frame(server), None)
+        server.close()
+
+class TestPrivateDir(TestCase):
+    def setUp(self):
+        self.dirname = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirname)
+
+    def test_private_dir(self):
+        self.assertTrue(is_private_dir(self.dirname))
+        os.chmod(self.dirname, 0o755)
+        self.assertFalse(is_private_dir(self.dirname))
+
+    def test_symlink(self):
+        link = os.path.join(self.dirname, 'link')
+        os.mkdir(os.path.join(self.dirname, 'target'), 0o700)
+        os.symlink(os.path.join(self.dirname, 'target'), link)
+        self.assertFalse(is_private_dir(link))
+
+    def test_other_owner(self):
+        with mock.patch('os.geteuid', return_value=os.geteuid() + 1):
+            self.assertFalse(is_private_dir(self.dirname))
+
+class TestForward(TestCase):
+    def forward(self, *frames):
+        server, sock = socket.socketpair()
+        for frame in frames:
+            send_frame(server, *frame)
+        server.shutdown(socket.SHUT_WR)
+        with mock.patch('os.isatty', return_value=False), \
+                mock.patch.object(client, 'write_all') as write_all, \
+                mock.patch('sys.stderr'):
+            exit_code = client.forward(sock, 'show')
+        server.close()
+        return exit_code, [call[0] for call in write_all.call_args_list]
+
+    def test_not_accepted(self):
+        self.assertEqual(self.forward(), (None, []))
+
+    def test_served(self):
+        self.assertEqual(self.forward((FRAME_ACCEPTED,), (FRAME_STDOUT, b'output'), (FRAME_EXIT, EXIT_CODE.pack(3))),
+                         (3, [(1, b'output')]))
+
+    def test_lost_after_accepted(self):
+        # The command may have run, it must not be run again locally
+        self.assertEqual(self.forward((FRAME_ACCEPTED,)), (1, []))
@@ -0,0 +1,207 @@
+import sys
+import os
+from unittest import TestCase
+
+import click
+import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from config import db_snapshot
+from config.db_snapshot import ConfigDBSnapshot, ConfigDBBatch, get_config_db_snapshot, start_config_db_batch
+
+class FakePipeline(object):
+    def __init__(self, client, transaction):
+        self.client = client
+        self.transaction = transaction
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name,) + args)
+
+    def execute(self):
+        self.client.executed.append(self.commands)
+
+class FakeRedis(object):
+    def __init__(self):
+        self.executed = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self, transaction)
+
+class FakeConfigDB(object):
+    CONFIG_DB = 'CONFIG_DB'
+    TABLE_NAME_SEPARATOR = '|'
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.reads = []
+        self.writes = []
+        self.client = FakeRedis()
+
+    def get_redis_client(self, db_name):
+        return self.client
+
+    def serialize_key(self, key):
+        return '|'.join(key) if isinstance(key, tuple) else key
+
+    def typed_to_raw(self, typed_data):
+        raw_data = {}
+        for field, value in typed_data.items():
+            if isinstance(value, list):
+                raw_data[field + '@'] = ','.join(value)
+            else:
+                raw_data[field] = str(value)
+        return raw_data or {'NULL': 'NULL'}
+
+    def get_table(self, table):
+        self.reads.append(table)
+        return dict((key, dict(entry)) for key, entry in self.tables.get(table, {}).items())
+
+    def set_entry(self, table, key, data):
+        self.writes.append(('set', table, key, data))
+
+    def mod_entry(self, table, key, data):
+        self.writes.append(('mod', table, key, data))
+
+class TestConfigDBSnapshot(TestCase):
+    def setUp(self):
+        self.config_db = FakeConfigDB({
+            'PORT': {
+                'Ethernet0': {'alias': 'etp1'},
+                'Ethernet4': {'alias': 'etp2'},
+            },
+            'BGP_NEIGHBOR': {
+                '10.0.0.1': {'name': 'ARISTA01T2', 'admin_status': 'up'},
+                '10.0.0.3': {'name': 'ARISTA02T2'},
+                'fc00::2': {'name': 'ARISTA01T2'},
+            },
+        })
+        self.snapshot = ConfigDBSnapshot(self.config_db)
+
+    def test_tables_read_once(self):
+        self.assertTrue(self.snapshot.has_entry('PORT', 'Ethernet0'))
+        self.assertFalse(self.snapshot.has_entry('PORT', 'Ethernet8'))
+        self.assertEqual(self.snapshot.get_entry('port', 'Ethernet4'), {'alias': 'etp2'})
+        self.assertEqual(self.snapshot.get_alias_converter().alias_to_name('etp2'), 'Ethernet4')
+        self.assertFalse(self.snapshot.has_entry('PORTCHANNEL', 'PortChannel0001'))
+        self.assertFalse(self.snapshot.get_table('PORTCHANNEL'))
+        self.assertEqual(self.config_db.reads, ['PORT', 'PORTCHANNEL'])
+
+    def test_find_keys(self):
+        self.assertEqual(sorted(self.snapshot.find_keys('BGP_NEIGHBOR', 'name', 'ARISTA01T2')), ['10.0.0.1', 'fc00::2'])
+        self.assertEqual(self.snapshot.find_keys('BGP_NEIGHBOR', 'name', 'ARISTA03T2'), [])
+
+    def test_writes_update_snapshot(self):
+        self.assertEqual(self.snapshot.find_keys('BGP_NEIGHBOR', 'name', 'ARISTA02T2'), ['10.0.0.3'])
+        self.snapshot.mod_entry('bgp_neighbor', '10.0.0.1', {'admin_status': 'down'})
+        self.snapshot.mod_entry('bgp_neighbor', '10.0.0.3', None)
+        self.snapshot.set_entry('BGP_NEIGHBOR', '10.0.0.5', {'name': 'ARISTA02T2'})
+        self.assertEqual(self.snapshot.get_entry('BGP_NEIGHBOR', '10.0.0.1'), {'name': 'ARISTA01T2', 'admin_status': 'down'})
+        self.assertEqual(self.snapshot.find_keys('BGP_NEIGHBOR', 'name', 'ARISTA02T2'), ['10.0.0.5'])
+        self.assertEqual(len(self.config_db.writes), 3)
+        self.assertEqual(self.config_db.reads, ['BGP_NEIGHBOR'])
+
+    def test_invalidate(self):
+        self.snapshot.get_table('PORT')
+        self.snapshot.invalidate('PORT')
+        self.snapshot.get_table('PORT')
+        self.assertEqual(self.config_db.reads, ['PORT', 'PORT'])
+
+class TestConfigDBBatch(TestCase):
+    def setUp(self):
+        self.config_db = FakeConfigDB({
+            'VLAN': {
+                'Vlan100': {'vlanid': '100', 'members': ['Ethernet0']},
+            },
+            'VLAN_MEMBER': {
+                ('Vlan100', 'Ethernet0'): {'tagging_mode': 'untagged'},
+            },
+        })
+        self.batch = ConfigDBBatch(self.config_db)
+
+    def add_member(self, vlan_name, port):
+        vlan = self.batch.get_entry('VLAN', vlan_name)
+        members = vlan.get('members', [])
+        members.append(port)
+        vlan['members'] = members
+        self.batch.set_entry('VLAN', vlan_name, vlan)
+        self.batch.set_entry('VLAN_MEMBER', (vlan_name, port), {'tagging_mode': 'tagged'})
+
+    def test_commit_in_one_transaction(self):
+        self.batch.set_entry('VLAN', 'Vlan200', {'vlanid': 200})
+        for port in ['Ethernet4', 'Ethernet8', 'Ethernet12']:
+            self.add_member('Vlan100', port)
+        self.batch.set_entry('VLAN_MEMBER', 'Vlan100|Ethernet0', None)
+        self.assertEqual(self.config_db.writes, [])
+
+        self.assertEqual(self.batch.commit(), 6)
+        self.assertEqual(len(self.config_db.client.executed), 1)
+        commands = self.config_db.client.executed[0]
+        self.assertEqual(commands[0], ('hmset', 'VLAN|Vlan200', {'vlanid': '200'}))
+        self.assertEqual(commands[1], ('hmset', 'VLAN|Vlan100', {'vlanid': '100', 'members@': 'Ethernet0,Ethernet4,Ethernet8,Ethernet12'}))
+        self.assertEqual(commands[2], ('hmset', 'VLAN_MEMBER|Vlan100|Ethernet4', {'tagging_mode': 'tagged'}))
+        self.assertEqual(commands[-1], ('delete', 'VLAN_MEMBER|Vlan100|Ethernet0'))
+        self.assertEqual(self.config_db.reads, ['VLAN', 'VLAN_MEMBER'])
+
+    def test_reads_are_copies(self):
+        vlan = self.batch.get_entry('VLAN', 'Vlan100')
+        vlan['members'].append('Ethernet4')
+        self.assertEqual(self.batch.get_entry('VLAN', 'Vlan100')['members'], ['Ethernet0'])
+
+    def test_lookups_are_not_copies(self):
+        with mock.patch('config.db_snapshot.copy.deepcopy') as deepcopy:
+            self.assertTrue(self.batch.has_table('VLAN'))
+            self.assertFalse(self.batch.has_table('PORTCHANNEL'))
+            self.assertEqual(self.batch.get_keys('VLAN'), ['Vlan100'])
+        self.assertFalse(deepcopy.called)
+
+    def test_unchanged_entries_not_written(self):
+        self.batch.mod_entry('VLAN', 'Vlan100', {'vlanid': '100'})
+        self.batch.mod_entry('VLAN', 'Vlan300', None)
+        self.assertEqual(self.batch.commit(), 0)
+        self.assertEqual(self.config_db.client.executed, [[]])
+
+    def test_stale_fields_removed(self):
+        vlan = self.batch.get_entry('VLAN', 'Vlan100')
+        del vlan['members']
+        self.batch.set_entry('VLAN', 'Vlan100', vlan)
+        self.batch.commit()
+        self.assertEqual(self.config_db.client.executed[0],
+                         [('hdel', 'VLAN|Vlan100', 'members@'), ('hmset', 'VLAN|Vlan100', {'vlanid': '100'})])
+
+    def test_deferred_calls_run_after_commit(self):
+        calls = []
+        self.batch.defer(calls.append, 'flush')
+        self.assertEqual(calls, [])
+        self.batch.commit()
+        self.assertEqual(calls, ['flush'])
+
+class TestContextSnapshot(TestCase):
+    def setUp(self):
+        self.config_db = FakeConfigDB({'PORT': {'Ethernet0': {'alias': 'etp1'}}})
+
+    def test_group_connector_reused(self):
+        for obj in [{'db': self.config_db}, {'config_db': self.config_db}]:
+            ctx = click.Context(click.Command('vlan'), obj=obj)
+            with ctx, mock.patch.object(db_snapshot, 'ConfigDBConnector') as connector:
+                snapshot = get_config_db_snapshot()
+                self.assertIs(get_config_db_snapshot(), snapshot)
+                self.assertTrue(snapshot.has_entry('PORT', 'Ethernet0'))
+            self.assertIs(snapshot.config_db, self.config_db)
+            self.assertFalse(connector.called)
+
+    def test_batch_connector_reused(self):
+        ctx = click.Context(click.Command('batch'), obj={'db': self.config_db})
+        with ctx:
+            batch = start_config_db_batch(ctx)
+            self.assertIs(get_config_db_snapshot(), batch)
+        self.assertIs(batch.config_db, self.config_db)
+
+    def test_no_group_connector(self):
+        ctx = click.Context(click.Command('bgp'))
+        with ctx, mock.patch.object(db_snapshot, 'ConfigDBConnector') as connector:
+            self.assertIs(get_config_db_snapshot().config_db, connector.return_value)
+        connector.return_value.connect.assert_called_once_with()
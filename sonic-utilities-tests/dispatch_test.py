@@ -0,0 +1,116 @@
+import os
+import shutil
+import sys
+import tempfile
+from StringIO import StringIO
+from unittest import TestCase
+
+import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from utilities_common import dispatch
+from utilities_common.dispatch import LineWriter, run_script_in_process
+
+# Stands for one of the scripts run in-process
+SCRIPT = """
+import sys
+
+def main():
+    print ' '.join(sys.argv)
+    if '--exit' in sys.argv:
+        sys.exit(int(sys.argv[-1]))
+    if '--message' in sys.argv:
+        sys.exit('Error: ' + sys.argv[-1])
+    if '--raise' in sys.argv:
+        raise RuntimeError(sys.argv[-1])
+    sys.stdout.write('no newline')
+
+if __name__ == '__main__':
+    main()
+"""
+
+class TestRunScriptInProcess(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        with open(os.path.join(self.dir, 'portstat'), 'w') as f:
+            f.write(SCRIPT)
+        self.patches = [
+            mock.patch.dict(os.environ, {'PATH': self.dir}),
+            mock.patch.object(dispatch, '_script_modules', {}),
+            mock.patch('sys.stdout', StringIO()),
+            mock.patch('sys.stderr', StringIO()),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        shutil.rmtree(self.dir)
+
+    def test_argv(self):
+        argv, stdout = sys.argv, sys.stdout
+        self.assertEqual(run_script_in_process("portstat -p 'a b'"), 0)
+        self.assertEqual(stdout.getvalue(), 'portstat -p a b\nno newline')
+        self.assertIs(sys.argv, argv)
+        self.assertIs(sys.stdout, stdout)
+
+    def test_exit_code(self):
+        self.assertEqual(run_script_in_process('portstat --exit 3'), 3)
+        self.assertEqual(run_script_in_process('portstat --exit 0'), 0)
+
+    def test_exit_message(self):
+        self.assertEqual(run_script_in_process('portstat --message failed'), 1)
+        self.assertEqual(sys.stderr.getvalue(), 'Error: failed\n')
+
+    def test_exception_restores_stdout(self):
+        argv, stdout = sys.argv, sys.stdout
+        lines = []
+        self.assertRaises(RuntimeError, run_script_in_process, 'portstat --raise boom', lines.append)
+        self.assertIs(sys.argv, argv)
+        self.assertIs(sys.stdout, stdout)
+        self.assertEqual(lines, ['portstat --raise boom\n'])
+
+    def test_line_handler(self):
+        lines = []
+        self.assertEqual(run_script_in_process('portstat', lines.append), 0)
+        # The last line is passed without its missing newline
+        self.assertEqual(lines, ['portstat\n', 'no newline'])
+        self.assertEqual(sys.stdout.getvalue(), '')
+
+    def test_loaded_once(self):
+        run_script_in_process('portstat')
+        module = dispatch._script_modules['portstat']
+        run_script_in_process('portstat')
+        self.assertIs(dispatch._script_modules['portstat'], module)
+
+    def test_shell_fallback(self):
+        # Shell features, other commands and scripts not installed
+        self.assertIsNone(run_script_in_process('portstat | grep Ethernet0'))
+        self.assertIsNone(run_script_in_process('portstat > /tmp/out'))
+        self.assertIsNone(run_script_in_process('sudo portstat'))
+        self.assertIsNone(run_script_in_process(''))
+        self.assertIsNone(run_script_in_process('fdbshow'))
+        self.assertEqual(sys.stdout.getvalue(), '')
+
+class TestLineWriter(TestCase):
+    def test_lines(self):
+        stdout = StringIO()
+        lines = []
+
+        def handler(line):
+            # Handlers write to the original stdout
+            lines.append(line)
+            sys.stdout.write(line.upper())
+
+        writer = LineWriter(handler, stdout)
+        writer.write('a\nb')
+        writer.writelines(['c\n', 'd\ne\n', 'f'])
+        self.assertEqual(lines, ['a\n', 'bc\n', 'd\n', 'e\n'])
+        writer.close()
+        self.assertEqual(lines, ['a\n', 'bc\n', 'd\n', 'e\n', 'f'])
+        self.assertEqual(stdout.getvalue(), 'A\nBC\nD\nE\nF')
+        self.assertFalse(writer.isatty())
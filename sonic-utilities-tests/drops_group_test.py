@@ -128,6 +128,17 @@ class TestDropCounters(object):
         print(result.output)
         assert result.output == expected_counts_with_clear
 
+    def test_show_counts_with_invalid_checkpoint(self):
+        # Checkpoints of older releases are ignored with a warning
+        for name in ['port-stats', 'switch-stats']:
+            with open(os.path.join('/tmp/dropstat', '{}-{}'.format(name, os.getuid())), 'w') as f:
+                f.write('(dp0\nS\'Ethernet0\'\np1\n')
+        runner = CliRunner()
+        result = runner.invoke(show.cli.commands["dropcounters"].commands["counts"], [])
+        print(result.output)
+        assert result.exit_code == 0
+        assert [line for line in result.output.splitlines() if not line.startswith('Warning')] == expected_counts.splitlines()
+
     @classmethod
     def teardown_class(cls):
         print("TEARDOWN")
@@ -0,0 +1,100 @@
+import os
+import sys
+from unittest import TestCase
+
+import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+scripts_path = os.path.join(modules_path, "scripts")
+sys.path.insert(0, modules_path)
+
+from imp import load_source
+fdbshow = load_source('fdbshow', os.path.join(scripts_path, 'fdbshow'))
+
+FDB_KEY = 'ASIC_STATE:SAI_OBJECT_TYPE_FDB_ENTRY:{"bvid":"%s","mac":"%s","switch_id":"oid:0x21000000000000"}'
+VLAN_KEY = 'ASIC_STATE:SAI_OBJECT_TYPE_VLAN:%s'
+
+class FakePipeline(object):
+    def __init__(self, client):
+        self.client = client
+        self.replies = []
+
+    def hmget(self, key, fields):
+        hash = self.client.hashes.get(key, {})
+        self.replies.append([hash.get(field) for field in fields])
+
+    def execute(self):
+        self.client.executed += 1
+        return self.replies
+
+class FakeRedis(object):
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self.executed = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakeDb(object):
+    ASIC_DB = 'ASIC_DB'
+
+    def __init__(self, client):
+        self.client = client
+
+    def connect(self, db_name):
+        pass
+
+    def keys(self, db_name, pattern):
+        return sorted(key for key in self.client.hashes if key.startswith(pattern[:-1]))
+
+    def get_redis_client(self, db_name):
+        return self.client
+
+def fdb_entry(bridge_port, entry_type='SAI_FDB_ENTRY_TYPE_DYNAMIC'):
+    return {'SAI_FDB_ENTRY_ATTR_BRIDGE_PORT_ID': 'oid:0x' + bridge_port, 'SAI_FDB_ENTRY_ATTR_TYPE': entry_type}
+
+class TestFdbShow(TestCase):
+    def setUp(self):
+        self.client = FakeRedis({
+            VLAN_KEY % 'oid:0x26000000000001': {'SAI_VLAN_ATTR_VLAN_ID': '1000'},
+            VLAN_KEY % 'oid:0x26000000000002': {'SAI_VLAN_ATTR_VLAN_ID': '2000'},
+            FDB_KEY % ('oid:0x26000000000002', '7C:FE:90:80:9F:05'): fdb_entry('3a000000000002'),
+            FDB_KEY % ('oid:0x26000000000001', '7C:FE:90:80:9F:01'): fdb_entry('3a000000000001'),
+            FDB_KEY % ('oid:0x26000000000001', '7C:FE:90:80:9F:02'): fdb_entry('3a000000000002', 'SAI_FDB_ENTRY_TYPE_STATIC'),
+            FDB_KEY % ('oid:0x26000000000001', '7C:FE:90:80:9F:03'): fdb_entry('3a000000000099'),
+        })
+        port_util = mock.Mock()
+        port_util.get_interface_oid_map.return_value = ({}, {'1000000000001': 'Ethernet4', '1000000000002': 'Ethernet8'})
+        port_util.get_bridge_port_map.return_value = {'3a000000000001': '1000000000001', '3a000000000002': '1000000000002'}
+        with mock.patch.object(fdbshow, 'SonicV2Connector', return_value=FakeDb(self.client)), \
+                mock.patch.object(fdbshow, 'port_util', port_util):
+            self.fdb = fdbshow.FdbShow()
+
+    def display(self, vlan=None, port=None):
+        with mock.patch.object(fdbshow, 'tabulate') as tabulate, mock.patch('sys.stdout'):
+            self.fdb.display(vlan, port)
+        return [tuple(row[1:]) for row in tabulate.call_args[0][0]]
+
+    def test_fetch(self):
+        # One pipelined read for the FDB entries, one for their VLANs
+        self.assertEqual(self.client.executed, 2)
+        self.assertEqual(self.display(), [
+            (1000, '7C:FE:90:80:9F:01', 'Ethernet4', 'Dynamic'),
+            (1000, '7C:FE:90:80:9F:02', 'Ethernet8', 'Static'),
+            (2000, '7C:FE:90:80:9F:05', 'Ethernet8', 'Dynamic'),
+        ])
+
+    def test_filters(self):
+        self.assertEqual(self.display(vlan='2000'), [(2000, '7C:FE:90:80:9F:05', 'Ethernet8', 'Dynamic')])
+        self.assertEqual(self.display(port='Ethernet8'), [
+            (1000, '7C:FE:90:80:9F:02', 'Ethernet8', 'Static'),
+            (2000, '7C:FE:90:80:9F:05', 'Ethernet8', 'Dynamic'),
+        ])
+        self.assertEqual(self.display(vlan='1000', port='Ethernet8'), [(1000, '7C:FE:90:80:9F:02', 'Ethernet8', 'Static')])
+
+    def test_filters_no_match(self):
+        with self.assertRaisesRegexp(ValueError, '1001 is not in list'):
+            self.display(vlan='1001')
+        with self.assertRaisesRegexp(ValueError, "'Ethernet4' is not in list"):
+            self.display(vlan='2000', port='Ethernet4')
@@ -0,0 +1,73 @@
+import sys
+import os
+from unittest import TestCase
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from utilities_common.interface_alias import InterfaceAliasConverter, TEAMSHOW_CONTEXT
+
+class TestInterfaceAliasConverter(TestCase):
+    def setUp(self):
+        self.converter = InterfaceAliasConverter({
+            "Ethernet0": {"alias": "etp1"},
+            "Ethernet4": {"alias": "etp2"},
+            "Ethernet8": {"lanes": "8,9,10,11"},
+            "Ethernet12": {"alias": "fortyGigE0/12"},
+        })
+
+    def test_name_to_alias(self):
+        self.assertEqual(self.converter.name_to_alias("Ethernet0"), "etp1")
+        self.assertEqual(self.converter.name_to_alias("Ethernet12"), "fortyGigE0/12")
+        self.assertEqual(self.converter.name_to_alias("Ethernet8"), "Ethernet8")
+        self.assertEqual(self.converter.name_to_alias("PortChannel0001"), "PortChannel0001")
+        self.assertEqual(self.converter.name_to_alias(None), None)
+
+    def test_alias_to_name(self):
+        self.assertEqual(self.converter.alias_to_name("etp2"), "Ethernet4")
+        self.assertEqual(self.converter.alias_to_name("PortChannel0001"), "PortChannel0001")
+        self.assertEqual(self.converter.alias_to_name(None), None)
+
+    def test_sub_interface(self):
+        self.assertEqual(self.converter.name_to_alias("Ethernet0.10"), "etp1.10")
+        self.assertEqual(self.converter.alias_to_name("etp1.10"), "Ethernet0.10")
+        self.assertEqual(self.converter.alias_to_name("PortChannel0001.20"), "PortChannel0001.20")
+
+    def test_lookup(self):
+        self.assertEqual(self.converter.get_alias("Ethernet4"), "etp2")
+        self.assertEqual(self.converter.get_alias("Ethernet8"), None)
+        self.assertEqual(self.converter.get_name("fortyGigE0/12"), "Ethernet12")
+        self.assertEqual(self.converter.get_name("Ethernet12"), None)
+        self.assertEqual(self.converter.alias_max_length, len("fortyGigE0/12"))
+
+class TestInterfaceAliasRewriter(TestCase):
+    def setUp(self):
+        self.converter = InterfaceAliasConverter({
+            "Ethernet1": {"alias": "etp1"},
+            "Ethernet10": {"alias": "etp10"},
+            "Ethernet100": {"alias": "etp100"},
+            "Ethernet12": {"alias": "etp12"},
+        })
+
+    def test_default_context(self):
+        rewriter = self.converter.get_rewriter()
+        self.assertEqual(rewriter.rewrite("Ethernet1 up\n"), "etp1 up\n")
+        self.assertEqual(rewriter.rewrite("via 10.0.0.1, Ethernet10, 00:01:02\n"), "via 10.0.0.1, etp10, 00:01:02\n")
+        self.assertEqual(rewriter.rewrite("Ethernet100 Ethernet12 Ethernet1\n"), "etp100 etp12 etp1\n")
+        self.assertEqual(rewriter.rewrite("  Ethernet12"), "  etp12")
+        self.assertEqual(rewriter.rewrite("Ethernet11 Ethernet1x xEthernet1 Ethernet1:\n"), "Ethernet11 Ethernet1x xEthernet1 Ethernet1:\n")
+
+    def test_teamshow_context(self):
+        rewriter = self.converter.get_rewriter(TEAMSHOW_CONTEXT)
+        self.assertEqual(rewriter.rewrite("LACP(A)(Up)  Ethernet1(S) Ethernet10(D*)\n"), "LACP(A)(Up)  etp1(S) etp10(D*)\n")
+        self.assertEqual(rewriter.rewrite("Ethernet1 Ethernet12(X)\n"), "Ethernet1 Ethernet12(X)\n")
+
+    def test_filter(self):
+        rewriter = self.converter.get_rewriter()
+        lines = ["Ethernet1 up\n", "Ethernet12 down\n"]
+        self.assertEqual(list(rewriter.filter(lines)), ["etp1 up\n", "etp12 down\n"])
+
+    def test_no_ports(self):
+        rewriter = InterfaceAliasConverter({}).get_rewriter()
+        self.assertEqual(rewriter.rewrite("Ethernet1 up\n"), "Ethernet1 up\n")
@@ -0,0 +1,56 @@
+import sys
+import os
+from unittest import TestCase
+
+import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from utilities_common.netstat import ns_diffs, ns_rates, format_diff, format_brate, format_prate, format_util, \
+    ns_diff, ns_brate, ns_prate, ns_util, clear_screen, watch, CLEAR_SCREEN, STATUS_NA
+
+class TestNetstat(TestCase):
+    def test_diffs(self):
+        self.assertEqual(ns_diffs(["10", "5", STATUS_NA, "7"], ["4", "8", "1", STATUS_NA]), [6, 0, None, None])
+
+    def test_rates(self):
+        self.assertEqual(ns_rates([10, None, 0], 2), [5.0, None, 0.0])
+        self.assertEqual(ns_rates([10, None], 0), [None, None])
+
+    def test_format(self):
+        self.assertEqual(format_diff(1234567), "1,234,567")
+        self.assertEqual(format_diff(None), STATUS_NA)
+        self.assertEqual(format_brate(100), "100.00 B/s")
+        self.assertEqual(format_brate(20*1024), "20.00 KB/s")
+        self.assertEqual(format_brate(20*1024*1024), "20.00 MB/s")
+        self.assertEqual(format_prate(1.5), "1.50/s")
+        self.assertEqual(format_util(40*1024*1024*1024/8.0), "100.00%")
+        self.assertEqual(format_util(None), STATUS_NA)
+
+    def test_single_counter(self):
+        self.assertEqual(ns_diff("1000", "1"), "999")
+        self.assertEqual(ns_diff(STATUS_NA, "1"), STATUS_NA)
+        self.assertEqual(ns_brate("2048", "0", 2.0), "1024.00 B/s")
+        self.assertEqual(ns_prate("30", "0", 3.0), "10.00/s")
+        self.assertEqual(ns_util("0", "0", 1.0), "0.00%")
+
+    @mock.patch('time.sleep', side_effect=[None, None, KeyboardInterrupt])
+    def test_watch(self, sleep):
+        samples = iter([1, 3])
+        displayed = []
+        with mock.patch('sys.stdout'):
+            self.assertRaises(KeyboardInterrupt, watch, 5, lambda: next(samples),
+                              lambda previous, current: displayed.append((previous, current)), 0)
+        self.assertEqual(displayed, [(0, 1), (1, 3)])
+        sleep.assert_called_with(5)
+
+    def test_clear_screen(self):
+        with mock.patch('sys.stdout') as stdout:
+            stdout.isatty.return_value = False
+            clear_screen()
+            self.assertFalse(stdout.write.called)
+            stdout.isatty.return_value = True
+            clear_screen()
+            stdout.write.assert_called_once_with(CLEAR_SCREEN)
@@ -0,0 +1,154 @@
+import datetime
+import json
+import os
+import sys
+from StringIO import StringIO
+from collections import OrderedDict
+from unittest import TestCase
+
+import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+scripts_path = os.path.join(modules_path, "scripts")
+sys.path.insert(0, modules_path)
+
+from imp import load_source
+portstat = load_source('portstat', os.path.join(scripts_path, 'portstat'))
+
+STATUS_NA = portstat.STATUS_NA
+
+class FakePipeline(object):
+    def __init__(self, client):
+        self.client = client
+        self.replies = []
+
+    def hmget(self, key, fields):
+        hash = self.client.hashes.get(key, {})
+        self.replies.append([hash.get(field) for field in fields])
+
+    def execute(self):
+        self.client.executed += 1
+        return self.replies
+
+class FakeRedis(object):
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self.executed = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakeDb(object):
+    COUNTERS_DB = 'COUNTERS_DB'
+    APPL_DB = 'APPL_DB'
+
+    def __init__(self, client):
+        self.client = client
+
+    def connect(self, db_name):
+        pass
+
+    def get_all(self, db_name, key):
+        return self.client.hashes.get(key)
+
+    def get(self, db_name, key, field):
+        return self.client.hashes.get(key, {}).get(field)
+
+    def get_redis_client(self, db_name):
+        return self.client
+
+def port_counters(**counters):
+    hash = dict((name, '0') for name in portstat.counter_bucket_dict)
+    hash.update(('SAI_PORT_STAT_' + name, value) for name, value in counters.items())
+    return hash
+
+def stats(rx_ok, tx_ok, rx_byt, tx_byt):
+    return portstat.NStats(str(rx_ok), '0', '0', '0', str(tx_ok), '0', '0', '0', str(rx_byt), str(tx_byt))
+
+class TestPortstat(TestCase):
+    def setUp(self):
+        self.client = FakeRedis({
+            'COUNTERS_PORT_NAME_MAP': {
+                'Ethernet8': 'oid:0x1000000000003',
+                'Ethernet0': 'oid:0x1000000000001',
+                'Ethernet4': 'oid:0x1000000000002',
+            },
+            'COUNTERS:oid:0x1000000000001': port_counters(IF_IN_UCAST_PKTS='8', IF_IN_NON_UCAST_PKTS='2',
+                                                          IF_OUT_ERRORS='3', IF_IN_OCTETS='1000'),
+            'COUNTERS:oid:0x1000000000002': port_counters(IF_IN_UCAST_PKTS='5'),
+            'PORT_TABLE:Ethernet0': {'admin_status': 'up', 'oper_status': 'up'},
+        })
+        # Ethernet4 lacks some counters, Ethernet8 all of them
+        del self.client.hashes['COUNTERS:oid:0x1000000000002']['SAI_PORT_STAT_IF_IN_NON_UCAST_PKTS']
+        del self.client.hashes['COUNTERS:oid:0x1000000000002']['SAI_PORT_STAT_IF_OUT_OCTETS']
+        with mock.patch.object(portstat.swsssdk, 'SonicV2Connector', return_value=FakeDb(self.client)):
+            self.portstat = portstat.Portstat()
+
+    def test_get_cnstat(self):
+        cnstat_dict = self.portstat.get_cnstat()
+        # All the ports in one pipelined read
+        self.assertEqual(self.client.executed, 1)
+        self.assertEqual(list(cnstat_dict.keys()), ['time', 'Ethernet0', 'Ethernet4', 'Ethernet8'])
+        self.assertEqual(cnstat_dict['Ethernet0'], portstat.NStats('10', '0', '0', '0', '0', '3', '0', '0', '1000', '0'))
+        self.assertEqual(cnstat_dict['Ethernet4'], portstat.NStats(STATUS_NA, '0', '0', '0', '0', '0', '0', '0', '0', STATUS_NA))
+        self.assertEqual(cnstat_dict['Ethernet8'], portstat.NStats(*[STATUS_NA] * 10))
+
+    def test_get_cnstat_no_ports(self):
+        del self.client.hashes['COUNTERS_PORT_NAME_MAP']
+        self.assertEqual(list(self.portstat.get_cnstat().keys()), ['time'])
+        self.assertEqual(self.client.executed, 0)
+
+    def watch(self, samples, history):
+        start = datetime.datetime(2020, 1, 1)
+        cnstat_dicts = []
+        for seconds, ports in enumerate(samples):
+            cnstat_dict = OrderedDict([('time', start + datetime.timedelta(seconds=seconds))])
+            cnstat_dict.update(ports)
+            cnstat_dicts.append(cnstat_dict)
+
+        output = StringIO()
+        sleeps = [None] * (len(samples) - 1) + [KeyboardInterrupt]
+        with mock.patch.object(self.portstat, 'get_cnstat', side_effect=cnstat_dicts[1:]), \
+                mock.patch('time.sleep', side_effect=sleeps), \
+                mock.patch('sys.stdout', output):
+            self.assertRaises(KeyboardInterrupt, self.portstat.cnstat_watch, cnstat_dicts[0], 1, history, True)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_watch_rates(self):
+        outputs = self.watch([
+            {'Ethernet0': stats(0, 0, 0, 0)},
+            {'Ethernet0': stats(10, 5, 100, 1000)},
+            {'Ethernet0': stats(20, 5, 400, 1000), 'Ethernet4': stats(1, 1, 1, 1)},
+            {'Ethernet0': stats(20, 9, 500, 1100), 'Ethernet4': stats(2, 2, 2, 2)},
+        ], history=2)
+
+        self.assertEqual([output['period'] for output in outputs], [1.0, 1.0, 1.0])
+        self.assertEqual(outputs[0]['ports']['Ethernet0'], {
+            'state': 'U',
+            'rx_bps': 100.0, 'rx_bps_min': 100.0, 'rx_bps_avg': 100.0, 'rx_bps_max': 100.0,
+            'rx_pps': 10.0, 'rx_pps_min': 10.0, 'rx_pps_avg': 10.0, 'rx_pps_max': 10.0,
+            'tx_bps': 1000.0, 'tx_bps_min': 1000.0, 'tx_bps_avg': 1000.0, 'tx_bps_max': 1000.0,
+            'tx_pps': 5.0, 'tx_pps_min': 5.0, 'tx_pps_avg': 5.0, 'tx_pps_max': 5.0,
+        })
+        # A port is shown once it has a previous sample
+        self.assertEqual(list(outputs[1]['ports'].keys()), ['Ethernet0'])
+        self.assertEqual(list(outputs[2]['ports'].keys()), ['Ethernet0', 'Ethernet4'])
+
+        # min/avg/max over the last 2 samples only
+        rates = outputs[2]['ports']['Ethernet0']
+        self.assertEqual([rates['rx_bps' + suffix] for suffix in ('', '_min', '_avg', '_max')], [100.0, 100.0, 200.0, 300.0])
+        self.assertEqual([rates['tx_pps' + suffix] for suffix in ('', '_min', '_avg', '_max')], [4.0, 0.0, 2.0, 4.0])
+        self.assertEqual(outputs[2]['ports']['Ethernet4']['state'], STATUS_NA)
+
+    def test_watch_counters_not_available(self):
+        outputs = self.watch([
+            {'Ethernet0': stats(0, 0, STATUS_NA, 0)},
+            {'Ethernet0': stats(10, 0, STATUS_NA, 100)},
+            {'Ethernet0': stats(20, 0, 300, 200)},
+        ], history=10)
+        # Rates without any sample are left out
+        self.assertNotIn('rx_bps', outputs[0]['ports']['Ethernet0'])
+        self.assertNotIn('rx_bps', outputs[1]['ports']['Ethernet0'])
+        self.assertEqual(outputs[1]['ports']['Ethernet0']['rx_pps_avg'], 10.0)
+        self.assertEqual(outputs[1]['ports']['Ethernet0']['tx_bps_avg'], 100.0)
@@ -0,0 +1,39 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from utilities_common.reboot_timeline import read_timeline
+
+TIMELINE = """{"reboot_type": "fast-reboot", "user": "admin", "time": "Mon Mar 25 01:02:03 UTC 2019", "uptime": 1000.00}
+{"phase": "pre-check", "event": "start", "uptime": 1000.00}
+{"phase": "pre-check", "event": "end", "uptime": 1000.50}
+{"phase": "fast-reboot-dump", "event": "start", "uptime": 1000.50}
+{"phase": "fast-reboot-dump", "event": "end", "uptime": 1002.00}
+{"phase": "reboot", "event": "start", "uptime": 1003.25}
+{"phase": "reb"""
+
+class TestReadTimeline(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'reboot-timeline.jsonl')
+        with open(self.filename, 'w') as fp:
+            fp.write(TIMELINE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_read_timeline(self):
+        info, phases = read_timeline(self.filename)
+        self.assertEqual(info['reboot_type'], 'fast-reboot')
+        self.assertEqual([phase['name'] for phase in phases], ['pre-check', 'fast-reboot-dump', 'reboot'])
+        self.assertAlmostEqual(phases[1]['start'], 0.5)
+        self.assertAlmostEqual(phases[1]['duration'], 1.5)
+        self.assertAlmostEqual(phases[2]['start'], 3.25)
+        self.assertIsNone(phases[2]['end'])
+        self.assertIsNone(phases[2]['duration'])
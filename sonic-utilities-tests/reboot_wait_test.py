@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+import time
+from unittest import TestCase
+
+import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+scripts_path = os.path.join(modules_path, "scripts")
+sys.path.insert(0, modules_path)
+
+from imp import load_source
+reboot_wait = load_source('reboot_wait', os.path.join(scripts_path, 'reboot-wait.py'))
+
+KEY = 'WARM_RESTART_TABLE|warm-shutdown'
+
+class FakePubSub(object):
+    def __init__(self, client):
+        self.client = client
+        self.channels = []
+
+    def subscribe(self, channel):
+        self.channels.append(channel)
+
+    def get_message(self, timeout=0):
+        # Each message is the next update of syncd
+        if not self.client.updates:
+            time.sleep(timeout)
+            return None
+        self.client.hashes[KEY]['state'] = self.client.updates.pop(0)
+        return {'type': 'message', 'channel': self.channels[0], 'data': 'hset'}
+
+    def close(self):
+        pass
+
+class FakeRedis(object):
+    def __init__(self, state, updates):
+        self.hashes = {KEY: {'state': state}}
+        self.updates = updates
+        self.connection_pool = mock.Mock(connection_kwargs={'db': 6})
+        self.hget_count = 0
+        self.config = {'notify-keyspace-events': 'El'}
+
+    def config_get(self, name):
+        return {name: self.config[name]}
+
+    def config_set(self, name, value):
+        self.config[name] = value
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    def hget(self, key, field):
+        self.hget_count += 1
+        return self.hashes.get(key, {}).get(field)
+
+class TestWaitForState(TestCase):
+    def test_state_changed(self):
+        client = FakeRedis('requesting', ['requesting', 'pre-shutdown-succeeded'])
+        self.assertEqual(reboot_wait.wait_for_state(client, KEY, 'state', ['requesting'], 5), 'pre-shutdown-succeeded')
+        self.assertEqual(client.hget_count, 3)
+        # The notifications enabled for the wait are disabled again
+        self.assertEqual(client.config['notify-keyspace-events'], 'El')
+
+    def test_keyspace_events_already_enabled(self):
+        client = FakeRedis('requesting', ['pre-shutdown-succeeded'])
+        client.config['notify-keyspace-events'] = 'AK'
+        with mock.patch.object(client, 'config_set') as config_set:
+            reboot_wait.wait_for_state(client, KEY, 'state', ['requesting'], 5)
+        # Nothing was changed, nothing is restored
+        self.assertFalse(config_set.called)
+
+    def test_already_changed(self):
+        client = FakeRedis('pre-shutdown-failed', [])
+        self.assertEqual(reboot_wait.wait_for_state(client, KEY, 'state', ['requesting'], 5), 'pre-shutdown-failed')
+
+    def test_timeout(self):
+        client = FakeRedis('requesting', [])
+        self.assertEqual(reboot_wait.wait_for_state(client, KEY, 'state', ['requesting'], 0.1), 'requesting')
+        self.assertEqual(client.config['notify-keyspace-events'], 'El')
+
+    def test_changed_at_timeout(self):
+        # The value changed without any notification delivered in time
+        client = FakeRedis('requesting', [])
+        hget = client.hget
+        client.hget = mock.Mock(side_effect=lambda key, field: hget(key, field) if client.hget.call_count == 1
+                                else 'pre-shutdown-succeeded')
+        self.assertEqual(reboot_wait.wait_for_state(client, KEY, 'state', ['requesting'], 0.1), 'pre-shutdown-succeeded')
+        self.assertEqual(client.hget.call_count, 2)
+
+class TestStateCommand(TestCase):
+    def test_connection_failure(self):
+        db = mock.Mock()
+        db.connect.side_effect = Exception('Connection refused')
+        args = mock.Mock(db='STATE_DB')
+        with mock.patch.object(reboot_wait.swsssdk, 'SonicV2Connector', return_value=db), \
+                mock.patch('syslog.syslog'):
+            self.assertEqual(reboot_wait.state_command(args), reboot_wait.EXIT_ERROR)
+        db.connect.assert_called_once_with('STATE_DB', False)
+
+class TestWaitForExit(TestCase):
+    def wait_for_exit(self, sleeps, timeout):
+        procs = [subprocess.Popen(['sleep', str(seconds)]) for seconds in sleeps]
+        try:
+            # Exited processes stay zombies until waited for below
+            remaining = reboot_wait.wait_for_exit([proc.pid for proc in procs], timeout)
+            return [sleeps[[proc.pid for proc in procs].index(pid)] for pid in remaining]
+        finally:
+            for proc in procs:
+                proc.kill()
+                proc.wait()
+
+    def test_exited(self):
+        self.assertEqual(self.wait_for_exit([0.1, 0.2], 5), [])
+
+    def test_timeout(self):
+        self.assertEqual(self.wait_for_exit([0.1, 30], 0.5), [30])
+
+    def test_no_pidfd(self):
+        with mock.patch.object(reboot_wait, 'pidfd_open', return_value=None):
+            self.assertEqual(self.wait_for_exit([0.1, 30], 0.5), [30])
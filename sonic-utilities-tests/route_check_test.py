@@ -0,0 +1,282 @@
+import fnmatch
+import json
+import os
+import signal
+import sys
+from unittest import TestCase
+
+import mock
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+scripts_path = os.path.join(modules_path, "scripts")
+sys.path.insert(0, modules_path)
+
+from imp import load_source
+route_check = load_source('route_check', os.path.join(scripts_path, 'route_check.py'))
+
+ASIC_ROUTE_KEY = 'ASIC_STATE:SAI_OBJECT_TYPE_ROUTE_ENTRY:{"dest":"%s","switch_id":"oid:0x21000000000000","vr":"oid:0x3000000000022"}'
+
+class FakePipeline(object):
+    def __init__(self, client):
+        self.client = client
+        self.replies = []
+
+    def hget(self, key, field):
+        self.replies.append(self.client.hget(key, field))
+
+    def execute(self):
+        self.client.executed += 1
+        return self.replies
+
+class FakeRedis(object):
+    def __init__(self, hashes, db_id=0):
+        self.hashes = hashes
+        self.executed = 0
+        self.connection_pool = mock.Mock(connection_kwargs={'db': db_id})
+        self.config = {'notify-keyspace-events': ''}
+
+    def config_get(self, name):
+        return {name: self.config[name]}
+
+    def config_set(self, name, value):
+        self.config[name] = value
+
+    def pubsub(self):
+        return FakePubSub()
+
+    def scan_iter(self, match='*', count=None):
+        return (key for key in self.hashes if fnmatch.fnmatchcase(key, match))
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class TestPrefixes(TestCase):
+    def test_prefix_to_int(self):
+        self.assertEqual(route_check.prefix_to_int('10.0.0.1/24'), route_check.prefix_to_int('10.0.0.0/24'))
+        self.assertNotEqual(route_check.prefix_to_int('10.0.0.0/24'), route_check.prefix_to_int('10.0.0.0/25'))
+        self.assertEqual(route_check.prefix_to_int('10.0.0.1'), route_check.prefix_to_int('10.0.0.1/32'))
+        self.assertEqual(route_check.prefix_to_int('fc00::1'), route_check.prefix_to_int('fc00::1/128'))
+        self.assertNotEqual(route_check.prefix_to_int('0.0.0.0/0'), route_check.prefix_to_int('::/0'))
+
+    def test_int_to_prefix(self):
+        for prefix in ['0.0.0.0/0', '10.1.0.0/16', '192.168.0.1/32', '::/0', '20c0:d9b8:99:80::/64', 'fc00::72/128']:
+            self.assertEqual(route_check.int_to_prefix(route_check.prefix_to_int(prefix)), prefix)
+        self.assertEqual(route_check.int_to_prefix(route_check.prefix_to_int('10.0.0.99/31')), '10.0.0.98/31')
+
+class TestPrefixTrie(TestCase):
+    def setUp(self):
+        self.trie = route_check.PrefixTrie()
+        for prefix, owner in [('10.0.0.0/31', 'PortChannel01 subnet'), ('10.0.0.0/32', 'PortChannel01 address'),
+                              ('192.168.0.0/21', 'Vlan1000 subnet'), ('fc00::/126', 'PortChannel01 subnet'),
+                              ('0.0.0.0/0', 'default route')]:
+            self.trie.add(route_check.prefix_to_int(prefix), owner)
+
+    def test_get(self):
+        self.assertEqual(self.trie.get(route_check.prefix_to_int('10.0.0.0/31')), ['PortChannel01 subnet'])
+        self.assertEqual(self.trie.get(route_check.prefix_to_int('10.0.0.1/32')), [])
+        self.assertEqual(self.trie.get(route_check.prefix_to_int('192.168.0.0/22')), [])
+        self.assertEqual(self.trie.get(route_check.prefix_to_int('::/0')), [])
+
+    def test_longest_match(self):
+        subnet, owners = self.trie.longest_match(route_check.prefix_to_int('192.168.3.7/32'))
+        self.assertEqual((route_check.int_to_prefix(subnet), owners), ('192.168.0.0/21', ['Vlan1000 subnet']))
+        subnet, owners = self.trie.longest_match(route_check.prefix_to_int('172.16.0.0/16'))
+        self.assertEqual((route_check.int_to_prefix(subnet), owners), ('0.0.0.0/0', ['default route']))
+        self.assertEqual(self.trie.longest_match(route_check.prefix_to_int('fc00::4/128')), (None, []))
+
+    def test_items_and_remove(self):
+        self.trie.remove(route_check.prefix_to_int('10.0.0.0/32'), 'PortChannel01 address')
+        self.assertEqual(sorted(route_check.int_to_prefix(prefix) for prefix, owners in self.trie.items()),
+                         ['0.0.0.0/0', '10.0.0.0/31', '192.168.0.0/21', 'fc00::/126'])
+
+class TestCheckRoutes(TestCase):
+    def setUp(self):
+        self.appl_db = FakeRedis({
+            'ROUTE_TABLE:0.0.0.0/0': {'nexthop': '10.0.0.1'},
+            'ROUTE_TABLE:192.168.0.0/24': {'nexthop': '10.0.0.1,10.0.0.3'},
+            'ROUTE_TABLE:20c0:d9b8:99:80::/64': {'nexthop': 'fc00::72'},
+            'ROUTE_TABLE:10.1.0.32': {'nexthop': ''},
+            'ROUTE_TABLE:Vrf1:10.2.0.0/24': {'nexthop': '10.0.0.1'},
+            'INTF_TABLE:PortChannel01:10.0.0.0/31': {'scope': 'global'},
+            'INTF_TABLE:lo:10.1.0.32/32': {'scope': 'global'},
+            'INTF_TABLE:eth0:10.3.147.10/23': {'scope': 'global'},
+        })
+        self.asic_db = FakeRedis({
+            ASIC_ROUTE_KEY % '0.0.0.0/0': {},
+            ASIC_ROUTE_KEY % '192.168.0.0/24': {},
+            ASIC_ROUTE_KEY % '20c0:d9b8:99:80::/64': {},
+            ASIC_ROUTE_KEY % '10.0.0.0/31': {},
+            ASIC_ROUTE_KEY % '10.0.0.0/32': {},
+            ASIC_ROUTE_KEY % '10.1.0.32/32': {},
+        })
+
+    def check_routes(self, default_routes=False):
+        dbs = {'APPL_DB': self.appl_db, 'ASIC_DB': self.asic_db}
+        with mock.patch.object(route_check, 'connect_db', side_effect=lambda db_name: dbs[db_name]):
+            return route_check.check_routes(default_routes)
+
+    def test_routes(self):
+        self.assertEqual(route_check.get_routes(self.appl_db),
+                         set(route_check.prefix_to_int(prefix) for prefix in ['0.0.0.0/0', '192.168.0.0/24', '20c0:d9b8:99:80::/64']))
+        self.assertEqual(self.appl_db.executed, 1)
+
+    def test_vrf_routes_skipped(self):
+        with mock.patch.object(route_check, 'print_message') as print_message:
+            route_check.get_routes(self.appl_db)
+        skipped = json.loads(print_message.call_args_list[-1][0][1])
+        self.assertEqual(sorted(skipped['skipped_routes']), ['10.1.0.32', 'Vrf1:10.2.0.0/24'])
+
+    def test_all_good(self):
+        self.assertEqual(self.check_routes(), 0)
+
+    def test_mismatches(self):
+        del self.asic_db.hashes[ASIC_ROUTE_KEY % '192.168.0.0/24']
+        self.asic_db.hashes[ASIC_ROUTE_KEY % '192.193.120.255/25'] = {}
+        self.appl_db.hashes['INTF_TABLE:PortChannel01:10.0.0.99/31'] = {'scope': 'global'}
+
+        with mock.patch.object(route_check, 'print_message') as print_message:
+            self.assertEqual(self.check_routes(), -1)
+        results = json.loads(print_message.call_args_list[-2][0][2])
+        self.assertEqual(results, {
+            'missed_ROUTE_TABLE_routes': ['192.168.0.0/24'],
+            'missed_INTF_TABLE_entries': ['10.0.0.98/31', '10.0.0.99/32'],
+            'Unaccounted_ROUTE_ENTRY_TABLE_entries': ['192.193.120.128/25'],
+        })
+
+    def test_default_routes(self):
+        self.asic_db.hashes[ASIC_ROUTE_KEY % '::/0'] = {}
+        with mock.patch.object(route_check, 'print_message'):
+            self.assertEqual(self.check_routes(), -1)
+            self.assertEqual(self.check_routes(default_routes=True), 0)
+
+class FakePubSub(object):
+    def __init__(self):
+        self.messages = []
+        self.patterns = []
+        self.closed = False
+
+    def psubscribe(self, *patterns):
+        self.patterns.extend(patterns)
+
+    def close(self):
+        self.closed = True
+
+    def notify(self, db_id, key, event):
+        self.messages.append({'type': 'pmessage', 'channel': '__keyspace@%d__:%s' % (db_id, key), 'data': event})
+
+    def get_message(self, timeout=0):
+        return self.messages.pop(0) if self.messages else None
+
+class TestRouteMonitor(TestCase):
+    def setUp(self):
+        self.appl_db = FakeRedis({
+            'ROUTE_TABLE:192.168.0.0/24': {'nexthop': '10.0.0.1'},
+            'INTF_TABLE:PortChannel01:10.0.0.0/31': {'scope': 'global'},
+        })
+        self.asic_db = FakeRedis({
+            ASIC_ROUTE_KEY % '192.168.0.0/24': {},
+            ASIC_ROUTE_KEY % '10.0.0.0/31': {},
+            ASIC_ROUTE_KEY % '10.0.0.0/32': {},
+        }, db_id=1)
+        self.asic_db.config['notify-keyspace-events'] = 'El'
+        self.monitor = route_check.RouteMonitor(self.appl_db, self.asic_db, grace_period=5)
+        self.monitor.subscribe()
+        self.monitor.load_baseline(0)
+
+    def add_route(self, prefix, now):
+        self.appl_db.hashes['ROUTE_TABLE:' + prefix] = {'nexthop': '10.0.0.1'}
+        self.monitor.pubsub.notify(0, 'ROUTE_TABLE:' + prefix, 'hset')
+        self.monitor.handle_events(now)
+
+    def add_route_entry(self, prefix, now):
+        self.asic_db.hashes[ASIC_ROUTE_KEY % prefix] = {}
+        self.monitor.pubsub.notify(1, ASIC_ROUTE_KEY % prefix, 'hset')
+        self.monitor.handle_events(now)
+
+    def test_vrf_route_ignored(self):
+        self.add_route('Vrf1:172.16.0.0/16', 1)
+        self.assertEqual(self.monitor.mismatches, {})
+        self.assertEqual(self.monitor.report(10), {})
+
+    def test_keyspace_events(self):
+        self.assertEqual(self.appl_db.config['notify-keyspace-events'], 'Kghxe')
+        self.assertEqual(self.asic_db.config['notify-keyspace-events'], 'ElKghxe')
+        self.monitor.unsubscribe()
+        self.assertEqual(self.appl_db.config['notify-keyspace-events'], '')
+        self.assertEqual(self.asic_db.config['notify-keyspace-events'], 'El')
+        self.assertTrue(self.monitor.pubsub.closed)
+
+    def test_keyspace_events_already_enabled(self):
+        self.monitor.unsubscribe()
+        self.appl_db.config['notify-keyspace-events'] = 'KA'
+        monitor = route_check.RouteMonitor(self.appl_db, self.asic_db, grace_period=5)
+        monitor.subscribe()
+        with mock.patch.object(self.appl_db, 'config_set') as config_set:
+            monitor.unsubscribe()
+        # Only the settings changed by subscribe are restored
+        self.assertFalse(config_set.called)
+        self.assertEqual(self.asic_db.config['notify-keyspace-events'], 'El')
+
+    def test_subscribe(self):
+        self.assertEqual(sorted(self.monitor.pubsub.patterns), [
+            '__keyspace@0__:INTF_TABLE:*', '__keyspace@0__:ROUTE_TABLE:*',
+            '__keyspace@1__:ASIC_STATE:SAI_OBJECT_TYPE_ROUTE_ENTRY:*',
+        ])
+
+    def test_wait_time(self):
+        self.assertEqual(self.monitor.wait_time(1), 5)
+        self.add_route('172.16.0.0/16', 1)
+        self.add_route('172.17.0.0/16', 2)
+        self.assertEqual(self.monitor.wait_time(3), 3)
+        self.assertEqual(self.monitor.wait_time(7), 0)
+
+    def test_baseline(self):
+        self.assertEqual(self.monitor.mismatches, {})
+        self.assertEqual(self.monitor.report(10), {})
+
+    def test_transient_mismatch_not_reported(self):
+        self.add_route('172.16.0.0/16', 1)
+        self.assertEqual(self.monitor.report(2), {})
+        self.add_route_entry('172.16.0.0/16', 3)
+        self.assertEqual(self.monitor.mismatches, {})
+        self.assertEqual(self.monitor.report(10), {})
+
+    def test_lasting_mismatch_reported_once(self):
+        self.add_route('172.16.0.0/16', 1)
+        self.add_route_entry('172.17.0.0/16', 2)
+        self.monitor.pubsub.notify(0, 'INTF_TABLE:PortChannel01:10.0.0.0/31', 'del')
+        self.monitor.handle_events(3)
+
+        with mock.patch.object(route_check, 'print_message'):
+            self.assertEqual(self.monitor.report(6.5), {'missed_ROUTE_TABLE_routes': ['172.16.0.0/16']})
+            self.assertEqual(self.monitor.report(9), {
+                'Unaccounted_ROUTE_ENTRY_TABLE_entries': ['10.0.0.0/31', '10.0.0.0/32', '172.17.0.0/16'],
+            })
+            self.assertEqual(self.monitor.report(20), {})
+
+    def test_run_blocks_until_next_report(self):
+        pubsub = FakePubSub()
+        pubsub.get_message = mock.Mock(side_effect=KeyboardInterrupt)
+        monitor = route_check.RouteMonitor(self.appl_db, self.asic_db, grace_period=5)
+        with mock.patch.object(self.appl_db, 'pubsub', return_value=pubsub), \
+                mock.patch.object(route_check, 'print_message'):
+            self.assertRaises(KeyboardInterrupt, monitor.run)
+        pubsub.get_message.assert_called_once_with(timeout=5)
+        self.assertTrue(pubsub.closed)
+
+    def test_sigterm_restores_keyspace_events(self):
+        self.monitor.unsubscribe()
+        pubsub = FakePubSub()
+        pubsub.get_message = mock.Mock(side_effect=lambda timeout: os.kill(os.getpid(), signal.SIGTERM))
+        dbs = {'APPL_DB': self.appl_db, 'ASIC_DB': self.asic_db}
+        with mock.patch.object(route_check, 'connect_db', side_effect=lambda db_name: dbs[db_name]), \
+                mock.patch.object(self.appl_db, 'pubsub', return_value=pubsub), \
+                mock.patch.object(route_check, 'print_message'):
+            self.assertEqual(route_check.monitor_routes(5), 0)
+        self.assertTrue(pubsub.closed)
+        self.assertEqual(self.asic_db.config['notify-keyspace-events'], 'El')
+        self.assertEqual(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
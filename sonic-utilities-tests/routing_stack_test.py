@@ -0,0 +1,137 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+import click
+import mock
+from click.testing import CliRunner
+
+test_path = os.path.dirname(os.path.abspath(__file__))
+modules_path = os.path.dirname(test_path)
+sys.path.insert(0, modules_path)
+
+from utilities_common import routing_stack
+
+class RoutingStackGroup(routing_stack.RoutingStackGroupMixin, click.Group):
+    pass
+
+def make_cli(loaded):
+    @click.group(cls=RoutingStackGroup)
+    def cli():
+        pass
+
+    @cli.command()
+    def version():
+        click.echo('version')
+
+    def load_frr_bgp():
+        loaded.append('frr')
+
+        @click.command()
+        def bgp():
+            click.echo('frr bgp')
+        return bgp
+
+    def load_quagga_bgp():
+        loaded.append('quagga')
+
+        @click.command()
+        def bgp():
+            click.echo('quagga bgp')
+        return bgp
+
+    cli.add_routing_stack_command('frr', 'bgp', load_frr_bgp)
+    cli.add_routing_stack_command('quagga', 'bgp', load_quagga_bgp)
+    return cli
+
+class TestRoutingStackGroup(TestCase):
+    def setUp(self):
+        self.loaded = []
+        self.cli = make_cli(self.loaded)
+        self.runner = CliRunner()
+
+    def test_not_detected_for_other_commands(self):
+        with mock.patch.object(routing_stack, 'get_routing_stack') as get_routing_stack:
+            result = self.runner.invoke(self.cli, ['version'])
+        self.assertEqual(result.output, 'version\n')
+        self.assertFalse(get_routing_stack.called)
+        self.assertEqual(self.loaded, [])
+
+    def test_loaded_on_lookup(self):
+        with mock.patch.object(routing_stack, 'get_routing_stack', return_value='frr') as get_routing_stack:
+            result = self.runner.invoke(self.cli, ['bgp'])
+            self.assertEqual(result.output, 'frr bgp\n')
+            self.runner.invoke(self.cli, ['bgp'])
+        # Loaded once, then registered in the group
+        self.assertEqual(get_routing_stack.call_count, 1)
+        self.assertEqual(self.loaded, ['frr'])
+
+    def test_list_commands(self):
+        with mock.patch.object(routing_stack, 'get_routing_stack', return_value='quagga'):
+            self.assertEqual(self.cli.list_commands(None), ['bgp', 'version'])
+        self.assertEqual(self.loaded, ['quagga'])
+
+    def test_unknown_routing_stack(self):
+        with mock.patch.object(routing_stack, 'get_routing_stack', return_value=''):
+            result = self.runner.invoke(self.cli, ['bgp'])
+            self.assertEqual(self.cli.list_commands(None), ['version'])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertEqual(self.loaded, [])
+
+class TestGetRoutingStack(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmp_dir, 'routing-stack-{}')
+        self.key = [1.0, '100']
+        self.patches = [
+            mock.patch.object(routing_stack, 'ROUTING_STACK_CACHE_FILE', self.cache_file),
+            mock.patch.object(routing_stack, '_container_state_key', side_effect=lambda: self.key),
+            mock.patch.object(routing_stack, 'detect_routing_stack', return_value='frr'),
+        ]
+        for patch in self.patches:
+            patch.start()
+        routing_stack._routing_stack = None
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        routing_stack._routing_stack = None
+        shutil.rmtree(self.tmp_dir)
+
+    def get_routing_stack(self):
+        # As a new process would
+        routing_stack._routing_stack = None
+        return routing_stack.get_routing_stack()
+
+    def test_memoized(self):
+        self.assertEqual(routing_stack.get_routing_stack(), 'frr')
+        self.assertEqual(routing_stack.get_routing_stack(), 'frr')
+        self.assertEqual(routing_stack.detect_routing_stack.call_count, 1)
+
+    def test_cached(self):
+        self.assertEqual(self.get_routing_stack(), 'frr')
+        routing_stack.detect_routing_stack.return_value = 'quagga'
+        self.assertEqual(self.get_routing_stack(), 'frr')
+        self.assertEqual(routing_stack.detect_routing_stack.call_count, 1)
+
+    def test_containers_changed(self):
+        self.assertEqual(self.get_routing_stack(), 'frr')
+        routing_stack.detect_routing_stack.return_value = 'quagga'
+        self.key = [2.0, '100']
+        self.assertEqual(self.get_routing_stack(), 'quagga')
+        self.assertEqual(routing_stack.detect_routing_stack.call_count, 2)
+
+    def test_no_key(self):
+        # e.g. not root, the docker containers are not accessible
+        self.key = None
+        self.assertEqual(self.get_routing_stack(), 'frr')
+        self.assertEqual(self.get_routing_stack(), 'frr')
+        self.assertEqual(routing_stack.detect_routing_stack.call_count, 2)
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_not_detected_not_cached(self):
+        routing_stack.detect_routing_stack.return_value = ''
+        self.assertEqual(self.get_routing_stack(), '')
+        self.assertEqual(os.listdir(self.tmp_dir), [])
@@ -0,0 +1,170 @@
+# counters checkpoint file utility functions #
+#
+# A checkpoint is a fixed-layout binary file:
+#
+#   header   magic, version, number of fields, number of records, timestamp
+#   names    length-prefixed blob of the field names followed by the record keys,
+#            newline separated
+#   records  one (uint32 key index, uint64 value * number of fields) per key
+#
+# Values that are not available are stored as the all-ones uint64.
+
+import datetime
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from collections import OrderedDict
+
+STATUS_NA = 'N/A'
+
+CHECKPOINT_MAGIC = b'CNST'
+CHECKPOINT_VERSION = 1
+
+HEADER = struct.Struct('<4sHIId')
+NAMES_LEN = struct.Struct('<I')
+VALUE_NA = 0xFFFFFFFFFFFFFFFF
+
+def _record_struct(nfields):
+    return struct.Struct('<I%dQ' % nfields)
+
+def _to_timestamp(dt):
+    return time.mktime(dt.timetuple()) + dt.microsecond / 1e6
+
+def dump(path, records, fields=(), timestamp=None):
+    """
+        Write the (key, values) pairs of 'records' to a checkpoint file.
+        Values are non-negative ints or None when not available.
+    """
+    records = list(records)
+    fields = list(fields)
+    nfields = len(records[0][1]) if records else len(fields)
+    record = _record_struct(nfields)
+    if timestamp is None:
+        timestamp = datetime.datetime.now()
+
+    names = '\n'.join(fields + [key for key, _ in records]).encode('utf-8')
+    chunks = [HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, nfields, len(records), _to_timestamp(timestamp)),
+              NAMES_LEN.pack(len(names)), names]
+    for index, (key, values) in enumerate(records):
+        chunks.append(record.pack(index, *[VALUE_NA if value is None else value for value in values]))
+
+    # Write to a temporary file first so readers never see a partial checkpoint
+    dirname = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix='.' + os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b''.join(chunks))
+        os.rename(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+def read(path):
+    """
+        Read a checkpoint file.
+        Returns (timestamp, fields, OrderedDict of key -> list of values).
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size + NAMES_LEN.size:
+            raise IOError("%s is not a counters checkpoint" % path)
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic, version, nfields, nrecords, timestamp = HEADER.unpack_from(buf, 0)
+        if magic != CHECKPOINT_MAGIC:
+            raise IOError("%s is not a counters checkpoint" % path)
+        if version != CHECKPOINT_VERSION:
+            raise IOError("%s has unsupported checkpoint version %d" % (path, version))
+
+        offset = HEADER.size
+        names_len, = NAMES_LEN.unpack_from(buf, offset)
+        offset += NAMES_LEN.size
+        names = buf[offset:offset + names_len]
+        if not isinstance(names, str):
+            names = names.decode('utf-8')
+        names = names.split('\n') if names_len else []
+        offset += names_len
+
+        fields = names[:len(names) - nrecords]
+        keys = names[len(names) - nrecords:]
+        record = _record_struct(nfields)
+        if size < offset + nrecords * record.size:
+            raise IOError("%s is truncated" % path)
+
+        records = OrderedDict()
+        for _ in range(nrecords):
+            values = record.unpack_from(buf, offset)
+            offset += record.size
+            records[keys[values[0]]] = [None if value == VALUE_NA else value for value in values[1:]]
+    finally:
+        buf.close()
+
+    return datetime.datetime.fromtimestamp(timestamp), fields, records
+
+def _to_value(field):
+    """
+        Return field as a value of a record, or None if it is not an
+        unsigned integer below VALUE_NA.
+    """
+    try:
+        value = int(field)
+    except (TypeError, ValueError):
+        return None
+    return value if 0 <= value < VALUE_NA else None
+
+def save_cnstat(path, cnstat_dict):
+    """
+        Save a cnstat dictionary ('time' plus key -> tuple of decimal strings).
+        The field names of namedtuple counters are saved with them.
+        Fields that are not unsigned integers are saved as not available.
+    """
+    records = []
+    fields = ()
+    for key, cntr in cnstat_dict.iteritems():
+        if key == 'time':
+            continue
+        fields = getattr(cntr, '_fields', ())
+        records.append((key, [_to_value(field) for field in cntr]))
+    dump(path, records, fields, timestamp=cnstat_dict.get('time'))
+
+def load_cnstat(path, cntr_type):
+    """
+        Load a cnstat dictionary saved by save_cnstat, building the
+        counters with the namedtuple type 'cntr_type'.
+        Raises IOError if the saved counters are not the fields of 'cntr_type'.
+    """
+    timestamp, fields, records = read(path)
+    if fields and tuple(fields) != tuple(cntr_type._fields):
+        raise IOError("%s has counters %s, expected %s" % (path, ', '.join(fields), ', '.join(cntr_type._fields)))
+    # Checkpoints saved without the field names can only be checked by their number
+    values = next(records.itervalues(), None)
+    if values is not None and len(values) != len(cntr_type._fields):
+        raise IOError("%s has %d counters, expected %d" % (path, len(values), len(cntr_type._fields)))
+    cnstat_dict = OrderedDict()
+    cnstat_dict['time'] = timestamp
+    for key, values in records.iteritems():
+        cnstat_dict[key] = cntr_type._make([STATUS_NA if value is None else str(value) for value in values])
+    return cnstat_dict
+
+def save_counts(path, counts_table):
+    """
+        Save a dictionary of key -> dictionary of counter name -> int.
+        Counts that are not unsigned integers are saved as not available.
+    """
+    fields = sorted(set(counter for counts in counts_table.values() for counter in counts))
+    records = [(key, [_to_value(counts.get(counter)) for counter in fields])
+               for key, counts in counts_table.iteritems()]
+    dump(path, records, fields)
+
+def load_counts(path):
+    """
+        Load a dictionary saved by save_counts.
+    """
+    _, fields, records = read(path)
+    counts_table = OrderedDict()
+    for key, values in records.iteritems():
+        counts_table[key] = {counter: value for counter, value in zip(fields, values) if value is not None}
+    return counts_table
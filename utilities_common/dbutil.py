@@ -0,0 +1,60 @@
+# redis bulk access utility functions #
+
+# Number of commands queued in one pipeline before it is flushed to redis.
+# Keeps the reply buffers bounded on devices with very large tables.
+PIPELINE_BATCH_SIZE = 1000
+
+def run_pipelined(client, keys, queue_cmd, batch_size=PIPELINE_BATCH_SIZE):
+    """
+        Queue one command per key on a non-transactional pipeline and
+        return the replies in key order.
+    """
+    replies = []
+    keys = list(keys)
+    for start in range(0, len(keys), batch_size):
+        pipe = client.pipeline(transaction=False)
+        for key in keys[start:start + batch_size]:
+            queue_cmd(pipe, key)
+        replies.extend(pipe.execute())
+    return replies
+
+def get_all_bulk(db, db_name, keys, batch_size=PIPELINE_BATCH_SIZE):
+    """
+        Get all the hashes stored at 'keys' in 'db_name' in pipelined batches.
+        Returns a dictionary of key -> field dictionary, empty if the key does not exist.
+    """
+    keys = list(keys)
+    client = db.get_redis_client(db_name)
+    replies = run_pipelined(client, keys, lambda pipe, key: pipe.hgetall(key), batch_size)
+    return dict(zip(keys, replies))
+
+def get_fields_bulk(db, db_name, keys, fields, batch_size=PIPELINE_BATCH_SIZE):
+    """
+        Get the given 'fields' of all the hashes stored at 'keys' in 'db_name'
+        in pipelined batches.
+        Returns a dictionary of key -> list of values ordered as 'fields',
+        None for every field that does not exist.
+    """
+    keys = list(keys)
+    fields = list(fields)
+    client = db.get_redis_client(db_name)
+    replies = run_pipelined(client, keys, lambda pipe, key: pipe.hmget(key, fields), batch_size)
+    return dict(zip(keys, replies))
+
+def enable_keyspace_events(client, flags):
+    """
+        Add the notify-keyspace-events 'flags' missing from the redis server
+        configuration, as documented in redis.conf (K for the keyspace
+        channels, then the event classes).
+        Returns the previous configuration, to restore it with
+        client.config_set('notify-keyspace-events', previous), or None if
+        the flags were all enabled already and nothing is to be restored.
+    """
+    previous = client.config_get('notify-keyspace-events').get('notify-keyspace-events', '')
+    # A is the alias of all the event classes
+    enabled = previous.replace('A', 'g$lshzxe')
+    missing = ''.join(flag for flag in flags if flag not in enabled)
+    if not missing:
+        return None
+    client.config_set('notify-keyspace-events', previous + missing)
+    return previous
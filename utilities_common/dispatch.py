@@ -0,0 +1,130 @@
+# in-process script dispatch utility functions #
+#
+# Several CLI commands only run one of the Python scripts of this package.
+# Running them through a shell costs a shell, a second interpreter and a
+# second set of DB connections, so they are loaded as modules and their
+# entry point is called in the current interpreter instead.
+
+import imp
+import os
+import re
+import shlex
+import sys
+
+# Scripts which can run in-process, with the call their __main__ block makes
+INPROCESS_SCRIPTS = {
+    'aclshow': lambda module: module.main(),
+    'fdbshow': lambda module: module.main(),
+    'intfutil': lambda module: module.main(sys.argv[1:]),
+    'nbrshow': lambda module: module.main(),
+    'pfcstat': lambda module: module.main(),
+    'portstat': lambda module: module.main(),
+    'queuestat': lambda module: module.main(),
+    'sfpshow': lambda module: module.cli(),
+    'watermarkstat': lambda module: module.main(),
+}
+
+# Commands using any shell feature are left to the shell
+SHELL_SPECIAL_CHARS = re.compile(r'[|&;<>()$`\\*?\[\]{}~!#\n]')
+
+_script_modules = {}
+
+class LineWriter(object):
+    """
+        File-like object passing every complete line written to it to a
+        handler, which itself writes to the original stdout.
+    """
+    def __init__(self, line_handler, stdout):
+        self.line_handler = line_handler
+        self.stdout = stdout
+        self.buf = ''
+
+    def handle_line(self, line):
+        saved_stdout, sys.stdout = sys.stdout, self.stdout
+        try:
+            self.line_handler(line)
+        finally:
+            sys.stdout = saved_stdout
+
+    def write(self, data):
+        self.buf += data
+        while '\n' in self.buf:
+            line, self.buf = self.buf.split('\n', 1)
+            self.handle_line(line + '\n')
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def close(self):
+        if self.buf:
+            self.handle_line(self.buf)
+            self.buf = ''
+
+def find_script(name):
+    for path in os.environ.get('PATH', '').split(os.pathsep):
+        script = os.path.join(path, name)
+        if os.path.isfile(script):
+            return script
+    return None
+
+def load_script(name):
+    """
+        Load a script as a module, once per process.
+    """
+    if name not in _script_modules:
+        script = find_script(name)
+        if script is None:
+            return None
+        # imp.load_source would write the bytecode next to the script
+        module = imp.new_module('sonic_script_' + name)
+        module.__file__ = script
+        with open(script) as f:
+            code = compile(f.read(), script, 'exec')
+        exec(code, module.__dict__)
+        _script_modules[name] = module
+    return _script_modules[name]
+
+def run_script_in_process(command, line_handler=None):
+    """
+        Run command in the current interpreter if it only invokes one of
+        the scripts in INPROCESS_SCRIPTS. Output lines are passed to
+        line_handler, or written to stdout if it is None.
+        Returns the exit code of the script, None if command has to be run
+        by the shell.
+    """
+    if SHELL_SPECIAL_CHARS.search(command):
+        return None
+    argv = shlex.split(command)
+    if not argv or argv[0] not in INPROCESS_SCRIPTS:
+        return None
+    module = load_script(argv[0])
+    if module is None:
+        return None
+
+    saved_argv, saved_stdout = sys.argv, sys.stdout
+    sys.argv = argv
+    if line_handler is not None:
+        sys.stdout = LineWriter(line_handler, saved_stdout)
+    exit_code = 0
+    try:
+        INPROCESS_SCRIPTS[argv[0]](module)
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            sys.stderr.write("{}\n".format(e.code))
+            exit_code = 1
+    finally:
+        if line_handler is not None:
+            sys.stdout.close()
+        sys.argv, sys.stdout = saved_argv, saved_stdout
+    return exit_code
@@ -0,0 +1,166 @@
+# interface name/alias conversion utility functions #
+
+import re
+
+import click
+from swsssdk import ConfigDBConnector
+
+VLAN_SUB_INTERFACE_SEPARATOR = '.'
+
+# Interface names are rewritten when they are a word of their own: at the
+# start of a line or after whitespace, and followed by the end of the line,
+# whitespace, or a comma and whitespace
+DEFAULT_CONTEXT = r'(?=$|,?\s)'
+# teamshow flags member ports with their state, e.g. Ethernet0(S) or Ethernet4(D*)
+TEAMSHOW_CONTEXT = r'(?=\([DS]\*?\)(?:$|\s))'
+
+def trie_regex(words):
+    """
+        Return a regular expression matching any of words. The alternatives
+        are factored by common prefix, so that the matching at a position of
+        the text does not try each word in turn.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ''
+        if len(alternatives) == 1 and '' not in node:
+            return alternatives[0]
+        return '(?:' + '|'.join(alternatives) + ')' + ('?' if '' in node else '')
+
+    return build(trie)
+
+
+class InterfaceAliasRewriter(object):
+    """Class which replaces all the interface names of a text in one pass
+
+    The names are given as a dictionary of name -> replacement, context is
+    a lookahead the text following a name has to match.
+    """
+
+    def __init__(self, replacements, context=DEFAULT_CONTEXT):
+        self.replacements = replacements
+        self.pattern = None
+        if replacements:
+            self.pattern = re.compile(r'(?<!\S)' + trie_regex(replacements.keys()) + context)
+
+    def _replace(self, match):
+        return self.replacements[match.group(0)]
+
+    def rewrite(self, text):
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(self._replace, text)
+
+    def filter(self, lines):
+        """Rewrite an iterable of lines, e.g. the output of a command, as it is read"""
+        for line in lines:
+            yield self.rewrite(line)
+
+
+class InterfaceAliasConverter(object):
+    """Class which handles conversion between interface name and alias
+
+    The PORT table is only read from ConfigDB the first time it is needed,
+    and indexed by name and by alias.
+    """
+
+    def __init__(self, port_dict=None):
+        self._port_dict = None
+        self._name_to_alias = {}
+        self._alias_to_name = {}
+        self._alias_max_length = 0
+        self._rewriters = {}
+        if port_dict is not None:
+            self._build_index(port_dict)
+
+    @property
+    def port_dict(self):
+        if self._port_dict is None:
+            self._load_port_dict()
+        return self._port_dict
+
+    @property
+    def alias_max_length(self):
+        if self._port_dict is None:
+            self._load_port_dict()
+        return self._alias_max_length
+
+    def _load_port_dict(self):
+        config_db = ConfigDBConnector()
+        config_db.connect()
+        port_dict = config_db.get_table('PORT')
+
+        if not port_dict:
+            click.echo(message="Warning: failed to retrieve PORT table from ConfigDB!", err=True)
+            port_dict = {}
+
+        self._build_index(port_dict)
+
+    def _build_index(self, port_dict):
+        self._port_dict = port_dict
+        self._name_to_alias = {}
+        self._alias_to_name = {}
+        self._rewriters = {}
+        for port_name, port_entry in port_dict.items():
+            alias = port_entry.get('alias')
+            if alias is None:
+                continue
+            self._name_to_alias[port_name] = alias
+            self._alias_to_name[alias] = port_name
+        self._alias_max_length = max([len(alias) for alias in self._alias_to_name] or [0])
+
+    def get_alias(self, port_name):
+        """Return the alias of a port, None if it has none"""
+        if self._port_dict is None:
+            self._load_port_dict()
+        return self._name_to_alias.get(port_name)
+
+    def get_name(self, alias):
+        """Return the name of the port with the given alias, None if there is none"""
+        if self._port_dict is None:
+            self._load_port_dict()
+        return self._alias_to_name.get(alias)
+
+    def _convert(self, interface, index):
+        if interface is None:
+            return None
+        if self._port_dict is None:
+            self._load_port_dict()
+        if interface in index:
+            return index[interface]
+
+        # Sub-interfaces are named after their parent port
+        parent, sep, vlan_id = interface.partition(VLAN_SUB_INTERFACE_SEPARATOR)
+        return index.get(parent, parent) + sep + vlan_id
+
+    def name_to_alias(self, interface_name):
+        """Return vendor interface alias if SONiC
+           interface name is given as argument
+        """
+        # interface_name not in port_dict. Just return interface_name
+        return self._convert(interface_name, self._name_to_alias)
+
+    def alias_to_name(self, interface_alias):
+        """Return SONiC interface name if vendor
+           port alias is given as argument
+        """
+        # interface_alias not in port_dict. Just return interface_alias
+        return self._convert(interface_alias, self._alias_to_name)
+
+    def get_rewriter(self, context=DEFAULT_CONTEXT):
+        """Return an InterfaceAliasRewriter replacing interface names by their
+           alias where they are followed by context
+        """
+        if self._port_dict is None:
+            self._load_port_dict()
+        if context not in self._rewriters:
+            self._rewriters[context] = InterfaceAliasRewriter(self._name_to_alias, context)
+        return self._rewriters[context]
@@ -1,56 +1,100 @@
 # network statistics utility functions #
 
 import json
+import sys
+import time
 
 STATUS_NA = 'N/A'
 PORT_RATE = 40
 
-def ns_diff(newstr, oldstr):
+CLEAR_SCREEN = '\033[2J\033[H'
+
+def ns_diffs(new_cntr, old_cntr):
     """
-        Calculate the diff.
+        Calculate the diffs of all the counters of two samples in one pass.
+        Returns a list of ints, None for the counters that are not available.
+    """
+    diffs = []
+    for newstr, oldstr in zip(new_cntr, old_cntr):
+        if newstr == STATUS_NA or oldstr == STATUS_NA:
+            diffs.append(None)
+        else:
+            diffs.append(max(0, int(newstr) - int(oldstr)))
+    return diffs
+
+def ns_rates(diffs, delta):
+    """
+        Calculate the per second rates of all the diffs in one pass.
+        Returns a list of floats, None for the counters that are not available.
+    """
+    if delta <= 0:
+        return [None] * len(diffs)
+    delta = float(delta)
+    return [None if diff is None else diff/delta for diff in diffs]
+
+def format_diff(diff):
+    """
+        Show the diff.
     """
-    if newstr == STATUS_NA or oldstr == STATUS_NA:
+    if diff is None:
         return STATUS_NA
+    return '{:,}'.format(diff)
+
+def format_brate(rate):
+    """
+        Show the byte rate.
+    """
+    if rate is None:
+        return STATUS_NA
+    rate = float(rate)
+    if rate > 1024*1024*10:
+        rate = "{:.2f}".format(rate/1024/1024)+' MB'
+    elif rate > 1024*10:
+        rate = "{:.2f}".format(rate/1024)+' KB'
     else:
-        new, old = int(newstr), int(oldstr)
-        return '{:,}'.format(max(0, new - old))
+        rate = "{:.2f}".format(rate)+' B'
+    return rate+'/s'
+
+def format_prate(rate):
+    """
+        Show the packet rate.
+    """
+    if rate is None:
+        return STATUS_NA
+    return "{:.2f}".format(rate)+'/s'
+
+def format_util(rate, port_rate=PORT_RATE):
+    """
+        Show the util.
+    """
+    if rate is None:
+        return STATUS_NA
+    util = rate/(port_rate*1024*1024*1024/8.0)*100
+    return "{:.2f}%".format(util)
+
+def ns_diff(newstr, oldstr):
+    """
+        Calculate the diff.
+    """
+    return format_diff(ns_diffs([newstr], [oldstr])[0])
 
 def ns_brate(newstr, oldstr, delta):
     """
         Calculate the byte rate.
     """
-    if newstr == STATUS_NA or oldstr == STATUS_NA:
-        return STATUS_NA
-    else:
-        rate = int(ns_diff(newstr, oldstr).replace(',',''))/delta
-        if rate > 1024*1024*10:
-            rate = "{:.2f}".format(rate/1024/1024)+' MB'
-        elif rate > 1024*10:
-            rate = "{:.2f}".format(rate/1024)+' KB'
-        else:
-            rate = "{:.2f}".format(rate)+' B'
-        return rate+'/s'
+    return format_brate(ns_rates(ns_diffs([newstr], [oldstr]), delta)[0])
 
 def ns_prate(newstr, oldstr, delta):
     """
         Calculate the packet rate.
     """
-    if newstr == STATUS_NA or oldstr == STATUS_NA:
-        return STATUS_NA
-    else:
-        rate = int(ns_diff(newstr, oldstr).replace(',',''))/delta
-        return "{:.2f}".format(rate)+'/s'
+    return format_prate(ns_rates(ns_diffs([newstr], [oldstr]), delta)[0])
 
 def ns_util(newstr, oldstr, delta, port_rate=PORT_RATE):
     """
         Calculate the util.
     """
-    if newstr == STATUS_NA or oldstr == STATUS_NA:
-        return STATUS_NA
-    else:
-        rate = int(ns_diff(newstr, oldstr).replace(',',''))/delta
-        util = rate/(port_rate*1024*1024*1024/8.0)*100
-        return "{:.2f}%".format(util)
+    return format_util(ns_rates(ns_diffs([newstr], [oldstr]), delta)[0], port_rate)
 
 def table_as_json(table, header):
     """
@@ -65,3 +109,24 @@ def table_as_json(table, header):
         output[if_name] = {header[i]: line[i] for i in range(1, len(header))}
     
     return json.dumps(output, indent=4, sort_keys=True)
+
+def clear_screen():
+    """
+        Clear the terminal before refreshing the display, if stdout is one.
+    """
+    if sys.stdout.isatty():
+        sys.stdout.write(CLEAR_SCREEN)
+
+def watch(interval, sample, display, baseline):
+    """
+        Take a new sample() every interval seconds and call
+        display(previous, current) with it and the previous sample, the
+        first one being baseline, until interrupted.
+    """
+    previous = baseline
+    while True:
+        time.sleep(interval)
+        current = sample()
+        display(previous, current)
+        sys.stdout.flush()
+        previous = current
@@ -0,0 +1,41 @@
+# reboot timeline utility functions #
+
+import json
+
+# Written by the fast-reboot/warm-reboot scripts: a first line with the
+# reboot information, then one line per phase start/end event. All the
+# times are read from /proc/uptime, a monotonic clock.
+REBOOT_TIMELINE_FILE = '/host/reboot-timeline/reboot-timeline.jsonl'
+
+def read_timeline(filename=REBOOT_TIMELINE_FILE):
+    """
+        Read the timeline of a reboot.
+        Returns the reboot information dictionary and the list of phases, as
+        dictionaries with the name, and the start, end and duration in seconds
+        since the reboot started. The end and duration of a phase that never
+        ended are None.
+    """
+    info = {}
+    phases = []
+    started = {}
+    with open(filename) as fp:
+        for line in fp:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # Line cut by the reboot
+                continue
+            if 'phase' not in event:
+                info = event
+                continue
+            origin = info.get('uptime', 0.0)
+            uptime = event['uptime'] - origin
+            if event['event'] == 'start':
+                phase = {'name': event['phase'], 'start': uptime, 'end': None, 'duration': None}
+                started[event['phase']] = phase
+                phases.append(phase)
+            elif event['phase'] in started:
+                phase = started.pop(event['phase'])
+                phase['end'] = uptime
+                phase['duration'] = uptime - phase['start']
+    return info, phases
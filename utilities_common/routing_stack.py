@@ -0,0 +1,126 @@
+# routing stack detection utility functions #
+
+import json
+import os
+import subprocess
+import tempfile
+
+ROUTING_STACK_CACHE_FILE = '/tmp/routing-stack-{}'
+DOCKER_CONTAINERS_DIR = '/var/lib/docker/containers'
+DOCKER_PID_FILE = '/var/run/docker.pid'
+
+_routing_stack = None
+
+def _container_state_key():
+    """
+        Return a key that changes whenever a container is created or removed
+        or the docker daemon restarts, None if it cannot be determined.
+        DOCKER_CONTAINERS_DIR is only accessible to root: for other users
+        the key is None, and the routing stack is detected by every process.
+    """
+    try:
+        mtime = os.stat(DOCKER_CONTAINERS_DIR).st_mtime
+        with open(DOCKER_PID_FILE) as f:
+            pid = f.read().strip()
+    except (IOError, OSError):
+        return None
+    return [mtime, pid]
+
+def _read_cache(cache_file, key):
+    try:
+        with open(cache_file) as f:
+            if os.fstat(f.fileno()).st_uid != os.getuid():
+                return None
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if cache.get('key') != key:
+        return None
+    return cache.get('routing_stack')
+
+def _write_cache(cache_file, key, routing_stack):
+    tmp_file = None
+    try:
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'key': key, 'routing_stack': routing_stack}, f)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError):
+        # The cache is only an optimization
+        if tmp_file is not None and os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+# To be enhanced. Routing-stack information should be collected from a global
+# location (configdb?), so that we prevent the continous execution of this
+# bash oneliner. To be revisited once routing-stack info is tracked somewhere.
+def detect_routing_stack():
+    command = "sudo docker ps | grep bgp | awk '{print$2}' | cut -d'-' -f3 | cut -d':' -f1"
+
+    try:
+        proc = subprocess.Popen(command,
+                                stdout=subprocess.PIPE,
+                                shell=True,
+                                stderr=subprocess.STDOUT)
+        stdout = proc.communicate()[0]
+        proc.wait()
+        result = stdout.rstrip('\n')
+
+    except OSError, e:
+        raise OSError("Cannot detect routing-stack")
+
+    return (result)
+
+def get_routing_stack():
+    """
+        Return the routing stack ("quagga", "frr", ...) of the bgp container.
+        The result is memoized for the process and, when run as root, cached
+        on disk until the set of containers changes, so docker is only
+        queried when needed.
+    """
+    global _routing_stack
+
+    if _routing_stack is None:
+        cache_file = ROUTING_STACK_CACHE_FILE.format(os.getuid())
+        key = _container_state_key()
+        routing_stack = _read_cache(cache_file, key) if key is not None else None
+        if routing_stack is None:
+            routing_stack = detect_routing_stack()
+            if key is not None and routing_stack:
+                _write_cache(cache_file, key, routing_stack)
+        _routing_stack = routing_stack
+
+    return _routing_stack
+
+
+class RoutingStackGroupMixin(object):
+    """
+        Mixin of a click group holding subcommands which depend on the
+        routing stack. The routing stack is only detected, and the
+        subcommand only loaded, when one of these subcommands is looked up.
+        To be listed before the click group class in the bases.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(RoutingStackGroupMixin, self).__init__(*args, **kwargs)
+        self.routing_stack_commands = {}
+
+    def add_routing_stack_command(self, routing_stack, cmd_name, loader):
+        """Register the function returning subcommand cmd_name for routing_stack"""
+        self.routing_stack_commands.setdefault(cmd_name, {})[routing_stack] = loader
+
+    def load_routing_stack_command(self, cmd_name):
+        loaders = self.routing_stack_commands.get(cmd_name)
+        if not loaders or cmd_name in self.commands:
+            return
+        loader = loaders.get(get_routing_stack())
+        if loader is not None:
+            self.add_command(loader(), cmd_name)
+
+    def get_command(self, ctx, cmd_name):
+        self.load_routing_stack_command(cmd_name)
+        return super(RoutingStackGroupMixin, self).get_command(ctx, cmd_name)
+
+    def list_commands(self, ctx):
+        for cmd_name in self.routing_stack_commands:
+            self.load_routing_stack_command(cmd_name)
+        return super(RoutingStackGroupMixin, self).list_commands(ctx)